@@ -1,6 +1,32 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import catalog, contexto, db_pool, lookup, metrics, resumen, versions
+        from .models import Reserva, Solicitud, Tenista
+        pre_save.connect(lookup.remember_numero, sender=Tenista, dispatch_uid="lookup-pre-save-Tenista")
+        post_save.connect(lookup.forget_instance, sender=Tenista, dispatch_uid="lookup-save-Tenista")
+        post_delete.connect(lookup.forget_instance, sender=Tenista, dispatch_uid="lookup-delete-Tenista")
+        for model, handler in ((Tenista, contexto.forget_tenista),
+                               (Solicitud, contexto.forget_solicitud),
+                               (Reserva, contexto.forget_reserva)):
+            post_save.connect(handler, sender=model, dispatch_uid=f"contexto-save-{model.__name__}")
+            post_delete.connect(handler, sender=model, dispatch_uid=f"contexto-delete-{model.__name__}")
+        for model in resumen.TABLAS:
+            pre_save.connect(resumen.remember, sender=model, dispatch_uid=f"resumen-pre-save-{model.__name__}")
+            post_save.connect(resumen.on_save, sender=model, dispatch_uid=f"resumen-save-{model.__name__}")
+            post_delete.connect(resumen.on_delete, sender=model, dispatch_uid=f"resumen-delete-{model.__name__}")
+        for model in versions.VERSIONED:
+            post_save.connect(versions.bump_instance, sender=model, dispatch_uid=f"version-save-{model.__name__}")
+            post_delete.connect(versions.bump_instance, sender=model, dispatch_uid=f"version-delete-{model.__name__}")
+        for model in catalog.CATALOGS:
+            post_save.connect(catalog.invalidate_catalog, sender=model, dispatch_uid=f"catalog-save-{model.__name__}")
+            post_delete.connect(catalog.invalidate_catalog, sender=model, dispatch_uid=f"catalog-delete-{model.__name__}")
+        connection_created.connect(db_pool.on_connection_created, dispatch_uid="db-pool-connection-created")
+        connection_created.connect(metrics.on_connection_created, dispatch_uid="metrics-connection-created")
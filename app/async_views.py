@@ -0,0 +1,139 @@
+# app/async_views.py
+"""
+Versión async (ASGI) de los endpoints que golpea el bot: whatsapp_webhook,
+tenista_por_numero y solicitud_detail.
+
+Mismo contrato que las vistas DRF de app/webhooks.py (rutas, token, códigos
+de estado, cuerpo JSON y ETag), pero como vistas async de Django: mientras
+esperan al cache o a la BD no ocupan un worker. app/urls.py las usa cuando
+ASYNC_VIEWS está activo (core/asgi.py lo activa por defecto).
+
+Lo que sí es async: el cache (aget/aset) y las lecturas con el ORM async
+(detalle, tenista por número, la respuesta guardada de un reintento). El alta
+del webhook no: es SQL crudo (INSERT ... ON CONFLICT, bulk_create) dentro de
+transaction.atomic, y el ORM async no tiene ni cursor ni transacciones, así
+que va entera en un sync_to_async. Ojo que Django también corre cada query
+del ORM async con sync_to_async (thread_sensitive): bajo ASGI todas pasan por
+el mismo thread del worker. La ganancia es no tener un worker bloqueado por
+request mientras espera, no menos trabajo en la BD; medirla con
+`manage.py loadtest_webhooks` contra los dos despliegues antes de cambiar.
+
+DRF no soporta vistas async, por eso el token y el render se hacen acá a mano
+con los mismos helpers (_token_ok, FastJSONRenderer). El cuerpo sí lo parsea
+un Request de DRF con los DEFAULT_PARSER_CLASSES: mismos media types (JSON,
+form, multipart) y mismos 400/415 que la vista DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import idempotency, lookup, models, versions
+from .catalog import retry_stale
+from .conditional import not_modified, set_validators
+from .renderers import FastJSONRenderer
+from .webhooks import _create, _parse_form, _serialize_solicitud, _token_ok
+
+_renderer = FastJSONRenderer()
+# lo que DRF negocia para un cliente JSON; entra en el ETag (app/conditional.py)
+_MEDIA_TYPE = "application/json"
+
+
+def _json(data, status=200) -> HttpResponse:
+    return HttpResponse(_renderer.render(data), content_type=_MEDIA_TYPE, status=status)
+
+
+def _method_not_allowed(request, allowed):
+    resp = _json({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    resp["Allow"] = ", ".join([*allowed, "OPTIONS"])
+    return resp
+
+
+def _parse_body(request):
+    """(data, respuesta de error): lo mismo que request.data en la vista DRF."""
+    drf_request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+    try:
+        return drf_request.data, None
+    except APIException as exc:
+        return None, _json({"detail": exc.detail}, status=exc.status_code)
+
+
+# --------------- WEBHOOK --------------------
+@csrf_exempt
+async def whatsapp_webhook(request):
+    if request.method != "POST":
+        return _method_not_allowed(request, ["POST"])
+    body, error = _parse_body(request)
+    if not _token_ok(request, lambda: body):
+        return _json({"ok": False, "error": "Token inválido"}, status=401)
+    if error is not None:
+        return error
+
+    body = body or {}
+    if not isinstance(body, dict):
+        return _json({"ok": False, "error": "JSON inválido"}, status=400)
+    try:
+        form = _parse_form(body)
+    except ValueError as exc:
+        return _json({"ok": False, "error": str(exc)}, status=400)
+
+    key = idempotency.key_for(request.headers.get("Idempotency-Key"), body)
+    resp = await idempotency.acached(key)
+    if resp is None:
+        # reintento que ya no está en el cache: la fila guardada, con el ORM async
+        resp = await idempotency.astored(key)
+    replayed = resp is not None
+    if not replayed:
+        # solo el alta (reclamo + upserts en una transacción) va a sync_to_async
+        resp, replayed = await sync_to_async(retry_stale)(lambda: idempotency.run(key, lambda: _create(form)))
+    out = _json(resp, status=201)
+    if replayed:
+        out["Idempotent-Replayed"] = "true"
+    return out
+
+
+# --------------- lecturas -------------------
+async def tenista_por_numero(request, numero=None):
+    if request.method != "GET":
+        return _method_not_allowed(request, ["GET"])
+    numero = numero or request.GET.get("numero") or request.GET.get("from_phone")
+    if not numero:
+        return _json({"ok": False, "error": "numero requerido"}, status=400)
+    return _json({"ok": True, "tenista": await lookup.atenista_por_numero(numero)})
+
+
+async def _solicitud_tokens(pk: int):
+    deps = await versions.aget_deps(models.Solicitud, pk)
+    if deps is None:
+        deps = await (models.Solicitud.objects.filter(pk=pk)
+                      .values_list("tenista_id", "origen_id", "destino_id").afirst())
+        if deps is None:
+            return None
+        await versions.aset_deps(models.Solicitud, pk, deps)
+    tenista_id, origen_id, destino_id = deps
+    keys = [versions.row_key(models.Solicitud, pk)]
+    for model, fk in ((models.Tenista, tenista_id), (models.Origen, origen_id), (models.Destino, destino_id)):
+        if fk is not None:
+            keys.append(versions.row_key(model, fk))
+    return await versions.aget_versions(keys)
+
+
+async def solicitud_detail(request, pk: int):
+    if request.method not in ("GET", "HEAD"):
+        return _method_not_allowed(request, ["GET"])
+    tokens = await _solicitud_tokens(pk)
+    if tokens is None:
+        return _json({"ok": False, "error": "No encontrada"}, status=404)
+    request.accepted_media_type = _MEDIA_TYPE
+    not_modified_resp, etag, last_modified = not_modified(request, tokens)
+    if not_modified_resp is not None:
+        return not_modified_resp
+
+    sol = await (models.Solicitud.objects
+                 .select_related("tenista", "origen", "destino")
+                 .filter(pk=pk).afirst())
+    if not sol:
+        return _json({"ok": False, "error": "No encontrada"}, status=404)
+    return set_validators(_json({"ok": True, "solicitud": _serialize_solicitud(sol)}), etag, last_modified)
@@ -0,0 +1,288 @@
+# app/bulk_import.py
+"""
+Carga masiva de conductores y tenistas desde CSV (onboarding de un torneo).
+
+    POST /api/api/conductores/import/   (text/csv o multipart con "archivo")
+    POST /api/api/tenistas/import/?dry_run=1
+    python manage.py import_csv conductores conductores.csv
+
+El CSV se lee por líneas y cada fila se valida y normaliza en Python (los
+teléfonos con las mismas reglas que el webhook, webhooks._phone). Las filas
+válidas van a una tabla temporal de staging (COPY en Postgres, executemany en
+otros motores) y de ahí a la tabla real con un único
+INSERT ... SELECT ... ON CONFLICT, así que las queries no dependen de la
+cantidad de filas.
+
+Al actualizar, los campos obligatorios del CSV pisan lo que había y los
+opcionales vacíos no borran nada. `activo` vacío (o sin la columna) deja el
+valor que tenía el conductor, y en uno nuevo cuenta como true.
+
+El reporte trae una entrada por fila de datos: insertado / actualizado (con su
+id) o rechazado (con los errores). Una clave repetida dentro del archivo se
+rechaza en las apariciones siguientes a la primera.
+"""
+import csv
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+
+from . import contexto, lookup, models, versions
+from .ingest import copy_rows
+from .parsers import CSVParser
+from .phones import e164
+from .webhooks import _phone
+
+BATCH = 1000
+_TRUE = {"1", "t", "true", "si", "sí", "s", "y", "yes", "x"}
+_FALSE = {"0", "f", "false", "no", "n"}
+
+
+def _bool(value: str) -> Optional[bool]:
+    v = value.lower()
+    if not v:
+        return None  # vacío: no cambia nada (ver Spec.defaults)
+    if v in _TRUE:
+        return True
+    if v in _FALSE:
+        return False
+    raise ValueError(f"activo inválido: {value!r}")
+
+
+def _clean_conductor(row: Dict[str, str]) -> Tuple[Any, ...]:
+    errors = [f"{f} requerido" for f in ("nombre", "apellido", "mail") if not row.get(f)]
+    mail = row.get("mail", "")
+    if mail and "@" not in mail:
+        errors.append(f"mail inválido: {mail!r}")
+    telefono = None
+    if row.get("telefono"):
+        telefono = _phone(row["telefono"])
+        if not telefono:
+            errors.append(f"telefono inválido: {row['telefono']!r}")
+    try:
+        activo = _bool(row.get("activo", ""))
+    except ValueError as exc:
+        errors.append(str(exc))
+    if errors:
+        raise ValueError(*errors)
+    return (row["nombre"], row["apellido"], (row.get("patente") or "").upper() or None,
+            mail, telefono, activo)
+
+
+def _clean_tenista(row: Dict[str, str]) -> Tuple[Any, ...]:
+    errors = [f"{f} requerido" for f in ("nombre", "numero") if not row.get(f)]
+    numero = None
+    if row.get("numero"):
+        numero = _phone(row["numero"])
+        if not numero:
+            errors.append(f"numero inválido: {row['numero']!r}")
+    if errors:
+        raise ValueError(*errors)
+    return row["nombre"], row.get("apellido") or "", row.get("correo") or None, numero, e164(numero)
+
+
+class Spec(NamedTuple):
+    model: Any
+    key: str                      # columna única del ON CONFLICT
+    columns: Tuple[str, ...]      # lo que devuelve clean(), en este orden
+    optional: Tuple[str, ...]     # columnas del CSV que pueden faltar
+    clean: Callable[[Dict[str, str]], Tuple[Any, ...]]
+    updates: str                  # SET del DO UPDATE ({t} = tabla destino)
+    defaults: Dict[str, str] = {}  # columna -> valor SQL si viene vacía y la fila es nueva
+
+
+SPECS: Dict[str, Spec] = {
+    "conductores": Spec(
+        models.Conductor, "mail",
+        ("nombre", "apellido", "patente", "mail", "telefono", "activo"),
+        ("patente", "telefono", "activo"),
+        _clean_conductor,
+        "nombre = EXCLUDED.nombre, apellido = EXCLUDED.apellido, "
+        "patente = COALESCE(EXCLUDED.patente, {t}.patente), "
+        "telefono = COALESCE(EXCLUDED.telefono, {t}.telefono), "
+        "activo = COALESCE(EXCLUDED.activo, {t}.activo)",
+        {"activo": "true"},
+    ),
+    "tenistas": Spec(
+        models.Tenista, "numero",
+        ("nombre", "apellido", "correo", "numero", "numero_e164"),
+        ("apellido", "correo"),
+        _clean_tenista,
+        "nombre = EXCLUDED.nombre, "
+        "apellido = CASE WHEN EXCLUDED.apellido = '' THEN {t}.apellido ELSE EXCLUDED.apellido END, "
+        "correo = COALESCE(EXCLUDED.correo, {t}.correo), numero_e164 = EXCLUDED.numero_e164",
+    ),
+}
+
+
+def _lines(stream) -> Iterator[str]:
+    """Líneas de texto de un archivo subido / request (bytes) o de un archivo de texto."""
+    first = True
+    for line in stream:
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError:
+                line = line.decode("latin-1")  # Excel en Windows
+        if first:
+            line, first = line.lstrip("\ufeff"), False
+        yield line
+
+
+def _header(reader, spec: Spec) -> List[str]:
+    try:
+        header = [h.strip().lower() for h in next(reader)]
+    except StopIteration:
+        raise ValidationError({"archivo": ["CSV vacío"]})
+    # numero_e164 se calcula, no viene en el archivo
+    expected = [c for c in spec.columns if c != "numero_e164"]
+    missing = [c for c in expected if c not in header and c not in spec.optional]
+    unknown = [h for h in header if h not in expected]
+    if missing or unknown:
+        problems = []
+        if missing:
+            problems.append(f"faltan columnas: {', '.join(missing)}")
+        if unknown:
+            problems.append(f"columnas desconocidas: {', '.join(unknown)}")
+        raise ValidationError({"archivo": problems})
+    return header
+
+
+def _staging(spec: Spec) -> str:
+    table = f"import_{spec.model._meta.db_table}"
+    qn = connection.ops.quote_name
+    cols = ", ".join(f"{qn(c)} {'boolean' if c == 'activo' else 'text'}" for c in spec.columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {qn(table)}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {qn(table)} (linea integer NOT NULL, {cols})")
+    return table
+
+
+def _write_staging(table: str, spec: Spec, rows: Sequence[Tuple[Any, ...]]):
+    columns = ("linea", *spec.columns)
+    if connection.vendor == "postgresql":
+        copy_rows(table, columns, rows)
+        return
+    qn = connection.ops.quote_name
+    sql = (f"INSERT INTO {qn(table)} ({', '.join(qn(c) for c in columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _merge(table: str, spec: Spec) -> Tuple[Dict[int, int], set]:
+    """Pasa el staging a la tabla real. Devuelve ({linea: id}, lineas que ya existían)."""
+    qn = connection.ops.quote_name
+    t, s, key = qn(spec.model._meta.db_table), qn(table), qn(spec.key)
+    cols = [qn(c) for c in spec.columns]
+    # lo vacío toma el valor actual de la fila (LEFT JOIN) o, si es nueva, el default;
+    # no alcanza con el COALESCE del DO UPDATE porque la columna es NOT NULL
+    values = [f"COALESCE(s.{qn(c)}, {t}.{qn(c)}, {spec.defaults[c]})" if c in spec.defaults else f"s.{qn(c)}"
+              for c in spec.columns]
+    extra_cols, extra_vals, params = "", "", []
+    if spec.model is models.Conductor:
+        extra_cols, extra_vals = f", {qn('created_at')}", ", %s"
+        params.append(connection.ops.adapt_datetimefield_value(timezone.now()))
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT s.linea FROM {s} s JOIN {t} ON {t}.{key} = s.{key}")
+        existing = {line for (line,) in cursor.fetchall()}
+        # "WHERE true": sin eso SQLite confunde el ON CONFLICT con un JOIN ... ON
+        cursor.execute(
+            f"INSERT INTO {t} ({', '.join(cols)}{extra_cols}) "
+            f"SELECT {', '.join(values)}{extra_vals} FROM {s} s LEFT JOIN {t} ON {t}.{key} = s.{key} WHERE true "
+            f"ON CONFLICT ({key}) DO UPDATE SET {spec.updates.format(t=t)} "
+            f"RETURNING id, {key}",
+            params,
+        )
+        ids = {k: pk for pk, k in cursor.fetchall()}
+        cursor.execute(f"SELECT linea, {key} FROM {s}")
+        by_line = {line: ids[k] for line, k in cursor.fetchall()}
+        cursor.execute(f"DROP TABLE {s}")
+    return by_line, existing
+
+
+def _invalidate(spec: Spec, by_line: Dict[int, int], keys: List[str]):
+    ids = list(by_line.values())
+    model = spec.model
+
+    def on_commit():
+        # el upsert no dispara señales: ETags, lookup del bot y contexto a mano
+        versions.bump_rows(model, ids)
+        if model is models.Tenista:
+            lookup.forget(keys)
+            contexto.forget(ids)
+    transaction.on_commit(on_commit)
+
+
+def run(kind: str, stream: Iterable, dry_run: bool = False) -> Dict[str, Any]:
+    """Importa el CSV `stream` ("conductores" o "tenistas") y devuelve el reporte."""
+    spec = SPECS[kind]
+    reader = csv.reader(_lines(stream))
+    header = _header(reader, spec)
+    key_pos = spec.columns.index(spec.key)
+
+    report: Dict[int, Dict[str, Any]] = {}
+    seen: Dict[str, int] = {}
+    keys: List[str] = []
+    with transaction.atomic():
+        table = _staging(spec)
+        batch: List[Tuple[Any, ...]] = []
+        for row in reader:
+            line = reader.line_num
+            if not any(v.strip() for v in row):
+                continue
+            data = {h: v.strip() for h, v in zip(header, row)}
+            try:
+                values = spec.clean(data)
+            except ValueError as exc:
+                report[line] = {"linea": line, "resultado": "rechazado", "errores": list(exc.args)}
+                continue
+            key = values[key_pos]
+            if key in seen:
+                report[line] = {"linea": line, "resultado": "rechazado",
+                                "errores": [f"{spec.key} repetido (línea {seen[key]})"]}
+                continue
+            seen[key] = line
+            keys.append(key)
+            report[line] = {"linea": line, spec.key: key}
+            batch.append((line, *values))
+            if len(batch) >= BATCH:
+                _write_staging(table, spec, batch)
+                batch = []
+        if batch:
+            _write_staging(table, spec, batch)
+
+        by_line, existing = _merge(table, spec)
+        for line, pk in by_line.items():
+            report[line].update(id=pk, resultado="actualizado" if line in existing else "insertado")
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            _invalidate(spec, by_line, keys)
+
+    filas = [report[line] for line in sorted(report)]
+    totals = {r: sum(f["resultado"] == r for f in filas) for r in ("insertado", "actualizado", "rechazado")}
+    return {
+        "insertados": totals["insertado"],
+        "actualizados": totals["actualizado"],
+        "rechazados": totals["rechazado"],
+        "dry_run": dry_run,
+        "filas": filas,
+    }
+
+
+class ImportMixin:
+    """Agrega POST .../import/ (CSV) a los viewsets de conductores y tenistas."""
+
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[CSVParser, MultiPartParser])
+    def bulk_import(self, request, *args, **kwargs):
+        stream = request.FILES.get("archivo") if request.content_type.startswith("multipart/") else request.data
+        if not stream:
+            raise ValidationError({"archivo": ["Mandar el CSV como text/csv o en el campo multipart 'archivo'"]})
+        dry_run = request.query_params.get("dry_run", "").lower() in ("1", "true", "si")
+        kind = next(name for name, spec in SPECS.items() if spec.model is self.get_queryset().model)
+        return Response(run(kind, stream, dry_run=dry_run))
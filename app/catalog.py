@@ -0,0 +1,189 @@
+# app/catalog.py
+"""
+Cache en proceso para los catálogos Origen / Destino (texto <-> id).
+
+Son pocos lugares que se repiten (club, aeropuerto, hoteles), así que cada
+worker guarda un LRU acotado y solo va a la BD cuando hay un texto nuevo.
+Las señales post_save/post_delete, al confirmar la transacción, limpian la
+entrada local y suben un número de versión en el cache backend; los demás workers comparan esa versión (como
+mucho cada CATALOG_CACHE_VERSION_TTL segundos) y vacían su LRU si cambió.
+
+En esa ventana otro worker puede usar el id de un lugar que ya se borró y el
+INSERT de la Solicitud falla por la FK. retry_stale() atrapa ese error, saca
+del LRU los ids que ya no existen y repite la transacción una vez.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db import IntegrityError, transaction
+
+from . import models
+
+
+class CatalogCache:
+    def __init__(self, model, field: str):
+        self.model = model
+        self.field = field
+        self.version_key = f"catalog:{model._meta.db_table}:version"
+        self.hits = 0
+        self.misses = 0
+        self._by_text: "OrderedDict[str, int]" = OrderedDict()
+        self._by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def maxsize(self) -> int:
+        return getattr(settings, "CATALOG_CACHE_SIZE", 512)
+
+    # ---------- versión compartida entre workers ----------
+    def _sync(self):
+        ttl = getattr(settings, "CATALOG_CACHE_VERSION_TTL", 2)
+        now = time.monotonic()
+        if now - self._checked_at < ttl:
+            return
+        self._checked_at = now
+        version = shared_cache.get(self.version_key)
+        if version != self._version:
+            self._by_text.clear()
+            self._by_id.clear()
+            self._version = version
+
+    def _bump(self):
+        shared_cache.add(self.version_key, 0, timeout=None)
+        try:
+            self._version = shared_cache.incr(self.version_key)
+        except ValueError:  # la clave expiró entre add e incr
+            shared_cache.set(self.version_key, 1, timeout=None)
+            self._version = 1
+
+    # ---------- lecturas ----------
+    def ids_for(self, texts: Iterable[str]) -> Dict[str, int]:
+        """Devuelve los textos que están en cache; cuenta un hit/miss por texto."""
+        out = {}
+        with self._lock:
+            self._sync()
+            for text in texts:
+                pk = self._by_text.get(text)
+                if pk is None:
+                    self.misses += 1
+                    continue
+                self._by_text.move_to_end(text)
+                self.hits += 1
+                out[text] = pk
+        return out
+
+    def text_for(self, pk: int) -> Optional[str]:
+        with self._lock:
+            self._sync()
+            text = self._by_id.get(pk)
+            if text is None:
+                self.misses += 1
+                return None
+            self._by_text.move_to_end(text)
+            self.hits += 1
+            return text
+
+    # ---------- escrituras ----------
+    def put_many(self, mapping: Dict[str, int]):
+        with self._lock:
+            for text, pk in mapping.items():
+                self._by_text[text] = pk
+                self._by_text.move_to_end(text)
+                self._by_id[pk] = text
+            while len(self._by_text) > self.maxsize:
+                _, pk = self._by_text.popitem(last=False)
+                self._by_id.pop(pk, None)
+
+    def invalidate(self, pk: int):
+        with self._lock:
+            text = self._by_id.pop(pk, None)
+            if text is not None:
+                self._by_text.pop(text, None)
+            self._bump()
+
+    def forget_missing(self) -> bool:
+        """Saca los ids que ya no están en la BD (una query). True si sacó alguno."""
+        with self._lock:
+            ids = list(self._by_id)
+        if not ids:
+            return False
+        existing = set(self.model.objects.filter(pk__in=ids).values_list("id", flat=True))
+        with self._lock:
+            stale = [pk for pk in ids if pk not in existing and pk in self._by_id]
+            for pk in stale:
+                self._by_text.pop(self._by_id.pop(pk), None)
+        return bool(stale)
+
+    def clear(self):
+        with self._lock:
+            self._by_text.clear()
+            self._by_id.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._by_text),
+            "maxsize": self.maxsize,
+            "version": self._version,
+        }
+
+
+CATALOGS = {
+    models.Origen: CatalogCache(models.Origen, "salida"),
+    models.Destino: CatalogCache(models.Destino, "lugar"),
+}
+
+
+def catalog_for(model) -> Optional[CatalogCache]:
+    return CATALOGS.get(model)
+
+
+def catalog_stats() -> dict:
+    return {model._meta.db_table: c.stats() for model, c in CATALOGS.items()}
+
+
+def forget_stale() -> bool:
+    """forget_missing() de todos los catálogos. True si alguno tenía ids obsoletos."""
+    dropped = False
+    for c in CATALOGS.values():
+        dropped = c.forget_missing() or dropped
+    return dropped
+
+
+T = TypeVar("T")
+
+
+def retry_stale(run: Callable[[], T]) -> T:
+    """
+    run() es una transacción entera que usa ids del LRU. Si falla por
+    integridad y el LRU tenía ids de lugares borrados, los saca y la repite
+    una vez (la FK puede saltar en el INSERT o, si es DEFERRABLE, en el
+    commit). Dentro de otra transacción no se puede repetir: el error sube.
+    """
+    try:
+        return run()
+    except IntegrityError:
+        if transaction.get_connection().in_atomic_block or not forget_stale():
+            raise
+        return run()
+
+
+# ---------- señales (conectadas en AppConfig.ready) ----------
+def invalidate_catalog(sender, instance, created=False, **kwargs):
+    if created:  # una fila nueva no deja nada obsoleto
+        return
+    c = catalog_for(sender)
+    if c is not None and instance.pk is not None:
+        pk = instance.pk
+        # después del commit: si no, otro worker podría recargar el texto viejo
+        # bajo la versión nueva y quedarse con él hasta la próxima escritura
+        transaction.on_commit(lambda: c.invalidate(pk))
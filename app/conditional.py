@@ -0,0 +1,58 @@
+# app/conditional.py
+"""
+GET condicional (ETag / Last-Modified) para catálogos y detalles.
+
+El validador se arma con los tokens de app/versions.py antes de tocar la BD,
+así que un 304 no serializa nada y normalmente no hace ninguna query.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import versions
+
+
+def validators(request, tokens):
+    """(etag, last_modified) para estos tokens y esta URL/representación."""
+    accepted = getattr(request, "accepted_media_type", "") or ""
+    digest = hashlib.sha1("|".join([request.get_full_path(), accepted, *tokens]).encode()).hexdigest()
+    last_modified = int(max(versions.token_timestamp(t) for t in tokens))
+    return quote_etag(digest[:32]), last_modified
+
+
+def not_modified(request, tokens):
+    """Devuelve (respuesta 304/412 o None, etag, last_modified)."""
+    etag, last_modified = validators(request, tokens)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified), etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    if 200 <= response.status_code < 300:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Para viewsets cuyo serializer solo lee su propia tabla: la versión de la
+    tabla valida el list y la de la fila valida el retrieve.
+    """
+
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        tokens = versions.get_versions([versions.table_key(model)])
+        response, etag, last_modified = not_modified(request, tokens)
+        if response is not None:
+            return response
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        tokens = versions.get_versions([versions.row_key(model, pk)])
+        response, etag, last_modified = not_modified(request, tokens)
+        if response is not None:
+            return response
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
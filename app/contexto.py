@@ -0,0 +1,111 @@
+# app/contexto.py
+"""
+Contexto de conversación del bot: tenista + sus últimas solicitudes + sus
+reservas activas (con conductor), en una sola respuesta.
+
+Se arma con un número fijo de queries (una por lista, filtradas por
+tenista_id) y se guarda en el cache por poco tiempo. Las escrituras de
+Solicitud / Reserva / Tenista borran la entrada del tenista (señales y, para
+el webhook que escribe por SQL directo, app/ingest.py).
+"""
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import models
+
+ACTIVE = (models.ReservaEstado.PENDIENTE, models.ReservaEstado.ASIGNADA, models.ReservaEstado.EN_CURSO)
+
+
+def _key(tenista_id) -> str:
+    return f"contexto:tenista:{tenista_id}"
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _solicitud(sol: models.Solicitud) -> dict:
+    return {
+        "id": sol.id,
+        "estado": sol.estado,
+        "created_at": _iso(sol.created_at),
+        "pasajeros": sol.pasajeros,
+        "hora_salida": _iso(sol.hora_salida),
+        "observaciones": sol.observaciones,
+        "origen": getattr(sol.origen, "salida", None),
+        "destino": getattr(sol.destino, "lugar", None),
+    }
+
+
+def _reserva(res: models.Reserva) -> dict:
+    c = res.conductor
+    return {
+        "id": res.id,
+        "solicitud_id": res.solicitud_id,
+        "estado": res.estado,
+        "fecha_hora_agendada": _iso(res.fecha_hora_agendada),
+        "origen": getattr(res.solicitud.origen, "salida", None),
+        "destino": getattr(res.solicitud.destino, "lugar", None),
+        "conductor": None if c is None else {
+            "id": c.id, "nombre": c.nombre, "apellido": c.apellido,
+            "patente": c.patente, "telefono": c.telefono,
+        },
+    }
+
+
+def build(tenista_id) -> dict:
+    """Dos queries: últimas solicitudes y reservas activas del tenista."""
+    limit = getattr(settings, "CONTEXTO_MAX_SOLICITUDES", 20)
+    solicitudes = (models.Solicitud.objects
+                   .filter(tenista_id=tenista_id)
+                   .select_related("origen", "destino")
+                   .order_by("-id")[:limit])
+    reservas = (models.Reserva.objects
+                .filter(solicitud__tenista_id=tenista_id, estado__in=ACTIVE)
+                .select_related("conductor", "solicitud__origen", "solicitud__destino")
+                .order_by("fecha_hora_agendada", "id"))
+    return {
+        "solicitudes": [_solicitud(s) for s in solicitudes],
+        "reservas": [_reserva(r) for r in reservas],
+    }
+
+
+def for_tenista(tenista_id) -> dict:
+    key = _key(tenista_id)
+    data = cache.get(key)
+    if data is None:
+        data = build(tenista_id)
+        cache.set(key, data, getattr(settings, "CONTEXTO_TTL", 30))
+    return data
+
+
+def forget(tenista_ids: Iterable):
+    keys = [_key(pk) for pk in set(tenista_ids) if pk is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+# ---------- señales (conectadas en AppConfig.ready) ----------
+# Van después del commit, como en app/versions.py. Si una solicitud cambia de
+# tenista, el contexto del anterior queda viejo hasta que vence el TTL.
+def forget_tenista(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: forget([pk]))
+
+
+def forget_solicitud(sender, instance, **kwargs):
+    tenista_id = instance.tenista_id
+    transaction.on_commit(lambda: forget([tenista_id]))
+
+
+def forget_reserva(sender, instance, **kwargs):
+    solicitud_id = instance.solicitud_id
+
+    def on_commit():
+        tenista_id = (models.Solicitud.objects.filter(pk=solicitud_id)
+                      .values_list("tenista_id", flat=True).first())
+        forget([tenista_id])
+    transaction.on_commit(on_commit)
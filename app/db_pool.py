@@ -0,0 +1,66 @@
+# app/db_pool.py
+"""
+Estadísticas de las conexiones a la BD de este worker (/api/api/db/pool/).
+
+Con PG_POOL=1 salen del pool de psycopg3 (ConnectionPool.get_stats()):
+checkouts, cuántos tuvieron que esperar y cuánto, timeouts y el tamaño actual
+del pool. Con conexiones persistentes (PG_POOL=0) no hay cola de espera que
+medir: se cuentan las conexiones físicas abiertas por este proceso, que
+crecen con la cantidad de threads y con las reconexiones después de
+PG_CONN_MAX_AGE. Si ese número sube con el tráfico, las conexiones no se
+están reusando.
+
+Los contadores son por proceso (como /api/api/catalogos/cache/).
+"""
+import os
+import threading
+
+from django.db import connections
+
+_lock = threading.Lock()
+_nuevas = {}  # alias -> conexiones físicas abiertas desde que arrancó el proceso
+
+# get_stats() de psycopg_pool -> nombres de acá
+_POOL_KEYS = {
+    "requests_num": "checkouts",
+    "requests_queued": "esperas",
+    "requests_wait_ms": "espera_ms",
+    "requests_errors": "timeouts",
+    "connections_num": "conexiones_nuevas",
+    "connections_errors": "errores_conexion",
+    "connections_lost": "conexiones_perdidas",
+    "pool_size": "tamano",
+    "pool_available": "disponibles",
+    "requests_waiting": "esperando",
+    "pool_min": "min",
+    "pool_max": "max",
+}
+
+
+def on_connection_created(sender, connection, **kwargs):
+    """Señal connection_created (conectada en AppConfig.ready)."""
+    with _lock:
+        _nuevas[connection.alias] = _nuevas.get(connection.alias, 0) + 1
+
+
+def _stats(alias: str) -> dict:
+    conn = connections[alias]
+    out = {"motor": conn.vendor}
+    pool = getattr(conn, "pool", None)
+    if pool is not None:
+        raw = pool.get_stats()
+        out["modo"] = "pool"
+        out.update({name: raw.get(key, 0) for key, name in _POOL_KEYS.items()})
+        out["timeout_s"] = pool.timeout
+        return out
+    max_age = conn.settings_dict.get("CONN_MAX_AGE", 0)
+    out["modo"] = "persistente" if max_age else "por_request"
+    out["conn_max_age"] = max_age
+    out["health_checks"] = conn.settings_dict.get("CONN_HEALTH_CHECKS", False)
+    with _lock:
+        out["conexiones_nuevas"] = _nuevas.get(alias, 0)
+    return out
+
+
+def stats() -> dict:
+    return {"pid": os.getpid(), "bases": {alias: _stats(alias) for alias in connections}}
@@ -0,0 +1,61 @@
+# app/eager.py
+"""
+Plan de eager loading derivado del árbol de serializers.
+
+Recorre los campos del serializer (y sus serializers anidados) y arma las
+listas de select_related / prefetch_related que necesita para no hacer N+1.
+Así, si se agrega un campo anidado nuevo, el viewset lo carga solo.
+"""
+from functools import lru_cache
+from typing import List, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _walk(serializer, model, prefix: str, in_prefetch: bool, select: List[str], prefetch: List[str]):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+        many = isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField))
+        target = getattr(field, "child", None) or getattr(field, "child_relation", None) or field
+        if isinstance(target, serializers.PrimaryKeyRelatedField) and not many:
+            continue  # usa <fk>_id, no consulta
+        if not isinstance(target, (serializers.BaseSerializer, serializers.RelatedField)):
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        path = prefix + field.source
+        to_many = many or model_field.many_to_many or model_field.one_to_many
+        if to_many or in_prefetch:
+            prefetch.append(path)
+        else:
+            select.append(path)
+        if isinstance(target, serializers.BaseSerializer):
+            _walk(target, model_field.related_model, path + "__", in_prefetch or to_many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def eager_plan(serializer_class) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(select_related, prefetch_related) para un ModelSerializer; se calcula una vez por clase."""
+    serializer = serializer_class()
+    select: List[str] = []
+    prefetch: List[str] = []
+    _walk(serializer, serializer.Meta.model, "", False, select, prefetch)
+    # select_related("a__b") ya incluye "a"
+    select = [s for s in select if not any(o.startswith(s + "__") for o in select)]
+    return tuple(select), tuple(prefetch)
+
+
+def apply_eager_plan(queryset, serializer_class):
+    select, prefetch = eager_plan(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
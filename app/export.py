@@ -0,0 +1,104 @@
+# app/export.py
+"""
+Export de solicitudes / reservas en NDJSON o CSV sin cargar todo en memoria.
+
+    GET /api/api/solicitudes/export/?formato=csv&estado=PENDIENTE&desde=2026-03-01
+    GET /api/api/reservas/export/?columnas=id,estado,conductor.nombre
+
+Usa los mismos filtros que el listado (search, ordering, estado, desde/hasta)
+y lee con values_list().iterator(chunk_size), que en Postgres va por un cursor
+del servidor: la memoria no crece con la cantidad de filas.
+
+Las columnas salen del serializer de lectura aplanado ("tenista.numero"); por
+defecto van todas menos los JSONField. ?columnas= elige cuáles y en qué orden.
+El cuerpo original del formulario (solicitud_raw) no se exporta.
+"""
+import csv
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from .fast_serializers import compiled
+from .renderers import dumps
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: write() devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _select(columns, requested: str):
+    if not requested:
+        return [c for c in columns if not c.json]
+    by_name = {c.name: c for c in columns}
+    names = [n.strip() for n in requested.split(",") if n.strip()]
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        raise ValidationError({"columnas": [f"Columnas inválidas: {', '.join(unknown)}"]})
+    return [by_name[n] for n in names]
+
+
+def _rows(queryset, columns):
+    convert = [(i, c.convert) for i, c in enumerate(columns) if c.convert is not None]
+    chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    for row in queryset.values_list(*[c.path for c in columns]).iterator(chunk_size=chunk_size):
+        if convert:
+            row = list(row)
+            for i, fn in convert:
+                row[i] = fn(row[i])
+        yield row
+
+
+def _ndjson(rows, names, chunk_size: int):
+    lines = []
+    for row in rows:
+        lines.append(dumps(dict(zip(names, row))))
+        if len(lines) >= chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def _csv(rows, names):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class ExportMixin:
+    """Agrega la acción `export` a un BaseViewSet con serializer de lectura."""
+
+    export_filename = None
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        fmt = request.query_params.get("formato", "ndjson").lower()
+        if fmt not in FORMATS:
+            raise ValidationError({"formato": [f"Formato inválido: {fmt!r} (ndjson o csv)"]})
+        columns = _select(compiled(self.get_serializer_class()).flat_columns(),
+                          request.query_params.get("columnas", ""))
+        names = [c.name for c in columns]
+        # los filtros validan acá, antes de empezar a mandar el cuerpo
+        rows = _rows(self.filter_queryset(self.get_queryset()), columns)
+
+        if fmt == "csv":
+            body = _csv(rows, names)
+        else:
+            body = _ndjson(rows, names, getattr(settings, "EXPORT_CHUNK_SIZE", 2000))
+        response = StreamingHttpResponse(body, content_type=FORMATS[fmt])
+        name = self.export_filename or self.get_queryset().model._meta.db_table
+        stamp = timezone.now().strftime("%Y%m%d-%H%M%S")
+        response["Content-Disposition"] = f'attachment; filename="{name}-{stamp}.{fmt}"'
+        return response
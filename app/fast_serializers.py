@@ -0,0 +1,256 @@
+# app/fast_serializers.py
+"""
+Serialización de solo lectura "compilada" para las listas.
+
+A partir de un ModelSerializer (p. ej. ReservaReadNestedSerializer) se arma una
+vez por clase un plan de accesores: qué atributo leer, si hay que convertirlo
+(fechas, horas) y qué serializers anidados recorrer. Después cada fila se
+convierte sin pasar por get_attribute / to_representation de cada Field, con
+la misma salida que el serializer de DRF (mismas claves, mismo orden, mismos
+formatos).
+
+También puede leer desde `.values_list()` en vez de instancias de modelo
+(CompiledSerializer.from_queryset), con lo que se evita armar los modelos.
+
+CompiledSerializer.sparse(fields, expand) arma un plan recortado (?fields= /
+?expand=, ver app/sparse.py) y dice qué columnas y joins necesita.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
+# Campos cuya representación es el mismo valor que viene de la BD
+_IDENTITY = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ModelField,
+)
+
+LEAF, PK, NESTED, GENERIC = range(4)
+
+
+def _converter(field) -> Optional[Callable[[Any], Any]]:
+    if isinstance(field, serializers.ChoiceField):
+        # solo si todas las opciones son strings (estado) la salida es el valor tal cual
+        if all(isinstance(k, str) for k in field.choices):
+            return None
+        return field.to_representation
+    if isinstance(field, serializers.JSONField):
+        return field.to_representation if field.binary else None
+    if isinstance(field, _IDENTITY):
+        return None
+    return field.to_representation
+
+
+def _compile(serializer) -> Tuple[tuple, ...]:
+    """[(nombre, tipo, atributo, conversor/subplan, columna)] en el orden de los fields."""
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        attrs = field.source_attrs
+        if len(attrs) != 1:
+            plan.append((name, GENERIC, None, field, None))
+        elif isinstance(field, serializers.ModelSerializer):
+            plan.append((name, NESTED, attrs[0], _compile(field), attrs[0]))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.use_pk_only_optimization():
+            attname = model._meta.get_field(attrs[0]).attname
+            plan.append((name, PK, attname, field, attname))
+        elif isinstance(field, serializers.RelatedField):
+            plan.append((name, GENERIC, None, field, None))
+        else:
+            plan.append((name, LEAF, attrs[0], _converter(field), attrs[0]))
+    return tuple(plan)
+
+
+def _represent(plan, instance) -> dict:
+    ret = {}
+    for name, kind, attr, extra, _ in plan:
+        if kind == LEAF:
+            value = getattr(instance, attr)
+            ret[name] = value if value is None or extra is None else extra(value)
+        elif kind == NESTED:
+            value = getattr(instance, attr)
+            ret[name] = None if value is None else _represent(extra, value)
+        elif kind == PK:
+            value = getattr(instance, attr)
+            ret[name] = None if value is None else extra.to_representation(PKOnlyObject(value))
+        else:
+            value = extra.get_attribute(instance)
+            check = value.pk if isinstance(value, PKOnlyObject) else value
+            ret[name] = None if check is None else extra.to_representation(value)
+    return ret
+
+
+def _columns(plan, prefix: str, model, out: List[str]) -> bool:
+    """Columnas para values_list(); False si el plan necesita instancias."""
+    for _, kind, attr, extra, column in plan:
+        if kind == GENERIC:
+            return False
+        if kind == NESTED:
+            related = model._meta.get_field(attr).related_model
+            out.append(f"{prefix}{attr}__{related._meta.pk.name}")  # para detectar NULL
+            if not _columns(extra, f"{prefix}{attr}__", related, out):
+                return False
+        else:
+            out.append(prefix + column)
+    return True
+
+
+def _build_from_row(plan, row, pos: int) -> Tuple[dict, int]:
+    ret = {}
+    for name, kind, _, extra, _ in plan:
+        if kind == NESTED:
+            pk = row[pos]
+            sub, pos = _build_from_row(extra, row, pos + 1)
+            ret[name] = None if pk is None else sub
+            continue
+        value = row[pos]
+        pos += 1
+        if kind == PK:
+            ret[name] = None if value is None else extra.to_representation(PKOnlyObject(value))
+        else:
+            ret[name] = value if value is None or extra is None else extra(value)
+    return ret, pos
+
+
+def _nullable(fn):
+    return lambda value: None if value is None else fn(value)
+
+
+class FlatColumn(NamedTuple):
+    name: str        # "solicitud.tenista.numero"
+    path: str        # "solicitud__tenista__numero" (para values_list)
+    convert: Optional[Callable[[Any], Any]]  # ya contempla None (FK anidada nula)
+    json: bool       # JSONField: no va en los exports por defecto
+
+
+def _flat(plan, model, name_prefix: str, path_prefix: str, out: List[FlatColumn]):
+    for name, kind, attr, extra, column in plan:
+        if kind == GENERIC:
+            continue
+        if kind == NESTED:
+            related = model._meta.get_field(attr).related_model
+            _flat(extra, related, f"{name_prefix}{name}.", f"{path_prefix}{attr}__", out)
+            continue
+        convert = None if kind == PK or extra is None else _nullable(extra)
+        is_json = isinstance(model._meta.get_field(attr), models.JSONField)
+        out.append(FlatColumn(name_prefix + name, path_prefix + column, convert, is_json))
+
+
+# {"solicitud": {"tenista": {}}, "id": {}}: {} = sin sub-selección
+Tree = Dict[str, "Tree"]
+
+
+def _sparse(plan, model, fields: Optional[Tree], expand: Tree, prefix: str, errors: List[str]) -> tuple:
+    """
+    Recorta el plan: solo los campos de `fields` (None = todos) y los anidados
+    que estén en `expand` o tengan sub-campos pedidos; el resto de las
+    relaciones sale como su id.
+    """
+    known = {entry[0] for entry in plan}
+    errors += [f"{prefix}{name}" for name in sorted({*(fields or ()), *expand} - known)]
+    out = []
+    for entry in plan:
+        name, kind, attr, extra, column = entry
+        if kind != NESTED and (name in expand or (fields or {}).get(name)):
+            errors.append(f"{prefix}{name} (no es una relación)")
+        if fields is not None and name not in fields:
+            continue
+        if kind != NESTED:
+            out.append(entry)
+            continue
+        field = model._meta.get_field(attr)
+        sub_fields = (fields or {}).get(name) or None
+        if name in expand or sub_fields:
+            sub = _sparse(extra, field.related_model, sub_fields, expand.get(name, {}), f"{prefix}{name}.", errors)
+            out.append((name, NESTED, attr, sub, column))
+        elif field.concrete:
+            out.append((name, LEAF, field.attname, None, field.attname))
+        else:
+            out.append(entry)  # relación inversa: no hay un id propio que mostrar
+    return tuple(out)
+
+
+def _query(plan, model, prefix: str, only: List[str], select: List[str]) -> bool:
+    """Columnas para only() y joins para select_related(); False si hay campos GENERIC."""
+    for _, kind, attr, extra, column in plan:
+        if kind == GENERIC:
+            return False
+        if kind != NESTED:
+            only.append(prefix + column)
+            continue
+        field = model._meta.get_field(attr)
+        if field.concrete:
+            only.append(prefix + attr)
+        select.append(prefix + attr)
+        if not _query(extra, field.related_model, f"{prefix}{attr}__", only, select):
+            return False
+    return True
+
+
+def _freeze(tree: Optional[Tree]):
+    return None if tree is None else tuple(sorted((k, _freeze(v)) for k, v in tree.items()))
+
+
+def _thaw(frozen) -> Optional[Tree]:
+    return None if frozen is None else {k: _thaw(v) for k, v in frozen}
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, plan=None):
+        serializer = serializer_class()
+        self.serializer_class = serializer_class
+        self.model = serializer.Meta.model
+        self.plan = _compile(serializer) if plan is None else plan
+        columns: List[str] = []
+        self.values_columns = columns if _columns(self.plan, "", self.model, columns) else None
+        only: List[str] = []
+        self.select_related: List[str] = []
+        # None = el plan necesita instancias completas (no se puede recortar el SELECT)
+        self.only = only if _query(self.plan, self.model, "", only, self.select_related) else None
+
+    def sparse(self, fields: Optional[Tree], expand: Tree) -> "CompiledSerializer":
+        """Versión recortada para ?fields= / ?expand=. ValueError con los nombres desconocidos."""
+        return _sparse_cached(self.serializer_class, _freeze(fields), _freeze(expand))
+
+    def to_representation(self, instance) -> dict:
+        return _represent(self.plan, instance)
+
+    def many(self, instances) -> List[dict]:
+        plan = self.plan
+        return [_represent(plan, obj) for obj in instances]
+
+    def flat_columns(self) -> List[FlatColumn]:
+        """Hojas del árbol (anidados aplanados con puntos), para exports tabulares."""
+        out: List[FlatColumn] = []
+        _flat(self.plan, self.model, "", "", out)
+        return out
+
+    def from_queryset(self, queryset) -> List[dict]:
+        """Serializa leyendo tuplas con values_list() (sin instanciar modelos)."""
+        if self.values_columns is None:
+            return self.many(queryset)
+        plan = self.plan
+        return [_build_from_row(plan, row, 0)[0] for row in queryset.values_list(*self.values_columns)]
+
+
+@lru_cache(maxsize=None)
+def compiled(serializer_class) -> CompiledSerializer:
+    return CompiledSerializer(serializer_class)
+
+
+# acotado: las combinaciones vienen de la query string
+@lru_cache(maxsize=256)
+def _sparse_cached(serializer_class, fields, expand) -> CompiledSerializer:
+    base = compiled(serializer_class)
+    errors: List[str] = []
+    plan = _sparse(base.plan, base.model, _thaw(fields), _thaw(expand) or {}, "", errors)
+    if errors:
+        raise ValueError(*errors)
+    return CompiledSerializer(serializer_class, plan)
@@ -0,0 +1,64 @@
+# app/filters.py
+"""
+Filtros por estado y rango de fechas para solicitudes y reservas:
+
+    ?estado=PENDIENTE,ASIGNADA   (uno o varios, separados por coma)
+    ?desde=2026-03-01            (incluido; fecha o fecha-hora ISO)
+    ?hasta=2026-03-31            (una fecha sola incluye todo ese día)
+
+La fecha filtrada es `date_filter_field` del viewset (created_at,
+fecha_hora_agendada...). Los usan tanto los listados como los exports.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def _is_date(value) -> bool:
+    try:
+        return parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+def _parse(param, value, end: bool):
+    # parse_datetime también acepta "2026-03-31" (medianoche), así que la fecha sola va primero
+    if _is_date(value):
+        # ?hasta=fecha incluye el día completo: < medianoche del día siguiente
+        d = parse_date(value)
+        dt = datetime.combine(d + timedelta(days=1) if end else d, time.min)
+    else:
+        try:
+            dt = parse_datetime(value)
+        except ValueError:
+            dt = None
+        if dt is None:
+            raise ValidationError({param: [f"Fecha inválida: {value!r} (usar YYYY-MM-DD o ISO 8601)"]})
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+class EstadoFechaFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        estados = [e.strip().upper() for e in params.get("estado", "").split(",") if e.strip()]
+        if estados:
+            valid = {choice for choice, _ in queryset.model._meta.get_field("estado").choices}
+            unknown = [e for e in estados if e not in valid]
+            if unknown:
+                raise ValidationError({"estado": [f"Estado inválido: {', '.join(unknown)}"]})
+            queryset = queryset.filter(estado__in=estados)
+
+        field = getattr(view, "date_filter_field", None)
+        if field:
+            if params.get("desde"):
+                queryset = queryset.filter(**{f"{field}__gte": _parse("desde", params["desde"], end=False)})
+            if params.get("hasta"):
+                hasta = params["hasta"]
+                lookup = "lt" if _is_date(hasta) else "lte"
+                queryset = queryset.filter(**{f"{field}__{lookup}": _parse("hasta", hasta, end=True)})
+        return queryset
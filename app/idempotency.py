@@ -0,0 +1,196 @@
+# app/idempotency.py
+"""
+Idempotencia del webhook: n8n reintenta por timeout y cada reintento creaba
+otra Solicitud con el mismo raw_form.
+
+La clave sale, en este orden, del header Idempotency-Key, del id del mensaje
+de WhatsApp que venga en el body o de un hash canónico del payload. La primera
+request que "reclama" la clave (INSERT ... ON CONFLICT sobre el índice único de
+webhook_idempotencia) crea la Solicitud y guarda el cuerpo 201 en la misma
+transacción; las demás devuelven ese cuerpo sin escribir nada. Si dos llegan
+a la vez, Postgres hace esperar a la segunda en el índice único hasta que la
+primera confirma.
+
+El batch y el inbox (al procesarlo) usan las mismas claves con run_many(): un
+mensaje que ya entró por un camino no se vuelve a crear por otro. Ahí las
+claves salen del id del mensaje o del hash de cada item (no hay header por
+item) y se reclaman todas con un solo INSERT ... ON CONFLICT.
+
+El cuerpo también queda en el cache, así que un reintento normal no toca la
+BD. Las claves valen WEBHOOK_IDEMPOTENCY_TTL segundos (0 lo desactiva);
+`manage.py purge_idempotencia` borra las vencidas.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import models
+from .ingest import _upsert
+
+# donde n8n / la API de WhatsApp dejan el id del mensaje ("wamid....")
+_MESSAGE_ID_FIELDS = ("message_id", "messageId", "wamid")
+_MAX_HEADER = 200
+
+
+def ttl() -> int:
+    return getattr(settings, "WEBHOOK_IDEMPOTENCY_TTL", 24 * 3600)
+
+
+def _message_id(body: Dict[str, Any]) -> Optional[str]:
+    for field in _MESSAGE_ID_FIELDS:
+        if body.get(field):
+            return str(body[field])
+    messages = body.get("messages")
+    if isinstance(messages, list) and messages and isinstance(messages[0], dict) and messages[0].get("id"):
+        return str(messages[0]["id"])
+    return None
+
+
+def key_for(header: Optional[str], body: Dict[str, Any]) -> Optional[str]:
+    """Clave de idempotencia de la request (None si está desactivada)."""
+    if ttl() <= 0:
+        return None
+    header = (header or "").strip()
+    if header:
+        return "h:" + header[:_MAX_HEADER]
+    message_id = _message_id(body)
+    if message_id:
+        return "m:" + message_id[:_MAX_HEADER]
+    # el token de prueba (DEBUG) no es parte del formulario
+    payload = {k: v for k, v in body.items() if k != "token"}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return "p:" + hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cache_key(key: str) -> str:
+    return "idem:" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def cached(key: Optional[str]) -> Optional[dict]:
+    return cache.get(_cache_key(key)) if key else None
+
+
+async def acached(key: Optional[str]) -> Optional[dict]:
+    return await cache.aget(_cache_key(key)) if key else None
+
+
+async def astored(key: Optional[str]) -> Optional[dict]:
+    """
+    La respuesta guardada de una clave vigente, con el ORM async y sin
+    reclamar nada (el reintento que no estaba en el cache). Queda en el cache.
+    """
+    if not key:
+        return None
+    cutoff = timezone.now() - timedelta(seconds=ttl())
+    body = await (models.WebhookIdempotencia.objects
+                  .filter(clave=key, created_at__gte=cutoff, respuesta__isnull=False)
+                  .values_list("respuesta", flat=True).afirst())
+    if body is not None:
+        await cache.aset(_cache_key(key), body, ttl())
+    return body
+
+
+def _claim_many(keys: Sequence[str]) -> Dict[str, int]:
+    """{clave: id de la fila} de las que esta request se quedó (nuevas o vencidas), en un INSERT."""
+    if not keys:
+        return {}
+    now = timezone.now()
+    adapt = connection.ops.adapt_datetimefield_value
+    t = connection.ops.quote_name(models.WebhookIdempotencia._meta.db_table)
+    rows = _upsert(
+        models.WebhookIdempotencia, ["clave", "created_at"], [(key, adapt(now)) for key in keys],
+        conflict="clave",
+        updates="created_at = EXCLUDED.created_at, solicitud_id = NULL, respuesta = NULL",
+        returning=["clave", "id"],
+        where=f"{t}.created_at < %s", where_params=[adapt(now - timedelta(seconds=ttl()))],
+    )
+    return dict(rows)
+
+
+def _claim(key: str) -> Optional[int]:
+    """id de la fila si esta request se quedó con la clave (nueva o vencida); None si ya es de otra."""
+    return _claim_many([key]).get(key)
+
+
+def run(key: Optional[str], create: Callable[[], Tuple[int, dict]]) -> Tuple[dict, bool]:
+    """
+    Ejecuta create() -> (solicitud_id, cuerpo) una sola vez por clave.
+    Devuelve (cuerpo, es_repetida).
+    """
+    if key is None:
+        return create()[1], False
+    with transaction.atomic():
+        claimed = _claim(key)
+        if claimed is None:
+            body = (models.WebhookIdempotencia.objects
+                    .filter(clave=key).values_list("respuesta", flat=True).first())
+            replayed = True
+        else:
+            solicitud_id, body = create()
+            models.WebhookIdempotencia.objects.filter(pk=claimed).update(solicitud_id=solicitud_id, respuesta=body)
+            replayed = False
+        transaction.on_commit(lambda: cache.set(_cache_key(key), body, ttl()))
+    return body, replayed
+
+
+def run_many(keys: Sequence[Optional[str]], create: Callable[[List[int]], List[Tuple[int, dict]]],
+             use_cache: bool = True) -> List[Tuple[Optional[int], dict, bool]]:
+    """
+    run() para un lote: create(posiciones) crea solo los items que hacen falta
+    (una vez por clave; una clave repetida en el lote repite la primera) y
+    devuelve (solicitud_id, cuerpo) de cada uno, en ese orden.
+    Devuelve (solicitud_id, cuerpo, es_repetida) por item. Las queries no
+    dependen del tamaño del lote: reclamar, leer las ya usadas y guardar.
+    """
+    out: List[Optional[Tuple[Optional[int], dict, bool]]] = [None] * len(keys)
+    hits = cache.get_many([_cache_key(k) for k in keys if k]) if use_cache else {}
+    first: Dict[str, int] = {}
+    for i, key in enumerate(keys):
+        if key is None:
+            continue
+        body = hits.get(_cache_key(key))
+        if body is not None:
+            out[i] = (body["solicitud"]["id"], body, True)
+        else:
+            first.setdefault(key, i)
+    if all(o is not None for o in out):
+        return out  # todo repetido y en el cache: sin tocar la BD
+
+    with transaction.atomic():
+        claimed = _claim_many(list(first))
+        stored = {}
+        if len(claimed) < len(first):
+            stored = {clave: (sid, body) for clave, sid, body in models.WebhookIdempotencia.objects
+                      .filter(clave__in=[k for k in first if k not in claimed])
+                      .values_list("clave", "solicitud_id", "respuesta")}
+        nuevas = [i for i, key in enumerate(keys)
+                  if out[i] is None and (key is None or (key in claimed and first[key] == i))]
+        creadas = dict(zip(nuevas, create(nuevas)))
+        for i, key in enumerate(keys):
+            if i in creadas:
+                out[i] = (*creadas[i], False)
+            elif out[i] is None:
+                j = first[key]
+                out[i] = (*creadas[j], True) if j in creadas else (*stored[key], True)
+        rows = [models.WebhookIdempotencia(pk=claimed[keys[i]], solicitud_id=sid, respuesta=body)
+                for i, (sid, body) in creadas.items() if keys[i] is not None]
+        if rows:
+            models.WebhookIdempotencia.objects.bulk_update(rows, ["solicitud", "respuesta"])
+        # las nuevas y las que ya estaban (como run()), para el próximo reintento
+        fresh = {_cache_key(keys[i]): body for i, (_, body, _) in enumerate(out)
+                 if keys[i] is not None and body is not None}
+        if fresh:
+            transaction.on_commit(lambda: cache.set_many(fresh, ttl()))
+    return out
+
+
+def purge(older_than: timedelta = None) -> int:
+    cutoff = timezone.now() - (older_than or timedelta(seconds=ttl()))
+    deleted, _ = models.WebhookIdempotencia.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
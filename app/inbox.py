@@ -0,0 +1,157 @@
+# app/inbox.py
+"""
+Inbox durable del webhook ("aceptar rápido").
+
+El endpoint solo guarda el cuerpo crudo en webhook_inbox (un INSERT) y
+contesta 202; `manage.py process_inbox` lo drena por lotes con
+SELECT ... FOR UPDATE SKIP LOCKED, así que se pueden correr varios workers
+sin que dos tomen la misma fila. Cada lote usa el mismo camino que el webhook
+síncrono (_parse_form + ingest_forms) y reclama las mismas claves de
+idempotencia (idempotency.run_many) en la transacción del lote: un mensaje que
+ya entró por otro camino (o dos veces al inbox) queda PROCESADO apuntando a la
+Solicitud que ya existía. La clave se reclama al procesar y no al aceptar, así
+el 202 sigue siendo un solo INSERT.
+
+Errores:
+  - cuerpo inválido (ValueError de _parse_form): ERROR de una, no se reintenta;
+  - cualquier otra excepción: se reintenta con backoff exponencial hasta
+    INBOX_MAX_ATTEMPTS, después queda en ERROR para revisarlo a mano.
+"""
+import random
+from datetime import timedelta
+from typing import Any, Dict, List, Sequence
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from . import idempotency, models
+from .catalog import forget_stale, retry_stale
+from .ingest import ingest_forms
+
+Estado = models.InboxEstado
+
+
+def accept(bodies: Sequence[Any]) -> List[int]:
+    """Guarda los cuerpos tal cual (un solo INSERT) y devuelve sus ids."""
+    now = timezone.now()
+    rows = models.WebhookInbox.objects.bulk_create([
+        models.WebhookInbox(body=body, received_at=now, disponible_en=now) for body in bodies
+    ])
+    return [r.id for r in rows]
+
+
+def backoff(intentos: int) -> timedelta:
+    """base * 2^(n-1) con jitter, acotado por INBOX_BACKOFF_MAX."""
+    base = getattr(settings, "INBOX_BACKOFF_BASE", 5)
+    cap = getattr(settings, "INBOX_BACKOFF_MAX", 600)
+    delay = min(cap, base * 2 ** max(intentos - 1, 0))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _parse(row):
+    from .webhooks import _parse_form  # webhooks importa este módulo
+    if not isinstance(row.body, dict):
+        raise ValueError("JSON inválido")
+    return _parse_form(row.body)
+
+
+def _done(row, solicitud_id, now):
+    row.estado, row.solicitud_id, row.procesado_at, row.error = Estado.PROCESADO, solicitud_id, now, None
+
+
+def _ingest(rows, forms) -> List[int]:
+    """Solicitudes de las filas (solo las que no entraron antes) y el id de cada una."""
+    from .webhooks import _serialize_solicitud
+
+    def create(nuevas):
+        # el mismo cuerpo que guarda el webhook: un replay por ahí lo devuelve tal cual
+        return [(sol.id, {"ok": True, "solicitud": _serialize_solicitud(sol)})
+                for sol in ingest_forms([forms[i] for i in nuevas])]
+
+    keys = [idempotency.key_for(None, row.body) for row in rows]
+    # sin cache: el id de la Solicitud sale de la fila de webhook_idempotencia
+    hechos = idempotency.run_many(keys, create, use_cache=False)
+    return [solicitud_id for solicitud_id, _, _ in hechos]
+
+
+def _failed(row, exc, now, retry: bool):
+    row.intentos += 1
+    row.error = f"{type(exc).__name__}: {exc}"[:2000]
+    if retry and row.intentos < getattr(settings, "INBOX_MAX_ATTEMPTS", 8):
+        row.disponible_en = now + backoff(row.intentos)
+    else:
+        row.estado, row.procesado_at = Estado.ERROR, now
+
+
+def drain(batch_size: int = None) -> Dict[str, int]:
+    """
+    Procesa un lote. Las filas quedan bloqueadas (FOR UPDATE SKIP LOCKED)
+    hasta el commit, que incluye las Solicitudes y el nuevo estado de la fila.
+    """
+    batch_size = batch_size or getattr(settings, "INBOX_BATCH", 200)
+    return retry_stale(lambda: _drain(batch_size))
+
+
+def _drain(batch_size: int) -> Dict[str, int]:
+    stats = {"tomadas": 0, "procesadas": 0, "invalidas": 0, "reintentos": 0, "errores": 0}
+    with transaction.atomic():
+        now = timezone.now()
+        rows = list(models.WebhookInbox.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(estado=Estado.PENDIENTE, disponible_en__lte=now)
+                    .order_by("id")[:batch_size])
+        if not rows:
+            return stats
+        stats["tomadas"] = len(rows)
+
+        valid, forms = [], []
+        for row in rows:
+            try:
+                forms.append(_parse(row))
+                valid.append(row)
+            except ValueError as exc:
+                _failed(row, exc, now, retry=False)
+                stats["invalidas"] += 1
+
+        try:
+            # todo el lote en un savepoint: el caso normal son pocas queries
+            for row, solicitud_id in zip(valid, _ingest(valid, forms)):
+                _done(row, solicitud_id, now)
+        except Exception as exc:
+            if isinstance(exc, IntegrityError):
+                forget_stale()  # un lugar borrado que el LRU todavía tenía
+            # algo del lote falló: de a uno, para aislar la fila culpable
+            for row, form in zip(valid, forms):
+                try:
+                    _done(row, _ingest([row], [form])[0], now)
+                except Exception as exc:
+                    _failed(row, exc, now, retry=True)
+        for row in valid:
+            if row.estado == Estado.PROCESADO:
+                stats["procesadas"] += 1
+            elif row.estado == Estado.PENDIENTE:
+                stats["reintentos"] += 1
+            else:
+                stats["errores"] += 1
+
+        models.WebhookInbox.objects.bulk_update(
+            rows, ["estado", "intentos", "disponible_en", "procesado_at", "error", "solicitud"],
+        )
+    return stats
+
+
+def lag() -> Dict[str, Any]:
+    """Cuánto se atrasó el inbox: pendientes, reintentos, errores y antigüedad del más viejo."""
+    now = timezone.now()
+    # dos queries, cada una con el mismo predicado que su índice parcial
+    agg = models.WebhookInbox.objects.filter(estado=Estado.PENDIENTE).aggregate(
+        pendientes=Count("id"),
+        reintentando=Count("id", filter=Q(intentos__gt=0)),
+        mas_viejo=Min("received_at"),
+    )
+    agg["errores"] = models.WebhookInbox.objects.filter(estado=Estado.ERROR).count()
+    oldest = agg.pop("mas_viejo")
+    agg["lag_segundos"] = round((now - oldest).total_seconds(), 3) if oldest else 0.0
+    return agg
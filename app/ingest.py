@@ -0,0 +1,197 @@
+# app/ingest.py
+"""
+Ingesta set-based de formularios ya normalizados (ver webhooks._parse_form).
+
+Tenista / Origen / Destino se resuelven con un INSERT ... ON CONFLICT por tabla
+(Origen/Destino pasan antes por el LRU de app.catalog) y las Solicitudes con
+un único bulk_create, así que el número de queries no depende del tamaño del
+lote.
+"""
+from __future__ import annotations
+import io
+from datetime import datetime, time
+from typing import Any, Dict, Iterable, List, Sequence, Union
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import contexto, lookup, models, raw_forms, resumen, versions
+from .catalog import catalog_for
+from .phones import e164
+
+
+def _upsert(model, columns: Sequence[str], rows: Sequence[Sequence[Any]],
+            conflict: Union[str, Sequence[str]], updates: str, returning: Sequence[str],
+            where: str = "", where_params: Sequence[Any] = ()) -> List[tuple]:
+    """
+    INSERT multi-fila con ON CONFLICT ... DO UPDATE ... RETURNING (Postgres y
+    SQLite >= 3.35). `conflict` es una columna o las de un índice único
+    compuesto. Con `where`, las filas en conflicto que no lo cumplen no se
+    tocan ni se devuelven.
+    """
+    qn = connection.ops.quote_name
+    conflict = [conflict] if isinstance(conflict, str) else conflict
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    sql = (
+        f"INSERT INTO {qn(model._meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES {', '.join([placeholders] * len(rows))} "
+        f"ON CONFLICT ({', '.join(qn(c) for c in conflict)}) DO UPDATE SET {updates} "
+        f"{'WHERE ' + where + ' ' if where else ''}"
+        f"RETURNING {', '.join(qn(c) for c in returning)}"
+    )
+    params = [v for row in rows for v in row] + list(where_params)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _copy_text(value) -> str:
+    """Un valor en el formato text de COPY."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, time)):
+        return value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_rows(table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+    """COPY ... FROM STDIN de las filas a `table` (solo Postgres)."""
+    qn = connection.ops.quote_name
+    sql = f"COPY {qn(table)} ({', '.join(qn(c) for c in columns)}) FROM STDIN"
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy"):  # psycopg 3: adapta cada valor en C
+            with raw.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:  # psycopg2
+            buf = io.StringIO("".join("\t".join(map(_copy_text, row)) + "\n" for row in rows))
+            raw.copy_expert(sql, buf)
+
+
+def upsert_tenistas(forms: Iterable[Dict[str, Any]]) -> Dict[str, models.Tenista]:
+    """
+    Crea o enriquece los tenistas (por numero) en un solo statement.
+    Igual que el webhook original: solo completa correo/apellido vacíos y el
+    nombre genérico "Tenista"; nunca pisa datos que ya existían.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for f in forms:
+        # Postgres no permite tocar la misma fila dos veces en un mismo
+        # ON CONFLICT, así que se deduplica antes combinando los datos.
+        cur = merged.setdefault(f["from_phone"], {
+            "nombre": f["form_nombres"],
+            "apellido": f["form_apellidos"] or "",
+            "correo": f["form_correo"],
+        })
+        if not cur["correo"] and f["form_correo"]:
+            cur["correo"] = f["form_correo"]
+        if cur["nombre"] in (None, "", "Tenista") and f["form_nombres"]:
+            cur["nombre"] = f["form_nombres"]
+        if not cur["apellido"] and f["form_apellidos"]:
+            cur["apellido"] = f["form_apellidos"]
+    if not merged:
+        return {}
+
+    t = connection.ops.quote_name(models.Tenista._meta.db_table)
+    updates = (
+        f"correo = CASE WHEN COALESCE({t}.correo, '') = '' "
+        f"THEN COALESCE(EXCLUDED.correo, {t}.correo) ELSE {t}.correo END, "
+        f"nombre = CASE WHEN COALESCE({t}.nombre, '') IN ('', 'Tenista') "
+        f"THEN EXCLUDED.nombre ELSE {t}.nombre END, "
+        f"apellido = CASE WHEN COALESCE({t}.apellido, '') = '' "
+        f"THEN EXCLUDED.apellido ELSE {t}.apellido END, "
+        # completa de a poco las filas que el backfill todavía no tocó
+        f"numero_e164 = COALESCE({t}.numero_e164, EXCLUDED.numero_e164)"
+    )
+    rows = [(d["nombre"], d["apellido"], d["correo"], numero, e164(numero)) for numero, d in merged.items()]
+    returned = _upsert(
+        models.Tenista, ["nombre", "apellido", "correo", "numero", "numero_e164"], rows,
+        conflict="numero", updates=updates,
+        returning=["id", "nombre", "apellido", "correo", "numero"],
+    )
+    out = {}
+    for pk, nombre, apellido, correo, numero in returned:
+        out[numero] = models.Tenista(id=pk, nombre=nombre, apellido=apellido, correo=correo, numero=numero)
+    # el upsert no dispara señales: invalida a mano los validadores HTTP, el
+    # cache de tenista_por_numero (incluidas las respuestas negativas) y el
+    # contexto del bot (cada formulario trae una solicitud nueva del tenista)
+    ids = [t.id for t in out.values()]
+    numeros = list(out)
+
+    def on_commit():
+        versions.bump_rows(models.Tenista, ids)
+        lookup.forget(numeros)
+        contexto.forget(ids)
+    transaction.on_commit(on_commit)
+    return out
+
+
+def resolve_catalog(model, field: str, values: Iterable[str]) -> Dict[str, Any]:
+    """
+    texto -> instancia de Origen/Destino. Primero el LRU del catálogo; solo los
+    textos que no están se crean/leen con un único INSERT ... ON CONFLICT.
+    """
+    values = list(dict.fromkeys(v for v in values if v))
+    if not values:
+        return {}
+    cache = catalog_for(model)
+    resolved = cache.ids_for(values)
+    missing = [v for v in values if v not in resolved]
+    if missing:
+        col = connection.ops.quote_name(field)
+        returned = dict(_upsert(
+            model, [field], [(v,) for v in missing],
+            conflict=field, updates=f"{col} = EXCLUDED.{col}",
+            returning=["id", field],
+        ))
+        fresh = {txt: pk for pk, txt in returned.items()}
+        def on_commit():
+            # solo se cachea si la transacción confirma (si no, el id no existiría)
+            cache.put_many(fresh)
+            versions.bump_tables(model)  # puede haber filas nuevas en el catálogo
+        transaction.on_commit(on_commit)
+        resolved.update(fresh)
+    return {txt: model(**{"id": pk, field: txt}) for txt, pk in resolved.items()}
+
+
+def ingest_forms(forms: Sequence[Dict[str, Any]], savepoint: bool = True) -> List[models.Solicitud]:
+    """
+    Inserta un lote de formularios y devuelve las Solicitudes en el mismo orden,
+    con tenista/origen/destino ya cargados en memoria (sin releer desde BD).
+    savepoint=False si el llamador ya abrió la transacción y no necesita
+    recuperarse de un error acá adentro (ahorra dos round trips).
+    """
+    if not forms:
+        return []
+    with transaction.atomic(savepoint=savepoint):
+        tenistas = upsert_tenistas(forms)
+        origenes = resolve_catalog(models.Origen, "salida", (f["origen_txt"] for f in forms))
+        destinos = resolve_catalog(models.Destino, "lugar", (f["destino_txt"] for f in forms))
+
+        now = timezone.now()
+        solicitudes = [
+            models.Solicitud(
+                form_nombres=f["form_nombres"],
+                form_apellidos=f["form_apellidos"] or "",
+                form_correo=f["form_correo"],
+                form_telefono=f["form_telefono"] or "",
+                pasajeros=f["pasajeros"],
+                hora_salida=f["hora_salida"],
+                observaciones=f["observaciones"],
+                origen=origenes.get(f["origen_txt"]),
+                destino=destinos.get(f["destino_txt"]),
+                tenista=tenistas[f["from_phone"]],
+                idioma_detectado="es",
+                estado=models.SolicitudEstado.NUEVA,
+                created_at=now,
+            )
+            for f in forms
+        ]
+        models.Solicitud.objects.bulk_create(solicitudes)
+        raw_forms.save_many((s.pk, f["raw"]) for s, f in zip(solicitudes, forms))
+        resumen.record_created(solicitudes)  # bulk_create no dispara señales
+    return solicitudes
@@ -0,0 +1,97 @@
+# app/lookup.py
+"""
+Búsqueda de tenista por teléfono con cache read-through.
+
+La clave es el número en E.164 (app.phones.e164). Se cachean también los
+"no existe" (con un TTL más corto) para que los mensajes repetidos de un
+número desconocido no vayan a la BD. El webhook y las señales de Tenista
+llaman a forget() después del commit para que un tenista recién creado
+aparezca de inmediato (y uno que cambió de número deje de aparecer en el viejo).
+"""
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import models
+from .phones import e164
+
+_MISSING = "__none__"
+
+
+def _key(numero_e164: str) -> str:
+    return f"tenista:e164:{numero_e164}"
+
+
+def tenista_dict(t: models.Tenista) -> dict:
+    return {"id": t.id, "nombre": t.nombre, "apellido": t.apellido, "correo": t.correo, "numero": t.numero}
+
+
+def _cached(value):
+    return None if value == _MISSING else value
+
+
+def tenista_por_numero(numero: str) -> Optional[dict]:
+    norm = e164(numero)
+    if not norm:
+        return None
+    key = _key(norm)
+    cached = cache.get(key)
+    if cached is not None:
+        return _cached(cached)
+
+    t = models.Tenista.objects.filter(numero_e164=norm).order_by("id").first()
+    if t is None:
+        # filas viejas que el backfill todavía no normalizó
+        t = models.Tenista.objects.filter(numero=numero).first()
+    cache.set(key, *_entry(t))
+    return None if t is None else tenista_dict(t)
+
+
+async def atenista_por_numero(numero: str) -> Optional[dict]:
+    """Igual que tenista_por_numero, con el ORM y el cache async."""
+    norm = e164(numero)
+    if not norm:
+        return None
+    key = _key(norm)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return _cached(cached)
+
+    t = await models.Tenista.objects.filter(numero_e164=norm).order_by("id").afirst()
+    if t is None:
+        t = await models.Tenista.objects.filter(numero=numero).afirst()
+    await cache.aset(key, *_entry(t))
+    return None if t is None else tenista_dict(t)
+
+
+def _entry(t: Optional[models.Tenista]):
+    """(valor, ttl) a guardar en el cache para este resultado."""
+    if t is None:
+        return _MISSING, getattr(settings, "TENISTA_LOOKUP_NEGATIVE_TTL", 60)
+    return tenista_dict(t), getattr(settings, "TENISTA_LOOKUP_TTL", 300)
+
+
+def forget(numeros: Iterable[str]):
+    keys = {_key(n) for n in map(e164, numeros) if n}
+    if keys:
+        cache.delete_many(list(keys))
+
+
+# ---------- señales (conectadas en AppConfig.ready) ----------
+def remember_numero(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: el número que tenía la fila en la BD antes de este save."""
+    instance._lookup_numero_antes = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and "numero" not in update_fields:
+        return
+    instance._lookup_numero_antes = sender.objects.filter(pk=instance.pk).values_list("numero", flat=True).first()
+
+
+def forget_instance(sender, instance, **kwargs):
+    # después del commit, como app/contexto.py: antes, una lectura concurrente
+    # volvería a cachear la fila vieja
+    numeros = [n for n in (instance.numero, getattr(instance, "_lookup_numero_antes", None)) if n]
+    transaction.on_commit(lambda: forget(numeros))
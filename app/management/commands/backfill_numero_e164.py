@@ -0,0 +1,32 @@
+# app/management/commands/backfill_numero_e164.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app import models
+from app.phones import e164
+
+
+class Command(BaseCommand):
+    help = "Completa tenista.numero_e164 en lotes por id (se puede cortar y volver a correr)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        pending = models.Tenista.objects.filter(numero_e164__isnull=True).order_by("id")
+        last_id, total = 0, 0
+        while True:
+            batch = list(pending.filter(id__gt=last_id).only("id", "numero")[:opts["batch"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for t in batch:
+                # None, como Tenista.save(): los que no se pueden normalizar se
+                # vuelven a leer en la próxima corrida, pero son pocos
+                t.numero_e164 = e164(t.numero)
+            # un lote por transacción: no bloquea la tabla entera
+            with transaction.atomic():
+                models.Tenista.objects.bulk_update(batch, ["numero_e164"])
+            total += len(batch)
+            self.stdout.write(f"{total} tenistas actualizados (hasta id {last_id})")
+        self.stdout.write(self.style.SUCCESS(f"Listo: {total} tenistas."))
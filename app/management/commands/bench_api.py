@@ -0,0 +1,258 @@
+# app/management/commands/bench_api.py
+"""
+Benchmarks de la API contra la BD configurada (idealmente cargada con
+`manage.py seed_data`). Corre en proceso con el test Client de Django, así que
+mide la vista + middlewares + render, sin red:
+
+  - webhook: whatsapp_webhook secuencial y con --concurrency hilos
+  - lista / búsqueda / orden (y cursor donde hay) de cada endpoint del router
+  - solicitud_detail, tenista_por_numero y conductores/disponibles
+
+Por escenario guarda p50/p95/p99/media en ms, queries por request y errores.
+
+    python manage.py bench_api --save-baseline bench/baseline.json
+    python manage.py bench_api --baseline bench/baseline.json --threshold 0.25
+
+Con --baseline termina con error si algún escenario empeora: p95 más de
+--threshold (y más de --min-ms) o más queries por request que la línea base.
+
+El webhook escribe de verdad (una Solicitud por request). Los payloads salen de
+--replay (JSON / NDJSON con cuerpos capturados), de los últimos solicitud_raw de la
+BD (--replay-db) o, si no hay, se arman sintéticos. Cada POST lleva su propio
+Idempotency-Key para que los repetidos no se respondan desde el cache.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from app import models, raw_forms
+from app.parsers import loads
+from app.urls import router
+
+WEBHOOK_URL = "/api/webhooks/whatsapp/"
+BASELINE_VERSION = 1
+
+# (method, path, body) de una request
+Request = Tuple[str, str, Optional[dict]]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _summary(latencies: List[float], queries: List[int], errors: int) -> dict:
+    return {
+        "n": len(latencies),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+        "queries": round(statistics.fmean(queries), 2) if queries else 0.0,
+        "errors": errors,
+    }
+
+
+class Command(BaseCommand):
+    help = "Latencia (p50/p95/p99) y queries por request de los endpoints calientes, con línea base."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="requests medidas por escenario")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--concurrency", type=int, default=8, help="hilos del escenario webhook_concurrente")
+        parser.add_argument("--only", default=None, help="solo escenarios cuyo nombre contenga este texto")
+        parser.add_argument("--replay", default=None, help="archivo JSON (array) o NDJSON con cuerpos del webhook")
+        parser.add_argument("--replay-db", type=int, default=200, help="últimos cuerpos de solicitud_raw a reusar")
+        parser.add_argument("--save-baseline", default=None, help="escribe los resultados en este archivo")
+        parser.add_argument("--baseline", default=None, help="compara contra este archivo")
+        parser.add_argument("--threshold", type=float, default=0.25, help="empeoramiento tolerado del p95 (0.25 = 25%%)")
+        parser.add_argument("--min-ms", type=float, default=1.0, help="diferencias de p95 menores a esto son ruido")
+        parser.add_argument("--seed", type=int, default=1)
+
+    # ---------- escenarios ----------
+    def _payloads(self, opts) -> List[dict]:
+        if opts["replay"]:
+            text = Path(opts["replay"]).read_text(encoding="utf-8").strip()
+            items = loads(text) if text.startswith("[") else [loads(line) for line in text.splitlines() if line.strip()]
+            items = [i for i in items if isinstance(i, dict)]
+            if not items:
+                raise CommandError(f"{opts['replay']}: no hay payloads")
+            return items
+        if opts["replay_db"]:
+            rows = (models.SolicitudRaw.objects.order_by("-solicitud_id")
+                    .values_list("body", "body_zlib")[:opts["replay_db"]])
+            items = [raw_forms.unpack(body, body_zlib) for body, body_zlib in rows]
+            items = [i for i in items if isinstance(i, dict) and i.get("from_phone")]
+            if items:
+                return items
+        return [{"from_phone": f"+999{n:09d}", "nombres": "Bench", "origen": "Hotel", "destino": "Club"}
+                for n in range(100)]
+
+    def _lists(self) -> Dict[str, Callable[[], Request]]:
+        out = {}
+        for prefix, viewset, _ in router.registry:
+            model = viewset.queryset.model
+            url = f"/api/api/{prefix}/"
+            out[f"lista:{prefix}"] = lambda url=url: ("GET", url, None)
+
+            plain = [f for f in getattr(viewset, "search_fields", []) if "__" not in f]
+            if plain:
+                value = model.objects.order_by("id").values_list(plain[0], flat=True).first()
+                if value:
+                    q = urlencode({"search": str(value)[:4]})
+                    out[f"busqueda:{prefix}"] = lambda url=url, q=q: ("GET", f"{url}?{q}", None)
+            ordering = [f for f in getattr(viewset, "ordering_fields", []) if f != "id"] or ["id"]
+            out[f"orden:{prefix}"] = lambda url=url, o=ordering[0]: ("GET", f"{url}?ordering=-{o}", None)
+            if getattr(viewset, "keyset_pagination_class", None):
+                out[f"cursor:{prefix}"] = lambda url=url: ("GET", f"{url}?paginacion=cursor", None)
+        return out
+
+    def scenarios(self, opts) -> Dict[str, Tuple[Callable[[], Request], int]]:
+        """nombre -> (generador de requests, concurrencia)."""
+        rng = random.Random(opts["seed"])
+        payloads = self._payloads(opts)
+        webhook = lambda: ("POST", WEBHOOK_URL, rng.choice(payloads))  # noqa: E731
+
+        out = {"webhook": (webhook, 1), "webhook_concurrente": (webhook, opts["concurrency"])}
+        out.update({name: (fn, 1) for name, fn in self._lists().items()})
+
+        sol_ids = list(models.Solicitud.objects.order_by("-id").values_list("id", flat=True)[:500])
+        if sol_ids:
+            out["solicitud_detail"] = (lambda: ("GET", f"/api/solicitudes/{rng.choice(sol_ids)}/", None), 1)
+        fechas = list(models.Reserva.objects.order_by("-id").values_list("fecha_hora_agendada", flat=True)[:500])
+        if fechas:
+            # un día completo de torneo y una franja puntual
+            def dia():
+                d = rng.choice(fechas).date().isoformat()
+                return "GET", "/api/api/conductores/disponibles/?" + urlencode({"desde": d, "hasta": d}), None
+            out["conductores_disponibles_dia"] = (dia, 1)
+            out["conductores_disponibles"] = (lambda: (
+                "GET", "/api/api/conductores/disponibles/?" + urlencode({"desde": rng.choice(fechas).isoformat()}),
+                None), 1)
+        numeros = list(models.Tenista.objects.order_by("-id").values_list("numero", flat=True)[:500])
+        if numeros:
+            out["tenista_por_numero"] = (lambda: (
+                "GET", "/api/api/tenistas/por-numero/?" + urlencode({"numero": rng.choice(numeros)}), None), 1)
+        return out
+
+    # ---------- medición ----------
+    def _client(self):
+        return Client(SERVER_NAME="localhost", HTTP_X_WEBHOOK_TOKEN=getattr(settings, "WEBHOOK_TOKEN", "") or "")
+
+    def _send(self, client, req: Request):
+        method, path, body = req
+        if method == "POST":
+            return client.post(path, json.dumps(body), content_type="application/json",
+                               HTTP_IDEMPOTENCY_KEY=f"bench-{uuid.uuid4().hex}")
+        return client.get(path)
+
+    def _measure(self, make: Callable[[], Request], n: int, concurrency: int, warmup: int) -> dict:
+        lock = threading.Lock()
+        latencies: List[float] = []
+        queries: List[int] = []
+        errors = 0
+
+        def worker(count):
+            nonlocal errors
+            client = self._client()
+            try:
+                for i in range(count):
+                    with lock:
+                        req = make()
+                    with CaptureQueriesContext(connection) as ctx:
+                        t0 = time.perf_counter()
+                        resp = self._send(client, req)
+                        elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        queries.append(len(ctx.captured_queries))
+                        errors += resp.status_code >= 400
+            finally:
+                if concurrency > 1:
+                    connection.close()  # cada hilo abre su propia conexión
+
+        client = self._client()
+        for _ in range(warmup):
+            self._send(client, make())
+        if concurrency == 1:
+            worker(n)
+        else:
+            per = [n // concurrency + (i < n % concurrency) for i in range(concurrency)]
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(worker, per))
+        return _summary(latencies, queries, errors)
+
+    # ---------- línea base ----------
+    def _compare(self, results: dict, baseline: dict, opts) -> List[str]:
+        problems = []
+        base = baseline.get("scenarios", {})
+        for name, cur in results.items():
+            ref = base.get(name)
+            if cur["errors"]:
+                problems.append(f"{name}: {cur['errors']} respuestas con error")
+            if ref is None:
+                continue
+            limit = ref["p95_ms"] * (1 + opts["threshold"])
+            if cur["p95_ms"] > limit and cur["p95_ms"] - ref["p95_ms"] > opts["min_ms"]:
+                problems.append(f"{name}: p95 {cur['p95_ms']:.2f} ms > {limit:.2f} ms (base {ref['p95_ms']:.2f})")
+            if cur["queries"] > ref["queries"] + 0.5:
+                problems.append(f"{name}: {cur['queries']} queries/request (base {ref['queries']})")
+        return problems
+
+    def handle(self, *args, **opts):
+        baseline = None
+        if opts["baseline"]:
+            try:
+                baseline = json.loads(Path(opts["baseline"]).read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"No se pudo leer la línea base: {exc}")
+
+        results = {}
+        for name, (make, concurrency) in self.scenarios(opts).items():
+            if opts["only"] and opts["only"] not in name:
+                continue
+            results[name] = stats = self._measure(make, opts["requests"], concurrency, opts["warmup"])
+            ref = (baseline or {}).get("scenarios", {}).get(name)
+            delta = f"  (base p95 {ref['p95_ms']:.2f})" if ref else ""
+            self.stdout.write(
+                f"{name:<28} p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  "
+                f"p99 {stats['p99_ms']:>8.2f} ms  {stats['queries']:>5} q/req  err {stats['errors']}{delta}"
+            )
+
+        if opts["save_baseline"]:
+            path = Path(opts["save_baseline"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({
+                "version": BASELINE_VERSION,
+                "created": datetime.now(dt_timezone.utc).isoformat(),
+                "db": connection.vendor,
+                "django": django.get_version(),
+                "requests": opts["requests"],
+                "scenarios": results,
+            }, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            self.stdout.write(f"Resultados guardados en {path}")
+
+        if baseline is not None:
+            problems = self._compare(results, baseline, opts)
+            if problems:
+                for p in problems:
+                    self.stderr.write(p)
+                raise CommandError(f"{len(problems)} regresiones contra {opts['baseline']}")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones contra la línea base."))
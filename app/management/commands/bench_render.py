@@ -0,0 +1,65 @@
+# app/management/commands/bench_render.py
+import gzip
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app import models
+from app.eager import apply_eager_plan
+from app.fast_serializers import compiled
+from app.renderers import FastJSONRenderer, orjson
+from app.serializers import ReservaReadNestedSerializer
+
+
+class Command(BaseCommand):
+    help = "Mide tiempo de render (json vs orjson) y bytes enviados (crudo / gzip / brotli) de una página de reservas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20, help="Filas por página (PAGE_SIZE por defecto es 20).")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def best(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    def handle(self, *args, **opts):
+        qs = apply_eager_plan(models.Reserva.objects.order_by("-id"), ReservaReadNestedSerializer)[:opts["rows"]]
+        rows = compiled(ReservaReadNestedSerializer).many(qs)
+        if not rows:
+            raise CommandError("No hay reservas en la BD")
+        data = {"count": len(rows), "next": None, "previous": None, "results": rows}
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        body = stdlib.render(data)
+        if fast.render(data) != body:
+            raise CommandError("FastJSONRenderer no produce la misma salida que JSONRenderer")
+
+        self.stdout.write(f"render de {len(rows)} reservas (mejor de {opts['repeat']}):")
+        t_std = self.best(lambda: stdlib.render(data), opts["repeat"])
+        self.stdout.write(f"  json (DRF)   {t_std * 1e6:>10.0f} µs")
+        if orjson is None:
+            self.stdout.write("  orjson       no instalado")
+        else:
+            t_fast = self.best(lambda: fast.render(data), opts["repeat"])
+            self.stdout.write(f"  orjson       {t_fast * 1e6:>10.0f} µs   x{t_std / t_fast:.1f}")
+
+        self.stdout.write("bytes en el cable:")
+        self.stdout.write(f"  sin comprimir {len(body):>10,}")
+        gz = gzip.compress(body)
+        self.stdout.write(f"  gzip          {len(gz):>10,}   {len(gz) / len(body):.0%}")
+        if brotli is None:
+            self.stdout.write("  brotli        no instalado")
+        else:
+            br = brotli.compress(body, quality=getattr(settings, "BROTLI_QUALITY", 5))
+            self.stdout.write(f"  brotli        {len(br):>10,}   {len(br) / len(body):.0%}")
@@ -0,0 +1,65 @@
+# app/management/commands/bench_serializers.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app import models
+from app.eager import apply_eager_plan
+from app.fast_serializers import compiled
+from app.serializers import ReservaReadNestedSerializer, SolicitudReadNestedSerializer
+
+TARGETS = {
+    "solicitudes": (models.Solicitud, SolicitudReadNestedSerializer),
+    "reservas": (models.Reserva, ReservaReadNestedSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = "Compara filas/s del serializer de DRF contra el serializer compilado (sobre datos de la BD)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Filas a serializar por corrida.")
+        parser.add_argument("--repeat", type=int, default=5, help="Corridas por variante (se toma la mejor).")
+        parser.add_argument("--only", choices=sorted(TARGETS), help="Medir solo un endpoint.")
+
+    def best(self, fn, repeat):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    def handle(self, *args, **opts):
+        rows, repeat = opts["rows"], opts["repeat"]
+        renderer = JSONRenderer()
+        for name, (model, serializer_class) in TARGETS.items():
+            if opts["only"] and name != opts["only"]:
+                continue
+            queryset = apply_eager_plan(model.objects.order_by("-id"), serializer_class)[:rows]
+            instances = list(queryset)
+            if not instances:
+                raise CommandError(f"No hay {name} en la BD (ver seed_data / cargar datos primero)")
+            fast = compiled(serializer_class)
+
+            expected = renderer.render(serializer_class(instances, many=True).data)
+            if renderer.render(fast.many(instances)) != expected:
+                raise CommandError(f"{name}: la salida compilada no es idéntica a la de DRF")
+            if renderer.render(fast.from_queryset(queryset)) != expected:
+                raise CommandError(f"{name}: la salida desde values_list no es idéntica a la de DRF")
+
+            n = len(instances)
+            results = [
+                # solo serialización (instancias ya cargadas)
+                ("drf", self.best(lambda: serializer_class(instances, many=True).data, repeat)),
+                ("compilado", self.best(lambda: fast.many(instances), repeat)),
+                # incluye la query: instancias vs tuplas
+                ("drf + query", self.best(lambda: serializer_class(list(queryset.all()), many=True).data, repeat)),
+                ("compilado + query", self.best(lambda: fast.many(list(queryset.all())), repeat)),
+                ("values_list + query", self.best(lambda: fast.from_queryset(queryset.all()), repeat)),
+            ]
+            base = results[0][1]
+            self.stdout.write(f"{name} ({n} filas, mejor de {repeat})")
+            for label, secs in results:
+                self.stdout.write(f"  {label:<22} {n / secs:>12,.0f} filas/s   x{base / secs:.1f} vs drf")
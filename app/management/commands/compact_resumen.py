@@ -0,0 +1,20 @@
+# app/management/commands/compact_resumen.py
+from django.core.management.base import BaseCommand
+
+from app import resumen
+
+
+class Command(BaseCommand):
+    help = "Pasa los deltas de resumen_delta a resumen_diario (correr seguido, p. ej. cada minuto por cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=resumen.LOTE, help="deltas por transacción")
+
+    def handle(self, *args, **opts):
+        total = 0
+        while True:
+            n = resumen.compactar(opts["lote"])
+            total += n
+            if n < opts["lote"]:
+                break
+        self.stdout.write(f"{total} deltas compactados.")
@@ -0,0 +1,99 @@
+# app/management/commands/explain_hot_queries.py
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app import models
+from app.eager import apply_eager_plan
+from app.serializers import ReservaReadNestedSerializer, SolicitudReadNestedSerializer
+from app.views import ReservaViewSet, SolicitudViewSet
+
+
+def hot_queries():
+    """Las consultas de lista que corren cada pocos segundos (nombre, queryset)."""
+    now = timezone.now()
+    page = 20
+    return [
+        ("solicitudes: lista", apply_eager_plan(SolicitudViewSet.queryset, SolicitudReadNestedSerializer)[:page]),
+        ("solicitudes: NUEVA recientes", models.Solicitud.objects.filter(estado="NUEVA").order_by("-id")[:page]),
+        ("solicitudes: por estado", models.Solicitud.objects.filter(estado="EN_REVISION").order_by("-id")[:page]),
+        ("solicitudes: por created_at", models.Solicitud.objects.order_by("-created_at")[:page]),
+        ("reservas: lista", apply_eager_plan(ReservaViewSet.queryset, ReservaReadNestedSerializer)[:page]),
+        ("reservas: por fecha (cursor)", models.Reserva.objects.order_by("fecha_hora_agendada", "id")[:page]),
+        ("reservas: estado en el día", models.Reserva.objects.filter(
+            estado="PENDIENTE", fecha_hora_agendada__range=(now, now + timedelta(days=1)),
+        ).order_by("fecha_hora_agendada")[:page]),
+        ("reservas: conductor en ventana", models.Reserva.objects.filter(
+            conductor_id=1, fecha_hora_agendada__range=(now, now + timedelta(days=1)),
+        )),
+        ("reservas: activas", models.Reserva.objects.filter(
+            estado__in=["PENDIENTE", "ASIGNADA", "EN_CURSO"],
+        ).order_by("fecha_hora_agendada")[:page]),
+    ]
+
+
+def _pg_seq_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found += _pg_seq_scans(child)
+    return found
+
+
+class Command(BaseCommand):
+    help = "Corre EXPLAIN sobre las consultas de lista principales y reporta las que siguen usando seq scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--allow-seqscan", action="store_true",
+            help="No desactiva enable_seqscan en Postgres (por defecto se desactiva, "
+                 "así con tablas chicas un seq scan significa que no hay índice utilizable).",
+        )
+        parser.add_argument(
+            "--ignore", action="append", default=["origen", "destino", "tenista", "coordinador", "conductor"],
+            help="Tablas chicas donde un seq scan es aceptable (se puede repetir).",
+        )
+        parser.add_argument("--verbose-plan", action="store_true", help="Imprime el plan completo.")
+
+    def explain(self, qs, allow_seqscan):
+        if connection.vendor == "postgresql":
+            with transaction.atomic():
+                if not allow_seqscan:
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                raw = qs.explain(format="json")
+            plan = json.loads(raw)[0]["Plan"]
+            return _pg_seq_scans(plan), json.dumps(plan, indent=2)
+        if connection.vendor == "sqlite":
+            raw = qs.explain()
+            # un SCAN en orden de rowid con LIMIT (p. ej. ORDER BY id DESC) se corta
+            # temprano; solo cuenta como seq scan si además hay que ordenar o no hay LIMIT
+            ordered_scan = qs.query.high_mark is not None and "TEMP B-TREE" not in raw
+            scans = []
+            for line in raw.splitlines():
+                # "SCAN tabla" es recorrido completo; "SEARCH tabla USING INDEX" no
+                parts = line.split()
+                if "SCAN" in parts and "USING" not in parts and not ordered_scan:
+                    scans.append(parts[parts.index("SCAN") + 1])
+            return scans, raw
+        raise CommandError(f"Motor no soportado: {connection.vendor}")
+
+    def handle(self, *args, **opts):
+        ignore = set(opts["ignore"])
+        failures = 0
+        for name, qs in hot_queries():
+            scans, plan = self.explain(qs, opts["allow_seqscan"])
+            scans = [t for t in scans if t not in ignore]
+            if scans:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {name}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK        {name}"))
+            if opts["verbose_plan"]:
+                self.stdout.write(plan)
+        if failures:
+            raise CommandError(f"{failures} consulta(s) con seq scan")
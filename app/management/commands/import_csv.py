@@ -0,0 +1,36 @@
+# app/management/commands/import_csv.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from app import bulk_import
+
+
+class Command(BaseCommand):
+    help = "Importa conductores o tenistas desde un CSV (staging + un upsert). Ver app/bulk_import.py."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tipo", choices=sorted(bulk_import.SPECS))
+        parser.add_argument("archivo")
+        parser.add_argument("--dry-run", action="store_true", help="valida y cuenta, pero no guarda nada")
+        parser.add_argument("--report", default=None, help="escribe el reporte por fila (JSON) en este archivo")
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["archivo"], "rb") as fh:
+                report = bulk_import.run(opts["tipo"], fh, dry_run=opts["dry_run"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ValidationError as exc:
+            raise CommandError(f"{opts['archivo']}: {exc.detail}")
+
+        for fila in report["filas"]:
+            if fila["resultado"] == "rechazado":
+                self.stderr.write(f"línea {fila['linea']}: {'; '.join(fila['errores'])}")
+        if opts["report"]:
+            with open(opts["report"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2)
+        msg = (f"{report['insertados']} insertados, {report['actualizados']} actualizados, "
+               f"{report['rechazados']} rechazados" + (" (dry run, no se guardó nada)" if report["dry_run"] else ""))
+        self.stdout.write(self.style.SUCCESS(msg))
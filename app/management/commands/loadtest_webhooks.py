@@ -0,0 +1,166 @@
+# app/management/commands/loadtest_webhooks.py
+"""
+Carga concurrente contra uno o más despliegues del mismo código, para comparar
+WSGI (vistas DRF síncronas) con ASGI (app/async_views.py) en la misma máquina:
+
+    gunicorn core.wsgi -w 4 -b 127.0.0.1:8000
+    gunicorn core.asgi -w 4 -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8001
+
+    python manage.py loadtest_webhooks http://127.0.0.1:8000 http://127.0.0.1:8001 \
+        --concurrency 64 --requests 4000
+
+Cada request es un POST al webhook con un teléfono de un pool chico (así hay
+altas y enriquecimientos) o, según --read-ratio, un GET a tenista_por_numero
+o a solicitud_detail de una solicitud ya creada (antes de medir se crean
+--precrear, así un GET nunca se convierte en un POST y --read-ratio es el mix
+real). Las URLs se corren una después de la otra, con el mismo mix, para que
+no compitan por la CPU.
+"""
+import http.client
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.parsers import loads
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class _Target:
+    """Una conexión keep-alive por hilo hacia un base URL."""
+
+    def __init__(self, base_url, token):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise CommandError(f"URL inválida: {base_url}")
+        self.scheme, self.netloc = parts.scheme, parts.netloc
+        self.prefix = parts.path.rstrip("/") + "/api"
+        self.headers = {"Content-Type": "application/json", "X-Webhook-Token": token or ""}
+        self.local = threading.local()
+
+    def request(self, method, path, body=None):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = self.local.conn = cls(self.netloc, timeout=30)
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=self.headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self.local.conn = None
+            raise
+
+
+class Command(BaseCommand):
+    help = "Compara throughput/latencia del webhook y las lecturas del bot entre despliegues (WSGI vs ASGI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="base URL de cada despliegue, p. ej. http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000, help="requests por URL")
+        parser.add_argument("--read-ratio", type=float, default=0.5, help="fracción de GETs (0..1)")
+        parser.add_argument("--phones", type=int, default=500, help="teléfonos distintos en el pool")
+        parser.add_argument("--warmup", type=int, default=100)
+        parser.add_argument("--precrear", type=int, default=20,
+                            help="solicitudes creadas antes de medir, para los GET de detalle")
+        parser.add_argument("--token", default=getattr(settings, "WEBHOOK_TOKEN", ""))
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        results = []
+        for url in opts["urls"]:
+            target = _Target(url, opts["token"])
+            rng = random.Random(opts["seed"])
+            plan = [self._pick(rng, opts) for _ in range(opts["warmup"] + opts["requests"])]
+            created = self._precrear(target, rng, opts)
+            self._run(target, plan[:opts["warmup"]], opts["concurrency"], created)
+            stats = self._run(target, plan[opts["warmup"]:], opts["concurrency"], created)
+            stats["url"] = url
+            results.append(stats)
+            self.stdout.write(
+                f"{url}: {stats['rps']:.1f} req/s  p50 {stats['p50']:.1f} ms  "
+                f"p95 {stats['p95']:.1f} ms  p99 {stats['p99']:.1f} ms  errores {stats['errors']}"
+            )
+        if len(results) > 1:
+            base = results[0]
+            for other in results[1:]:
+                ratio = other["rps"] / base["rps"] if base["rps"] else 0.0
+                self.stdout.write(f"{other['url']} vs {base['url']}: {ratio:.2f}x throughput")
+
+    @staticmethod
+    def _pick(rng, opts):
+        phone = f"+569{rng.randrange(opts['phones']):08d}"
+        if rng.random() >= opts["read_ratio"]:
+            return ("webhook", phone)
+        return (rng.choice(["tenista", "detalle"]), phone)
+
+    @staticmethod
+    def _post(target, phone):
+        body = f'{{"from_phone": "{phone}", "nombres": "Carga", "origen": "Hotel", "destino": "Club"}}'
+        return target.request("POST", "/webhooks/whatsapp/", body.encode())
+
+    def _precrear(self, target, rng, opts):
+        """Ids de solicitudes creadas (fuera de la medición) para los GET de detalle."""
+        created = []
+        for _ in range(max(opts["precrear"], 1)):
+            try:
+                status, content = self._post(target, f"+569{rng.randrange(opts['phones']):08d}")
+            except (http.client.HTTPException, OSError) as exc:
+                raise CommandError(f"{target.netloc}: {exc}")
+            if status == 201:
+                created.append(loads(content)["solicitud"]["id"])
+        if not created:
+            raise CommandError(f"{target.netloc}: el webhook no creó ninguna solicitud (¿token?)")
+        return created
+
+    def _one(self, target, op, phone, created):
+        if op == "tenista":
+            return target.request("GET", f"/api/tenistas/por-numero/?numero={phone.replace('+', '%2B')}")
+        if op == "detalle":
+            return target.request("GET", f"/solicitudes/{random.choice(created)}/")
+        status, content = self._post(target, phone)
+        if status == 201:
+            created.append(loads(content)["solicitud"]["id"])
+        return status, content
+
+    def _run(self, target, plan, concurrency, created):
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def work(item):
+            nonlocal errors
+            t0 = time.perf_counter()
+            try:
+                status, _ = self._one(target, *item, created)
+                ok = status < 400
+            except (http.client.HTTPException, OSError):
+                ok = False
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(work, plan))
+        wall = time.perf_counter() - started
+        return {
+            "rps": len(plan) / wall if wall else 0.0,
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "errors": errors,
+        }
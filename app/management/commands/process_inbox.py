@@ -0,0 +1,44 @@
+# app/management/commands/process_inbox.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app import inbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Drena webhook_inbox por lotes (FOR UPDATE SKIP LOCKED). "
+        "Se pueden correr varios procesos a la vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=None, help="filas por lote (INBOX_BATCH)")
+        parser.add_argument("--sleep", type=float, default=1.0, help="espera cuando no hay nada que hacer")
+        parser.add_argument("--once", action="store_true", help="drena lo disponible y termina")
+        parser.add_argument("--lag", action="store_true", help="solo muestra el atraso y termina")
+
+    def handle(self, *args, **opts):
+        if opts["lag"]:
+            self.stdout.write(" ".join(f"{k}={v}" for k, v in inbox.lag().items()))
+            return
+
+        stopping = False
+
+        def stop(*_):
+            nonlocal stopping
+            stopping = True  # termina el lote actual y sale
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            close_old_connections()
+            stats = inbox.drain(opts["batch"])
+            if stats["tomadas"]:
+                self.stdout.write(" ".join(f"{k}={v}" for k, v in stats.items()))
+                continue
+            if opts["once"]:
+                break
+            time.sleep(opts["sleep"])
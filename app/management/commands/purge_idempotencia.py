@@ -0,0 +1,17 @@
+# app/management/commands/purge_idempotencia.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app import idempotency
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de idempotencia del webhook ya vencidas (WEBHOOK_IDEMPOTENCY_TTL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=None, help="segundos (por defecto el TTL)")
+
+    def handle(self, *args, **opts):
+        older = timedelta(seconds=opts["older_than"]) if opts["older_than"] is not None else None
+        self.stdout.write(f"{idempotency.purge(older)} claves borradas.")
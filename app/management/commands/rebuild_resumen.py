@@ -0,0 +1,32 @@
+# app/management/commands/rebuild_resumen.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import resumen
+
+
+class Command(BaseCommand):
+    help = "Recalcula resumen_diario (contadores del dashboard) desde solicitud y reserva."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", default=None, help="YYYY-MM-DD (por defecto, desde el principio)")
+        parser.add_argument("--hasta", default=None, help="YYYY-MM-DD (por defecto, hasta el final)")
+        parser.add_argument("--check", action="store_true", help="solo informa las diferencias, no escribe")
+
+    def handle(self, *args, **opts):
+        try:
+            desde = opts["desde"] and date.fromisoformat(opts["desde"])
+            hasta = opts["hasta"] and date.fromisoformat(opts["hasta"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        diffs = resumen.rebuild(desde, hasta, dry_run=opts["check"])
+        for (tabla, dia, estado), delta in sorted(diffs.items()):
+            self.stdout.write(f"{dia} {tabla:<10} {estado:<12} {delta:+d}")
+        if not diffs:
+            self.stdout.write(self.style.SUCCESS("Sin diferencias."))
+        elif opts["check"]:
+            raise CommandError(f"{len(diffs)} contadores desviados (correr sin --check para corregirlos)")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(diffs)} contadores corregidos."))
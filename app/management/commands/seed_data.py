@@ -0,0 +1,58 @@
+# app/management/commands/seed_data.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app import models, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga datos sintéticos consistentes (tenistas, catálogos, solicitudes, reservas...) "
+        "para pruebas de carga. COPY en Postgres, bulk_create en SQLite. Misma --seed, mismas filas."
+    )
+
+    def add_arguments(self, parser):
+        d = seed.DEFAULTS
+        for name in ("tenistas", "solicitudes", "origenes", "destinos", "conductores", "coordinadores"):
+            parser.add_argument(f"--{name}", type=int, default=d[name])
+        parser.add_argument("--repeat-share", type=float, default=d["repeat_share"],
+                            help="fracción de solicitudes del 10%% de tenistas más frecuentes (0..1)")
+        parser.add_argument("--solicitud-mix", default=None,
+                            help="p. ej. NUEVA=0.15,EN_REVISION=0.1,RECHAZADA=0.1,CONFIRMADA=0.65")
+        parser.add_argument("--reserva-mix", default=None,
+                            help="p. ej. PENDIENTE=0.1,ASIGNADA=0.1,EN_CURSO=0.02,COMPLETADA=0.7,CANCELADA=0.08")
+        parser.add_argument("--days", type=int, default=d["days"], help="días hacia atrás de created_at")
+        parser.add_argument("--end", default=None, help="fecha final (YYYY-MM-DD); fíjala para corridas reproducibles")
+        parser.add_argument("--no-raw-form", action="store_true", help="no llena solicitud_raw")
+        parser.add_argument("--batch", type=int, default=d["batch"])
+        parser.add_argument("--seed", type=int, default=d["seed"])
+
+    def handle(self, *args, **opts):
+        if not 0 <= opts["repeat_share"] <= 1:
+            raise CommandError("--repeat-share va entre 0 y 1")
+        try:
+            params = {
+                **{k: opts[k] for k in ("tenistas", "solicitudes", "origenes", "destinos", "conductores",
+                                        "coordinadores", "repeat_share", "days", "batch", "seed")},
+                "raw_form": not opts["no_raw_form"],
+                "solicitud_mix": opts["solicitud_mix"] and seed.parse_mix(opts["solicitud_mix"], models.SolicitudEstado.values),
+                "reserva_mix": opts["reserva_mix"] and seed.parse_mix(opts["reserva_mix"], models.ReservaEstado.values),
+                "end": opts["end"] and timezone.make_aware(datetime.fromisoformat(opts["end"])),
+            }
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        verbose = opts["verbosity"] > 1
+        started = time.perf_counter()
+        counts = seed.load(params, progress=(lambda table, n: self.stdout.write(f"  {table}: {n}")) if verbose else None)
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        for table, n in counts.items():
+            self.stdout.write(f"{table:12} {n:>12,}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total:,} filas en {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} filas/s)"
+        ))
@@ -0,0 +1,373 @@
+# app/metrics.py
+"""
+Métricas por request: queries, tiempo en la BD, serialización, render y tamaño.
+
+MetricsMiddleware (el primero de MIDDLEWARE) mide cada request y:
+  - agrega un header Server-Timing (db, app, serialize, render, total), que
+    el navegador muestra en la pestaña Network;
+  - suma la request a histogramas por vista (view_name del router o la ruta);
+  - si tarda más de METRICS_SLOW_MS, la loguea (logger "app.metrics") con
+    sus METRICS_TOP_QUERIES queries más lentas.
+
+    db         queries y tiempo dentro de execute (execute_wrapper puesto en cada
+               conexión al crearse, también las de los threads de sync_to_async)
+    serialize  bloques marcados con stage("serialize") (list/retrieve de
+               BaseViewSet), sin contar las queries que corran adentro
+    render     response.render() (JSON / navegable), de DRF
+    app        el resto de la vista y los middlewares
+
+GET /api/api/metrics/ los expone en formato de texto de Prometheus. Con
+gunicorn cada worker tiene sus propios contadores: cada uno escribe cada
+METRICS_FLUSH_INTERVAL segundos una foto en METRICS_DIR (un archivo por
+proceso) y el endpoint suma todos los archivos, así que da lo mismo qué
+worker atienda el scrape. Los archivos de workers muertos se siguen sumando
+(los contadores no bajan); vaciar METRICS_DIR al desplegar.
+"""
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger("app.metrics")
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES = (1, 2, 3, 5, 8, 13, 21, 50, 100)
+BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# nombre -> (ayuda, buckets); todas con la etiqueta "view"
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Duración total de la request", SECONDS),
+    "http_request_db_seconds": ("Tiempo ejecutando SQL", SECONDS),
+    "http_request_db_queries": ("Queries SQL por request", QUERIES),
+    "http_request_serialize_seconds": ("Tiempo serializando (sin SQL)", SECONDS),
+    "http_request_render_seconds": ("Tiempo en response.render()", SECONDS),
+    "http_response_size_bytes": ("Tamaño del cuerpo enviado (ya comprimido)", BYTES),
+}
+REQUESTS_TOTAL = "http_requests_total"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ---------- medición de una request ----------
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.stages: Dict[str, float] = {}
+        self.render_start: Optional[float] = None
+        self.render = 0.0
+        self._top: List[Tuple[float, int, str]] = []  # heap de las más lentas
+
+    def query(self, sql: str, elapsed: float):
+        self.queries += 1
+        self.db += elapsed
+        n = _setting("METRICS_TOP_QUERIES", 5)
+        item = (elapsed, self.queries, sql[:500])
+        if len(self._top) < n:
+            heapq.heappush(self._top, item)
+        elif n and elapsed > self._top[0][0]:
+            heapq.heapreplace(self._top, item)
+
+    def top_queries(self) -> List[Tuple[float, str]]:
+        return [(elapsed, sql) for elapsed, _, sql in sorted(self._top, reverse=True)]
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def stage(name: str):
+    """Suma el tiempo del bloque a `name` (descontando las queries que corran adentro)."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started, db_before = time.perf_counter(), stats.db
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started - (stats.db - db_before)
+        stats.stages[name] = stats.stages.get(name, 0.0) + max(elapsed, 0.0)
+
+
+# ---------- agregados del proceso ----------
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, Labels], list] = {}  # [cuenta por bucket..., +Inf, suma]
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.dirty = False
+
+    def observe(self, name: str, labels: Labels, value: float):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            data = self.histograms.get((name, labels))
+            if data is None:
+                data = self.histograms[(name, labels)] = [0] * (len(buckets) + 2)
+            pos = next((i for i, le in enumerate(buckets) if value <= le), len(buckets))
+            data[pos] += 1
+            data[-1] += value
+            self.dirty = True
+
+    def inc(self, name: str, labels: Labels, value: float = 1):
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+            self.dirty = True
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "h": [[n, list(map(list, l)), list(d)] for (n, l), d in self.histograms.items()],
+                "c": [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+            }
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.dirty = False
+
+
+REGISTRY = Registry()
+_FILE_TOKEN = uuid.uuid4().hex[:8]
+_last_flush = [0.0]
+
+
+def metrics_dir() -> str:
+    return _setting("METRICS_DIR", None) or os.path.join(tempfile.gettempdir(), "capstone_wsp_metrics")
+
+
+def _own_file() -> str:
+    # pid + token: un worker nuevo con un pid reciclado no pisa al anterior
+    return os.path.join(metrics_dir(), f"{os.getpid()}-{_FILE_TOKEN}.json")
+
+
+def flush(force: bool = False):
+    """Escribe la foto de este proceso (a lo sumo cada METRICS_FLUSH_INTERVAL segundos)."""
+    now = time.monotonic()
+    if not REGISTRY.dirty or (not force and now - _last_flush[0] < _setting("METRICS_FLUSH_INTERVAL", 1.0)):
+        return
+    _last_flush[0] = now
+    REGISTRY.dirty = False
+    path = _own_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(REGISTRY.snapshot(), fh)
+        os.replace(tmp, path)  # el que lee nunca ve un archivo a medias
+    except OSError:
+        logger.exception("no se pudieron guardar las métricas en %s", path)
+
+
+def collect() -> dict:
+    """Suma de todos los procesos (los archivos de METRICS_DIR + lo vivo de este)."""
+    snapshots = [REGISTRY.snapshot()]
+    own, folder = _own_file(), metrics_dir()
+    try:
+        names = [n for n in os.listdir(folder) if n.endswith(".json")]
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(folder, name)
+        if path == own:
+            continue
+        try:
+            with open(path) as fh:
+                snapshots.append(json.load(fh))
+        except (OSError, ValueError):
+            continue  # un worker que justo lo está reemplazando
+    histograms: Dict[Tuple[str, Labels], list] = {}
+    counters: Dict[Tuple[str, Labels], float] = {}
+    for snap in snapshots:
+        for name, labels, data in snap.get("h", []):
+            key = (name, tuple(map(tuple, labels)))
+            if name not in HISTOGRAMS or len(data) != len(HISTOGRAMS[name][1]) + 2:
+                continue  # de una versión con otros buckets
+            acc = histograms.setdefault(key, [0] * len(data))
+            for i, v in enumerate(data):
+                acc[i] += v
+        for name, labels, value in snap.get("c", []):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+    return {"h": histograms, "c": counters}
+
+
+# ---------- formato de texto de Prometheus ----------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()) -> str:
+    pairs = [*labels, *extra]
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition() -> str:
+    data = collect()
+    lines = [f"# HELP {REQUESTS_TOTAL} Requests atendidas", f"# TYPE {REQUESTS_TOTAL} counter"]
+    for (name, labels), value in sorted(data["c"].items()):
+        if name == REQUESTS_TOTAL:
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for (name, labels), counts in sorted(data["h"].items()):
+            if name != metric:
+                continue
+            cumulative = 0
+            for le, count in zip((*buckets, "+Inf"), counts[:-1]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {_number(counts[-1])}")
+            lines.append(f"{metric}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """GET /api/api/metrics/ (scrape de Prometheus)."""
+    flush(force=True)
+    return HttpResponse(exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ---------- middleware ----------
+def _view_label(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<sin_ruta>"  # 404 antes de resolver: una sola serie, no una por URL
+    return match.view_name or match.route or match._func_path
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    serialize = stats.stages.get("serialize", 0.0)
+    app = max(total - stats.db - stats.render - sum(stats.stages.values()), 0.0)
+    parts = [f'db;dur={stats.db * 1000:.1f};desc="{stats.queries} queries"', f"app;dur={app * 1000:.1f}"]
+    if "serialize" in stats.stages:
+        parts.append(f"serialize;dur={serialize * 1000:.1f}")
+    if stats.render_start is not None:
+        parts.append(f"render;dur={stats.render * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    """
+    Señal connection_created (conectada en AppConfig.ready): el wrapper queda
+    puesto en cada conexión y mide solo si hay una request en curso. Las
+    conexiones son por thread, no por contexto: bajo ASGI las queries de una
+    vista async corren en los threads de sync_to_async, con otra conexión que
+    la del event loop, pero el contextvar sí viaja con ellas.
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+@contextmanager
+def _measuring():
+    """Activa la medición para la request actual (el contextvar que mira _timed_execute)."""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """
+    Mide cada request (ver el docstring del módulo). Va primero en MIDDLEWARE.
+    Sirve sync y async: bajo ASGI no obliga a Django a pasar la cadena (y las
+    vistas async del webhook) a un thread por request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not _setting("METRICS_ENABLED", True):
+            return self.get_response(request)
+        with _measuring() as stats:
+            response = self.get_response(request)
+        self.record(request, response, stats, time.perf_counter() - stats.start)
+        return response
+
+    async def __acall__(self, request):
+        if not _setting("METRICS_ENABLED", True):
+            return await self.get_response(request)
+        with _measuring() as stats:
+            response = await self.get_response(request)
+        self.record(request, response, stats, time.perf_counter() - stats.start)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF renderiza después de la vista: se mide desde acá hasta el post-render
+        stats = _current.get()
+        if stats is not None:
+            stats.render_start = time.perf_counter()
+
+            def done(rendered):
+                stats.render = time.perf_counter() - stats.render_start
+            response.add_post_render_callback(done)
+        return response
+
+    def record(self, request, response, stats: RequestStats, total: float):
+        view = _view_label(request)
+        labels = (("view", view),)
+        REGISTRY.inc(REQUESTS_TOTAL, (("view", view), ("method", request.method), ("status", str(response.status_code))))
+        REGISTRY.observe("http_request_duration_seconds", labels, total)
+        REGISTRY.observe("http_request_db_seconds", labels, stats.db)
+        REGISTRY.observe("http_request_db_queries", labels, stats.queries)
+        if "serialize" in stats.stages:
+            REGISTRY.observe("http_request_serialize_seconds", labels, stats.stages["serialize"])
+        if stats.render_start is not None:
+            REGISTRY.observe("http_request_render_seconds", labels, stats.render)
+        if not response.streaming:
+            REGISTRY.observe("http_response_size_bytes", labels, len(response.content))
+        if _setting("METRICS_SERVER_TIMING", True):
+            response["Server-Timing"] = _server_timing(stats, total)
+
+        slow_ms = _setting("METRICS_SLOW_MS", 500)
+        if slow_ms and total * 1000 >= slow_ms:
+            top = "\n".join(f"  {elapsed * 1000:.1f} ms  {sql}" for elapsed, sql in stats.top_queries())
+            logger.warning(
+                "request lenta: %s %s (%s) %.0f ms, %d queries, %.0f ms en la BD\n%s",
+                request.method, request.get_full_path(), view, total * 1000, stats.queries, stats.db * 1000, top,
+            )
+        flush()
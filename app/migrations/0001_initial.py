@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:42
+#
+# Las tablas ya existían antes de que el repo tuviera migraciones. En una BD
+# existente hay que marcar esta como aplicada en vez de crearlas:
+#     python manage.py migrate app 0001 --fake-initial
+#     python manage.py migrate
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conductor',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.TextField()),
+                ('apellido', models.TextField()),
+                ('patente', models.TextField(blank=True, null=True)),
+                ('mail', models.TextField(unique=True)),
+                ('telefono', models.TextField(blank=True, null=True)),
+                ('activo', models.BooleanField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'conductor',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Coordinador',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.TextField()),
+                ('correo', models.TextField(unique=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'coordinador',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Destino',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('lugar', models.TextField(unique=True)),
+            ],
+            options={
+                'db_table': 'destino',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Origen',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('salida', models.TextField(unique=True)),
+            ],
+            options={
+                'db_table': 'origen',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Tenista',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.TextField()),
+                ('apellido', models.TextField()),
+                ('correo', models.TextField(blank=True, null=True)),
+                ('numero', models.TextField(unique=True)),
+            ],
+            options={
+                'db_table': 'tenista',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Solicitud',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('form_nombres', models.TextField()),
+                ('form_apellidos', models.TextField()),
+                ('form_correo', models.TextField(blank=True, null=True)),
+                ('form_telefono', models.TextField()),
+                ('pasajeros', models.SmallIntegerField()),
+                ('hora_salida', models.TimeField(blank=True, null=True)),
+                ('observaciones', models.TextField(blank=True, null=True)),
+                ('idioma_detectado', models.CharField(blank=True, max_length=8, null=True)),
+                ('raw_form', models.JSONField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('NUEVA', 'NUEVA'), ('EN_REVISION', 'EN_REVISION'), ('RECHAZADA', 'RECHAZADA'), ('CONFIRMADA', 'CONFIRMADA')], default='NUEVA', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('destino', models.ForeignKey(blank=True, db_column='destino_id', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='solicitudes_destino', to='app.destino')),
+                ('origen', models.ForeignKey(blank=True, db_column='origen_id', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='solicitudes_origen', to='app.origen')),
+                ('tenista', models.ForeignKey(blank=True, db_column='tenista_id', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='solicitudes', to='app.tenista')),
+            ],
+            options={
+                'db_table': 'solicitud',
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='Reserva',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha_hora_agendada', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'PENDIENTE'), ('ASIGNADA', 'ASIGNADA'), ('EN_CURSO', 'EN_CURSO'), ('COMPLETADA', 'COMPLETADA'), ('CANCELADA', 'CANCELADA')], default='PENDIENTE', max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('conductor', models.ForeignKey(blank=True, db_column='conductor_id', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reservas', to='app.conductor')),
+                ('coordinador', models.ForeignKey(blank=True, db_column='coordinador_id', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reservas', to='app.coordinador')),
+                ('solicitud', models.OneToOneField(db_column='solicitud_id', on_delete=django.db.models.deletion.CASCADE, related_name='reserva', to='app.solicitud')),
+            ],
+            options={
+                'db_table': 'reserva',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# (índice, tabla, columna) para los search_fields de SolicitudViewSet / ReservaViewSet.
+# La expresión tiene que ser igual a la que genera `icontains` en Postgres.
+# estado no: app/search.py lo busca con un IN sobre sus choices (btree).
+TRGM_INDEXES = [
+    ("solicitud_form_telefono_trgm", "solicitud", "form_telefono"),
+    ("solicitud_form_correo_trgm", "solicitud", "form_correo"),
+    ("solicitud_form_nombres_trgm", "solicitud", "form_nombres"),
+    ("solicitud_form_apellidos_trgm", "solicitud", "form_apellidos"),
+    ("conductor_nombre_trgm", "conductor", "nombre"),
+    ("conductor_apellido_trgm", "conductor", "apellido"),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede correr dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
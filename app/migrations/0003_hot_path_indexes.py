@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:46
+
+from django.db import migrations, models
+
+from app.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # los índices se crean CONCURRENTLY en Postgres (sin bloquear escrituras)
+    atomic = False
+
+    dependencies = [
+        ('app', '0002_trigram_search_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['conductor', 'fecha_hora_agendada'], name='reserva_conductor_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'fecha_hora_agendada'], name='reserva_estado_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['fecha_hora_agendada', 'id'], name='reserva_fecha_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado__in', ['PENDIENTE', 'ASIGNADA', 'EN_CURSO'])), fields=['fecha_hora_agendada'], name='reserva_activa_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='solicitud',
+            index=models.Index(condition=models.Q(('estado', 'NUEVA')), fields=['-id'], name='solicitud_nueva_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', '-id'], name='solicitud_estado_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='solicitud',
+            index=models.Index(fields=['created_at'], name='solicitud_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+from app.db_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # la columna nace vacía; se completa con `manage.py backfill_numero_e164`
+    atomic = False
+
+    dependencies = [
+        ('app', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenista',
+            name='numero_e164',
+            field=models.TextField(blank=True, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='tenista',
+            index=models.Index(fields=['numero_e164'], name='tenista_numero_e164_idx'),
+        ),
+    ]
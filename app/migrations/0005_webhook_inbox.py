@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_tenista_numero_e164'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookInbox',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('body', models.JSONField()),
+                ('received_at', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'PENDIENTE'), ('PROCESADO', 'PROCESADO'), ('ERROR', 'ERROR')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.SmallIntegerField(default=0)),
+                ('disponible_en', models.DateTimeField()),
+                ('procesado_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('solicitud', models.ForeignKey(blank=True, db_column='solicitud_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.solicitud')),
+            ],
+            options={
+                'db_table': 'webhook_inbox',
+                'managed': True,
+                'indexes': [models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['disponible_en', 'id'], name='inbox_pendiente_idx'), models.Index(condition=models.Q(('estado', 'ERROR')), fields=['id'], name='inbox_error_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('clave', models.TextField(unique=True)),
+                ('respuesta', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('solicitud', models.ForeignKey(blank=True, db_column='solicitud_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.solicitud')),
+            ],
+            options={
+                'db_table': 'webhook_idempotencia',
+                'managed': True,
+                'indexes': [models.Index(fields=['created_at'], name='idempotencia_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+CONSTRAINT = "reserva_conductor_sin_solape"
+# mismos estados que app.scheduling.ACTIVE
+ACTIVE_SQL = "('PENDIENTE', 'ASIGNADA', 'EN_CURSO')"
+
+
+def completar_fin(apps, schema_editor):
+    Reserva = apps.get_model("app", "Reserva")
+    Reserva.objects.filter(fecha_hora_fin__isnull=True).update(
+        fecha_hora_fin=models.F("fecha_hora_agendada") + timedelta(minutes=settings.RESERVA_DURACION_MIN),
+    )
+
+
+def crear_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # btree_gist: para poder usar "conductor_id WITH =" dentro de un índice GiST
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT a.id, b.id, a.conductor_id FROM reserva a
+            JOIN reserva b ON b.conductor_id = a.conductor_id AND b.id > a.id
+             AND tstzrange(a.fecha_hora_agendada, a.fecha_hora_fin, '[)')
+              && tstzrange(b.fecha_hora_agendada, b.fecha_hora_fin, '[)')
+            WHERE a.estado IN {ACTIVE_SQL} AND b.estado IN {ACTIVE_SQL}
+            LIMIT 20
+        """)
+        solapes = cursor.fetchall()
+    if solapes:
+        detalle = ", ".join(f"{a}/{b} (conductor {c})" for a, b, c in solapes)
+        raise RuntimeError(
+            f"Hay reservas activas solapadas para el mismo conductor: {detalle}. "
+            "Reasignarlas antes de migrar."
+        )
+    schema_editor.execute(f"""
+        ALTER TABLE reserva ADD CONSTRAINT {CONSTRAINT} EXCLUDE USING gist (
+            conductor_id WITH =,
+            tstzrange(fecha_hora_agendada, fecha_hora_fin, '[)') WITH &&
+        ) WHERE (conductor_id IS NOT NULL AND estado IN {ACTIVE_SQL})
+    """)
+
+
+def borrar_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"ALTER TABLE reserva DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_webhook_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='fecha_hora_fin',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(completar_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reserva',
+            name='fecha_hora_fin',
+            field=models.DateTimeField(),
+        ),
+        migrations.RunPython(crear_exclusion, borrar_exclusion),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:14
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def llenar(apps, schema_editor):
+    """Carga inicial (lo mismo que `manage.py rebuild_resumen` sin rango)."""
+    ResumenDiario = apps.get_model("app", "ResumenDiario")
+    filas = []
+    for model, tabla, campo in (("Solicitud", "solicitud", "created_at"),
+                                ("Reserva", "reserva", "fecha_hora_agendada")):
+        qs = (apps.get_model("app", model).objects.order_by()
+              .annotate(dia=TruncDate(campo)).values_list("dia", "estado").annotate(n=Count("id")))
+        filas += [ResumenDiario(dia=dia, tabla=tabla, estado=estado, total=n) for dia, estado, n in qs]
+    ResumenDiario.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_reserva_sin_solape'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('dia', models.DateField()),
+                ('tabla', models.CharField(max_length=20)),
+                ('estado', models.CharField(max_length=20)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'resumen_diario',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('dia', 'tabla', 'estado'), name='resumen_dia_tabla_estado_uniq')],
+            },
+        ),
+        migrations.RunPython(llenar, migrations.RunPython.noop),
+    ]
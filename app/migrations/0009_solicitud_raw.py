@@ -0,0 +1,97 @@
+from django.db import migrations, models, transaction
+import django.db.models.deletion
+
+# filas de solicitud por transacción al copiar raw_form: cada lote toma sus
+# locks de fila y los suelta al confirmar, así el webhook sigue insertando
+LOTE = 5000
+
+
+def _copiar(cursor, desde, hasta):
+    cursor.execute(
+        "INSERT INTO solicitud_raw (solicitud_id, body) "
+        "SELECT id, raw_form FROM solicitud "
+        "WHERE id >= %s AND id < %s AND raw_form IS NOT NULL "
+        "ON CONFLICT (solicitud_id) DO NOTHING",
+        [desde, hasta],
+    )
+
+
+def copiar_por_lotes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM solicitud")
+        minimo, maximo = cursor.fetchone()
+    if minimo is None:
+        return
+    for desde in range(minimo, maximo + 1, LOTE):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            _copiar(cursor, desde, desde + LOTE)
+
+
+def cerrar(apps, schema_editor):
+    """
+    Lo que faltó copiar y el DROP de la columna, en una sola transacción. El
+    LOCK frena inserts nuevos solo durante esto. Va por anti-join y no por id:
+    un webhook puede tomar un id de la secuencia antes del MAX(id) de
+    copiar_por_lotes y confirmar después de que su lote ya se copió.
+    """
+    connection = schema_editor.connection
+    Solicitud = apps.get_model("app", "Solicitud")
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("LOCK TABLE solicitud IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(
+                "INSERT INTO solicitud_raw (solicitud_id, body) "
+                "SELECT id, raw_form FROM solicitud "
+                "WHERE raw_form IS NOT NULL "
+                "AND NOT EXISTS (SELECT 1 FROM solicitud_raw r WHERE r.solicitud_id = solicitud.id)"
+            )
+        schema_editor.remove_field(Solicitud, Solicitud._meta.get_field("raw_form"))
+
+
+def reabrir(apps, schema_editor):
+    connection = schema_editor.connection
+    Solicitud = apps.get_model("app", "Solicitud")
+    field = models.JSONField(blank=True, null=True)
+    field.set_attributes_from_name("raw_form")
+    schema_editor.add_field(Solicitud, field)
+    with connection.cursor() as cursor:
+        # solo las filas sin comprimir: las de body_zlib se pierden al volver
+        cursor.execute(
+            "UPDATE solicitud SET raw_form = (SELECT r.body FROM solicitud_raw r WHERE r.solicitud_id = solicitud.id) "
+            "WHERE EXISTS (SELECT 1 FROM solicitud_raw r WHERE r.solicitud_id = solicitud.id AND r.body IS NOT NULL)"
+        )
+
+
+class Migration(migrations.Migration):
+    # cada lote confirma por su cuenta (ver copiar_por_lotes)
+    atomic = False
+
+    dependencies = [
+        ('app', '0008_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudRaw',
+            fields=[
+                ('solicitud', models.OneToOneField(db_column='solicitud_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='raw', serialize=False, to='app.solicitud')),
+                ('body', models.JSONField(blank=True, null=True)),
+                ('body_zlib', models.BinaryField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'solicitud_raw',
+                'managed': True,
+            },
+        ),
+        migrations.RunPython(copiar_por_lotes, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(model_name='solicitud', name='raw_form'),
+            ],
+            database_operations=[
+                migrations.RunPython(cerrar, reabrir),
+            ],
+        ),
+    ]
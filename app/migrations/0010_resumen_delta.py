@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_solicitud_raw'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDelta',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('dia', models.DateField()),
+                ('tabla', models.CharField(max_length=20)),
+                ('estado', models.CharField(max_length=20)),
+                ('delta', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'resumen_delta',
+                'managed': True,
+                'indexes': [models.Index(fields=['dia'], name='resumen_delta_dia_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Las BDs que corrieron 0002 antes de que se sacaran de ahí. Cuestan en cada
+# escritura y no sirven: app/search.py busca estado con un IN sobre sus choices.
+INDEXES = [
+    ("solicitud_estado_trgm", "solicitud"),
+    ("reserva_estado_trgm", "reserva"),
+]
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table in INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+            f"ON {table} USING gin (UPPER(estado::text) gin_trgm_ops)"
+        )
+
+
+class Migration(migrations.Migration):
+    # DROP INDEX CONCURRENTLY no puede correr dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('app', '0010_resumen_delta'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_indices, crear_indices),
+    ]
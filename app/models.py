@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 
+from .phones import e164
+
 # ---------- ENUMs como TextChoices (en Django)
 class SolicitudEstado(models.TextChoices):
     NUEVA = "NUEVA", "NUEVA"
@@ -14,6 +19,11 @@ class ReservaEstado(models.TextChoices):
     COMPLETADA = "COMPLETADA", "COMPLETADA"
     CANCELADA = "CANCELADA", "CANCELADA"
 
+class InboxEstado(models.TextChoices):
+    PENDIENTE = "PENDIENTE", "PENDIENTE"
+    PROCESADO = "PROCESADO", "PROCESADO"
+    ERROR = "ERROR", "ERROR"
+
 
 class Coordinador(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -47,10 +57,22 @@ class Tenista(models.Model):
     apellido = models.TextField()
     correo = models.TextField(blank=True, null=True)
     numero = models.TextField(unique=True)
+    # numero normalizado (app.phones.e164) para las búsquedas del bot
+    numero_e164 = models.TextField(blank=True, null=True)
 
     class Meta:
         managed = True
         db_table = 'tenista'
+        indexes = [
+            models.Index(fields=["numero_e164"], name="tenista_numero_e164_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.numero_e164 = e164(self.numero)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "numero" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "numero_e164"}
+        super().save(*args, **kwargs)
 
 
 class Origen(models.Model):
@@ -86,7 +108,7 @@ class Solicitud(models.Model):
     tenista = models.ForeignKey(Tenista, models.DO_NOTHING, db_column='tenista_id', blank=True, null=True, related_name='solicitudes')
 
     idioma_detectado = models.CharField(max_length=8, blank=True, null=True)
-    raw_form = models.JSONField(blank=True, null=True)
+    # el cuerpo original del formulario vive en SolicitudRaw (fuera de esta fila)
 
     estado = models.CharField(max_length=20, choices=SolicitudEstado.choices, default=SolicitudEstado.NUEVA)
     created_at = models.DateTimeField()
@@ -94,6 +116,28 @@ class Solicitud(models.Model):
     class Meta:
         managed = True
         db_table = 'solicitud'
+        indexes = [
+            # bandeja de coordinadores: NUEVA más recientes primero
+            models.Index(fields=["-id"], condition=models.Q(estado="NUEVA"), name="solicitud_nueva_id_idx"),
+            models.Index(fields=["estado", "-id"], name="solicitud_estado_id_idx"),
+            models.Index(fields=["created_at"], name="solicitud_created_at_idx"),
+        ]
+
+
+class SolicitudRaw(models.Model):
+    """
+    Cuerpo original (JSON de n8n) de cada solicitud, para auditoría. Está en
+    su propia tabla para que los listados y scans de solicitud no lo lean;
+    se carga solo a pedido (app/raw_forms.py). Con RAW_FORM_COMPRESS se
+    guarda comprimido (zlib) en body_zlib en vez de body.
+    """
+    solicitud = models.OneToOneField(Solicitud, models.CASCADE, primary_key=True, db_column='solicitud_id', related_name='raw')
+    body = models.JSONField(blank=True, null=True)
+    body_zlib = models.BinaryField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = 'solicitud_raw'
 
 
 class Reserva(models.Model):
@@ -103,6 +147,9 @@ class Reserva(models.Model):
     conductor = models.ForeignKey(Conductor, models.DO_NOTHING, db_column='conductor_id', blank=True, null=True, related_name='reservas')
 
     fecha_hora_agendada = models.DateTimeField()
+    # fin del viaje (agendada + RESERVA_DURACION_MIN): el intervalo que usa la
+    # exclusión reserva_conductor_sin_solape (ver app/scheduling.py)
+    fecha_hora_fin = models.DateTimeField()
     estado = models.CharField(max_length=20, choices=ReservaEstado.choices, default=ReservaEstado.PENDIENTE)
 
     created_at = models.DateTimeField()
@@ -111,3 +158,114 @@ class Reserva(models.Model):
     class Meta:
         managed = True
         db_table = 'reserva'
+        indexes = [
+            # reservas de un conductor en una ventana de tiempo
+            models.Index(fields=["conductor", "fecha_hora_agendada"], name="reserva_conductor_fecha_idx"),
+            models.Index(fields=["estado", "fecha_hora_agendada"], name="reserva_estado_fecha_idx"),
+            # orden (fecha_hora_agendada, id) de la paginación por cursor
+            models.Index(fields=["fecha_hora_agendada", "id"], name="reserva_fecha_id_idx"),
+            # reservas vivas (lo que mira el dashboard y el bot)
+            models.Index(
+                fields=["fecha_hora_agendada"],
+                condition=models.Q(estado__in=["PENDIENTE", "ASIGNADA", "EN_CURSO"]),
+                name="reserva_activa_fecha_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.fecha_hora_agendada is not None:
+            self.fecha_hora_fin = self.fecha_hora_agendada + timedelta(minutes=settings.RESERVA_DURACION_MIN)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "fecha_hora_agendada" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "fecha_hora_fin"}
+        super().save(*args, **kwargs)
+
+
+class WebhookInbox(models.Model):
+    """
+    Cuerpos del webhook tal como llegaron (modo "aceptar rápido"). Se insertan
+    y listo; `manage.py process_inbox` los convierte en Solicitudes por lotes.
+    """
+    id = models.BigAutoField(primary_key=True)
+    body = models.JSONField()
+    received_at = models.DateTimeField()
+
+    estado = models.CharField(max_length=20, choices=InboxEstado.choices, default=InboxEstado.PENDIENTE)
+    intentos = models.SmallIntegerField(default=0)
+    # próximo intento (backoff después de un error)
+    disponible_en = models.DateTimeField()
+    procesado_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    solicitud = models.ForeignKey(Solicitud, models.SET_NULL, db_column='solicitud_id', blank=True, null=True, related_name='+')
+
+    class Meta:
+        managed = True
+        db_table = 'webhook_inbox'
+        indexes = [
+            # lo que toma el worker: pendientes ya disponibles, en orden de llegada
+            models.Index(fields=["disponible_en", "id"], condition=models.Q(estado="PENDIENTE"), name="inbox_pendiente_idx"),
+            # para el conteo de errores del lag sin recorrer todo el histórico
+            models.Index(fields=["id"], condition=models.Q(estado="ERROR"), name="inbox_error_idx"),
+        ]
+
+
+class WebhookIdempotencia(models.Model):
+    """
+    Una fila por clave de idempotencia del webhook (Idempotency-Key, id del
+    mensaje de WhatsApp o hash del payload) con la respuesta 201 original.
+    Vale por WEBHOOK_IDEMPOTENCY_TTL; después la clave se puede volver a usar.
+    """
+    id = models.BigAutoField(primary_key=True)
+    clave = models.TextField(unique=True)
+    solicitud = models.ForeignKey(Solicitud, models.SET_NULL, db_column='solicitud_id', blank=True, null=True, related_name='+')
+    respuesta = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        managed = True
+        db_table = 'webhook_idempotencia'
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotencia_created_idx"),
+        ]
+
+
+class ResumenDiario(models.Model):
+    """
+    Contadores del dashboard: cuántas solicitudes (por día de created_at) y
+    reservas (por día de fecha_hora_agendada) hay en cada estado, ya
+    compactados (los cambios recientes están en ResumenDelta). Los mantiene
+    app/resumen.py; `manage.py rebuild_resumen` corrige desvíos.
+    """
+    id = models.BigAutoField(primary_key=True)
+    dia = models.DateField()
+    tabla = models.CharField(max_length=20)   # "solicitud" / "reserva"
+    estado = models.CharField(max_length=20)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'resumen_diario'
+        constraints = [
+            # dia primero: el dashboard lee rangos de días
+            models.UniqueConstraint(fields=["dia", "tabla", "estado"], name="resumen_dia_tabla_estado_uniq"),
+        ]
+
+
+class ResumenDelta(models.Model):
+    """
+    Cambios de ResumenDiario todavía sin compactar. Cada transacción que mueve
+    contadores inserta sus filas acá (solo INSERT: ningún webhook espera a
+    otro por una fila compartida) y `manage.py compact_resumen` las suma.
+    """
+    id = models.BigAutoField(primary_key=True)
+    dia = models.DateField()
+    tabla = models.CharField(max_length=20)
+    estado = models.CharField(max_length=20)
+    delta = models.IntegerField()
+
+    class Meta:
+        managed = True
+        db_table = 'resumen_delta'
+        indexes = [
+            models.Index(fields=["dia"], name="resumen_delta_dia_idx"),
+        ]
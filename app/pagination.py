@@ -0,0 +1,154 @@
+# app/pagination.py
+"""
+Paginación por keyset (cursor) para las listas que solo crecen.
+
+En vez de COUNT(*) + OFFSET, cada página filtra "después de la última fila"
+sobre el mismo orden del queryset (el de OrderingFilter o el del viewset) con
+`id` como desempate, p. ej. (-id) o (fecha_hora_agendada, id). El costo de una
+página no depende de qué tan profunda sea.
+
+Es opt-in por request: ?paginacion=cursor (o mandar ?cursor=...). Sin eso se
+sigue usando PageNumberPagination, que es lo que espera el admin.
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder recorta a milisegundos; el cursor necesita el valor exacto
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def wants_keyset(request) -> bool:
+    params = request.query_params
+    return params.get("paginacion") == "cursor" or "cursor" in params
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    tiebreaker = "id"
+    invalid_cursor_message = "Cursor inválido"
+
+    # ---------- orden ----------
+    def get_ordering(self, queryset):
+        """Orden del queryset (ya pasó por OrderingFilter) + `id` como desempate."""
+        ordering = [o for o in queryset.query.order_by if isinstance(o, str)]
+        if not ordering:
+            ordering = [f"-{self.tiebreaker}"]
+        names = [o.lstrip("-") for o in ordering]
+        if self.tiebreaker not in names:
+            desc = ordering[0].startswith("-")
+            ordering.append(f"-{self.tiebreaker}" if desc else self.tiebreaker)
+        else:
+            # nada después del desempate afecta el orden
+            ordering = ordering[:names.index(self.tiebreaker) + 1]
+        return ordering
+
+    def _after(self, ordering, values, reverse):
+        """(a, id) > (va, vid) expandido a Q, con un rango sobre la primera columna para usar el índice."""
+        cond = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip("-")
+            desc = field.startswith("-") != reverse
+            op = "lt" if desc else "gt"
+            cond |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        first = ordering[0].lstrip("-")
+        first_desc = ordering[0].startswith("-") != reverse
+        bound = Q(**{f"{first}__{'lte' if first_desc else 'gte'}": values[0]})
+        return bound & cond
+
+    # ---------- cursor ----------
+    def encode_cursor(self, row, reverse):
+        values = [getattr(row, f.lstrip("-")) for f in self.ordering]
+        raw = json.dumps({"v": values, "r": reverse}, cls=_CursorEncoder)
+        token = base64.urlsafe_b64encode(raw.encode()).decode()
+        url = remove_query_param(self.base_url, "page")
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            raw_values, reverse = data["v"], bool(data.get("r"))
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(f.lstrip("-")).to_python(v)
+                for f, v in zip(self.ordering, raw_values)
+            ]
+        except (TypeError, ValueError, KeyError, FieldDoesNotExist, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    # ---------- API de DRF ----------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor[1])
+
+        qs = queryset
+        if cursor:
+            qs = qs.filter(self._after(self.ordering, cursor[0], reverse))
+        if reverse:
+            qs = qs.order_by(*[o[1:] if o.startswith("-") else f"-{o}" for o in self.ordering])
+        else:
+            qs = qs.order_by(*self.ordering)
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,65 @@
+# app/parsers.py
+import json
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+
+def loads(data):
+    """json.loads, pero con orjson si está disponible (acepta bytes o str)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser de DRF usando orjson. orjson ya rechaza NaN/Infinity como STRICT_JSON."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class NDJSONParser(BaseParser):
+    """
+    Un objeto JSON por línea (lo que manda n8n al reenviar un backlog).
+    Devuelve una lista; las líneas vacías se ignoran.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        items = []
+        for n, line in enumerate(stream.read().decode(encoding).splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON inválido en línea {n}: {exc}")
+        return items
+
+
+class CSVParser(BaseParser):
+    """text/csv tal cual: devuelve el stream para leerlo por líneas (ver app/bulk_import.py)."""
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
@@ -0,0 +1,26 @@
+# app/phones.py
+import re
+from typing import Any, Optional
+
+from django.conf import settings
+
+
+def e164(val: Any) -> Optional[str]:
+    """
+    Forma canónica E.164 (+<país><número>, solo dígitos) de un teléfono.
+    Sin código de país se asume PHONE_DEFAULT_COUNTRY (56, Chile) para
+    números locales de 9 dígitos. Se usa para buscar, no para mostrar.
+    """
+    if not isinstance(val, str):
+        return None
+    s = val.strip().lstrip("=").strip()
+    digits = re.sub(r"\D", "", s)
+    if not digits:
+        return None
+    if s.startswith("00"):
+        digits = digits[2:]
+    elif not s.startswith("+"):
+        country = getattr(settings, "PHONE_DEFAULT_COUNTRY", "56")
+        if len(digits) == 9 and not digits.startswith(country):
+            digits = country + digits
+    return f"+{digits}" if digits else None
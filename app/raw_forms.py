@@ -0,0 +1,74 @@
+# app/raw_forms.py
+"""
+Cuerpos originales de los formularios (solicitud_raw).
+
+Se escriben junto con la Solicitud (ingest_forms, SolicitudWriteSerializer)
+y se leen solo cuando alguien los pide: ?include=raw_form en el listado o el
+detalle de /api/api/solicitudes/, o /api/api/solicitudes/<id>/raw/.
+
+Con RAW_FORM_COMPRESS el JSON se guarda comprimido con zlib en body_zlib;
+la lectura entiende los dos formatos, así que se puede prender o apagar sin
+migrar nada.
+"""
+import zlib
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from django.conf import settings
+
+from . import models
+from .parsers import loads
+from .renderers import dumps
+
+INCLUDE = "raw_form"
+
+
+def pack(solicitud_id: int, body: Any) -> models.SolicitudRaw:
+    if getattr(settings, "RAW_FORM_COMPRESS", False):
+        return models.SolicitudRaw(solicitud_id=solicitud_id, body_zlib=zlib.compress(dumps(body)))
+    return models.SolicitudRaw(solicitud_id=solicitud_id, body=body)
+
+
+def unpack(body, body_zlib) -> Any:
+    if body_zlib is not None:
+        return loads(zlib.decompress(bytes(body_zlib)))
+    return body
+
+
+def save_many(pairs: Iterable[Tuple[int, Any]]) -> List[models.SolicitudRaw]:
+    """Un INSERT para todos los (solicitud_id, cuerpo) con cuerpo."""
+    rows = [pack(pk, body) for pk, body in pairs if body is not None]
+    return models.SolicitudRaw.objects.bulk_create(rows) if rows else []
+
+
+def save(solicitud_id: int, body: Any):
+    """Crea o reemplaza el cuerpo de una solicitud (None lo borra)."""
+    if body is None:
+        models.SolicitudRaw.objects.filter(solicitud_id=solicitud_id).delete()
+        return
+    row = pack(solicitud_id, body)
+    models.SolicitudRaw.objects.update_or_create(
+        solicitud_id=solicitud_id, defaults={"body": row.body, "body_zlib": row.body_zlib},
+    )
+
+
+def for_solicitudes(ids: Sequence[int]) -> Dict[int, Any]:
+    """{solicitud_id: cuerpo} en una query."""
+    if not ids:
+        return {}
+    rows = (models.SolicitudRaw.objects.filter(solicitud_id__in=ids)
+            .values_list("solicitud_id", "body", "body_zlib"))
+    return {pk: unpack(body, body_zlib) for pk, body, body_zlib in rows}
+
+
+def wanted(request) -> bool:
+    """?include=raw_form (admite varios separados por coma)."""
+    include = request.query_params.get("include", "")
+    return INCLUDE in {p.strip() for p in include.split(",")}
+
+
+def attach(items: List[dict]):
+    """Agrega "raw_form" a solicitudes ya serializadas (dicts con "id")."""
+    bodies = for_solicitudes([item["id"] for item in items if "id" in item])
+    for item in items:
+        item[INCLUDE] = bodies.get(item.get("id"))
+
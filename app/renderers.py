@@ -0,0 +1,57 @@
+# app/renderers.py
+"""
+JSONRenderer sobre orjson (si está instalado) con la misma salida que el de DRF.
+
+Las fechas, Decimal, UUID, etc. pasan por el mismo encoder de DRF, así que el
+formato no cambia (p. ej. datetimes con 'Z'). Sin orjson se usa el renderer
+estándar de DRF.
+
+Lo que no es idéntico byte a byte son los float (los modelos no tienen
+FloatField; salen de los JSONField y de las métricas):
+  - el exponente: orjson escribe 1e16 / 1e-7 / 0.00001 donde DRF escribe
+    1e+16 / 1e-07 / 1e-05. Es el mismo número y JSON válido;
+  - NaN e Infinity: DRF (STRICT_JSON) tira ValueError y la request es un 500;
+    orjson los escribe como null.
+Detectarlos pide recorrer los datos en Python, que cuesta lo mismo que el
+renderer de DRF, así que se aceptan así (tests en FastJSONTests).
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_drf_default = JSONEncoder().default
+
+
+def dumps(data) -> bytes:
+    """Un valor a JSON compacto (orjson si está), con el encoder de DRF para lo demás."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_drf_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            pass
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=_drf_default, option=option)
+        except TypeError:
+            # lo que orjson no sabe recorrer (p. ej. enteros > 64 bits) va por json
+            return super().render(data, accepted_media_type, renderer_context)
+        # igual que DRF: \u2028 y \u2029 escapados para que sea un subconjunto de JS
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
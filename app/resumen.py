@@ -0,0 +1,286 @@
+# app/resumen.py
+"""
+Contadores del dashboard por (día, estado) en resumen_diario.
+
+Solicitudes cuentan en el día local de created_at y reservas en el de
+fecha_hora_agendada ("reservas de hoy" = viajes agendados para hoy). Así el
+dashboard lee días × estados filas, sin importar cuántas solicitudes haya.
+
+Se mantienen por deltas:
+  - señales pre/post_save y post_delete de Solicitud y Reserva (alta, cambio
+    de estado o de día, baja);
+  - a mano en los caminos que no pasan por señales (ingest_forms,
+    scheduling.auto_asignar, seed).
+Los deltas se anotan en resumen_delta dentro de la misma transacción que
+escribe las filas, con un INSERT simple: ningún webhook espera a otro por la
+fila "hoy / NUEVA". La lectura suma resumen_diario + los deltas pendientes
+(una query) y `manage.py compact_resumen` (cron, cada minuto) los pasa a
+resumen_diario.
+
+Compactar y rebuild() se excluyen entre sí con un advisory lock, pero no
+frenan a los que escriben. rebuild() cuenta las tablas y consume los deltas
+en la misma foto (REPEATABLE READ en Postgres): los deltas que ve son los de
+filas que el recuento ya incluye, y los de transacciones que confirman
+después quedan para la próxima compactación. Si algo queda desviado (un
+UPDATE a mano), `manage.py rebuild_resumen` recalcula desde las tablas.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import ingest, models
+
+# modelo -> (tabla en resumen_diario, campo que define el día)
+TABLAS = {
+    models.Solicitud: ("solicitud", "created_at"),
+    models.Reserva: ("reserva", "fecha_hora_agendada"),
+}
+ESTADOS = {
+    "solicitud": models.SolicitudEstado.values,
+    "reserva": models.ReservaEstado.values,
+}
+MAX_DIAS = 366
+# filas de resumen_delta por pasada de compactar()
+LOTE = 10000
+# advisory lock de compactar() / rebuild() (los que escriben resumen_diario)
+_LOCK_ID = 0x7265_7375
+
+
+def _fecha(value) -> date:
+    # SQLite devuelve las fechas de un cursor crudo como texto
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+Clave = Tuple[str, date, str]
+
+
+def _clave(model, dia_value, estado) -> Optional[Clave]:
+    if dia_value is None or estado is None:
+        return None
+    return TABLAS[model][0], timezone.localdate(dia_value), estado
+
+
+def clave(instance) -> Optional[Clave]:
+    model = type(instance)
+    return _clave(model, getattr(instance, TABLAS[model][1]), instance.estado)
+
+
+def apply(deltas: Dict[Clave, int]):
+    """Anota los deltas en resumen_delta (un INSERT, sin tocar filas compartidas)."""
+    rows = [models.ResumenDelta(tabla=tabla, dia=dia, estado=estado, delta=n)
+            for (tabla, dia, estado), n in deltas.items() if n]
+    if rows:
+        models.ResumenDelta.objects.bulk_create(rows)
+
+
+def _sumar(deltas: Dict[Clave, int]):
+    """total = total + delta en resumen_diario (solo compactar(), con el lock)."""
+    adapt = connection.ops.adapt_datefield_value
+    rows = [(tabla, adapt(dia), estado, n) for (tabla, dia, estado), n in sorted(deltas.items()) if n]
+    if not rows:
+        return
+    t = connection.ops.quote_name(models.ResumenDiario._meta.db_table)
+    ingest._upsert(
+        models.ResumenDiario, ["tabla", "dia", "estado", "total"], rows,
+        conflict=["dia", "tabla", "estado"], updates=f"total = {t}.total + EXCLUDED.total",
+        returning=["id"],
+    )
+
+
+def record(deltas: Dict[Clave, int]):
+    """Aplica los deltas en la transacción actual (confirman o se revierten con las filas)."""
+    deltas = {k: n for k, n in deltas.items() if n}
+    if deltas:
+        apply(deltas)
+
+
+def record_created(instances: Iterable):
+    """Para bulk_create: +1 por fila."""
+    record(Counter(k for k in map(clave, instances) if k is not None))
+
+
+def record_moved(pairs: Iterable[Tuple[Optional[Clave], Optional[Clave]]]):
+    """Para bulk_update: (clave antes, clave después) por fila."""
+    deltas: Counter = Counter()
+    for antes, despues in pairs:
+        if antes != despues:
+            if antes is not None:
+                deltas[antes] -= 1
+            if despues is not None:
+                deltas[despues] += 1
+    record(deltas)
+
+
+# ---------- señales (conectadas en AppConfig.ready) ----------
+def remember(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: la clave que tenía la fila en la BD antes de este save."""
+    if raw or instance._state.adding or instance.pk is None:
+        instance._resumen_antes = None
+        return
+    campo = TABLAS[sender][1]
+    if update_fields is not None and not {"estado", campo} & set(update_fields):
+        instance._resumen_antes = clave(instance)  # no cambia: delta 0
+        return
+    antes = sender.objects.filter(pk=instance.pk).values_list(campo, "estado").first()
+    instance._resumen_antes = _clave(sender, *antes) if antes else None
+
+
+def on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record_moved([(getattr(instance, "_resumen_antes", None), clave(instance))])
+
+
+def on_delete(sender, instance, **kwargs):
+    record_moved([(clave(instance), None)])
+
+
+# ---------- lectura, compactación y reconstrucción ----------
+def _rango(qs, desde: Optional[date], hasta: Optional[date]):
+    if desde:
+        qs = qs.filter(dia__gte=desde)
+    if hasta:
+        qs = qs.filter(dia__lte=hasta)
+    return qs
+
+
+def totales(desde: Optional[date] = None, hasta: Optional[date] = None) -> Counter:
+    """{clave: total} de resumen_diario más los deltas sin compactar. Una query."""
+    compactado = _rango(models.ResumenDiario.objects.order_by(), desde, hasta).values_list(
+        "dia", "tabla", "estado", "total")
+    pendiente = (_rango(models.ResumenDelta.objects.order_by(), desde, hasta)
+                 .values_list("dia", "tabla", "estado").annotate(total=Sum("delta")))
+    out: Counter = Counter()
+    for dia, tabla, estado, total in compactado.union(pendiente, all=True):
+        out[(tabla, _fecha(dia), estado)] += total
+    return out
+
+
+def leer(desde: date, hasta: date) -> dict:
+    """Totales y detalle por día entre desde y hasta (incluidos). Una query."""
+    hoy = timezone.localdate()
+    out = {"desde": desde.isoformat(), "hasta": hasta.isoformat(), "hoy": hoy.isoformat()}
+    for tabla, estados in ESTADOS.items():
+        out[tabla] = {"total": dict.fromkeys(estados, 0), "hoy": dict.fromkeys(estados, 0), "por_dia": {}}
+    for (tabla, dia, estado), total in sorted(totales(desde, hasta).items(), key=lambda kv: kv[0][1]):
+        if not total or tabla not in out:
+            continue
+        res = out[tabla]
+        res["total"][estado] = res["total"].get(estado, 0) + total
+        res["por_dia"].setdefault(dia.isoformat(), {})[estado] = total
+        if dia == hoy:
+            res["hoy"][estado] = total
+    return out
+
+
+@contextmanager
+def _exclusivo():
+    """Advisory lock de sesión (Postgres) entre compactar() y rebuild(); no frena a los que escriben."""
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [_LOCK_ID])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [_LOCK_ID])
+
+
+def _deltas(desde: Optional[date], hasta: Optional[date], consumir: bool,
+            limite: Optional[int] = None) -> Tuple[Counter, int]:
+    """
+    (deltas sumados, filas leídas) de lo que ve la transacción; con consumir,
+    además los borra (DELETE ... RETURNING).
+    """
+    qn = connection.ops.quote_name
+    adapt = connection.ops.adapt_datefield_value
+    t = qn(models.ResumenDelta._meta.db_table)
+    where, params = ["true"], []
+    if desde:
+        where.append("dia >= %s")
+        params.append(adapt(desde))
+    if hasta:
+        where.append("dia <= %s")
+        params.append(adapt(hasta))
+    cond = " AND ".join(where)
+    if limite:
+        cond = f"id IN (SELECT id FROM {t} WHERE {cond} ORDER BY id LIMIT {int(limite)})"
+    if consumir:
+        sql = f"DELETE FROM {t} WHERE {cond} RETURNING dia, tabla, estado, delta"
+    else:
+        sql = f"SELECT dia, tabla, estado, delta FROM {t} WHERE {cond}"
+    out: Counter = Counter()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    for dia, tabla, estado, n in rows:
+        out[(tabla, _fecha(dia), estado)] += n
+    return out, len(rows)
+
+
+def compactar(limite: int = LOTE) -> int:
+    """
+    Pasa hasta `limite` deltas confirmados a resumen_diario y devuelve
+    cuántos consumió. Borrar y sumar van en la misma transacción: un delta
+    que confirma mientras tanto no se ve y queda para la próxima pasada.
+    """
+    with _exclusivo(), transaction.atomic():
+        deltas, filas = _deltas(None, None, consumir=True, limite=limite)
+        _sumar(deltas)
+    return filas
+
+
+def contar(desde: Optional[date] = None, hasta: Optional[date] = None) -> Counter:
+    """Los contadores calculados desde las tablas (GROUP BY), para el rango."""
+    start, end = _bounds(desde, hasta)
+    out: Counter = Counter()
+    for model, (tabla, campo) in TABLAS.items():
+        qs = model.objects.order_by()
+        if start:
+            qs = qs.filter(**{f"{campo}__gte": start})
+        if end:
+            qs = qs.filter(**{f"{campo}__lt": end})
+        for dia, estado, n in qs.annotate(dia=TruncDate(campo)).values_list("dia", "estado").annotate(n=Count("id")):
+            out[(tabla, dia, estado)] = n
+    return out
+
+
+def _bounds(desde: Optional[date], hasta: Optional[date]):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(desde, time.min), tz) if desde else None
+    end = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), tz) if hasta else None
+    return start, end
+
+
+def rebuild(desde: Optional[date] = None, hasta: Optional[date] = None, dry_run: bool = False) -> Dict[Clave, int]:
+    """
+    Recalcula resumen_diario en el rango (todo si no hay rango) y devuelve las
+    diferencias encontradas {clave: correcto - guardado}. Los que escriben
+    siguen insertando deltas mientras tanto (ver el docstring del módulo).
+    """
+    foto_propia = not connection.in_atomic_block
+    with _exclusivo(), transaction.atomic():
+        if foto_propia and connection.vendor == "postgresql":
+            # recuento y deltas consumidos tienen que salir de la misma foto
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        guardado = _rango(models.ResumenDiario.objects.all(), desde, hasta)
+        pendientes, filas = _deltas(desde, hasta, consumir=not dry_run)
+        antes = Counter({(t, d, e): n for d, t, e, n in guardado.values_list("dia", "tabla", "estado", "total")})
+        antes.update(pendientes)
+        correcto = contar(desde, hasta)
+        diffs = {k: correcto[k] - antes[k] for k in set(antes) | set(correcto) if correcto[k] != antes[k]}
+        if not dry_run and (diffs or filas):
+            guardado.delete()
+            models.ResumenDiario.objects.bulk_create(
+                [models.ResumenDiario(tabla=t, dia=d, estado=e, total=n) for (t, d, e), n in correcto.items() if n],
+                batch_size=1000,
+            )
+    return diffs
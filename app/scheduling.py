@@ -0,0 +1,181 @@
+# app/scheduling.py
+"""
+Asignación de conductores sin doble reserva.
+
+Cada Reserva ocupa [fecha_hora_agendada, fecha_hora_fin), con
+fecha_hora_fin = agendada + RESERVA_DURACION_MIN. En Postgres la exclusión
+reserva_conductor_sin_solape (GiST sobre conductor_id + tstzrange, migración
+0007) impide que un conductor tenga dos reservas activas que se pisen; en
+otros motores solo queda la validación de acá.
+
+  - disponibles(desde, hasta): conductores activos libres en esa franja. Es un
+    NOT EXISTS por conductor con el mismo operador (&&) que la exclusión, así
+    que cada chequeo es una búsqueda en su índice GiST: no recorre reservas.
+  - conflicto(...): la reserva que choca (para validar una asignación a mano).
+  - auto_asignar(reservas): reparte un lote de reservas PENDIENTE entre los
+    conductores libres, leyendo de una vez lo ocupado en la ventana del lote.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import contexto, models, resumen
+
+ACTIVE = (models.ReservaEstado.PENDIENTE, models.ReservaEstado.ASIGNADA, models.ReservaEstado.EN_CURSO)
+CONSTRAINT = "reserva_conductor_sin_solape"
+# pg_advisory_xact_lock: dos auto_asignar a la vez no eligen el mismo hueco
+_LOCK_ID = 0x5E5E_0020
+
+
+def duracion() -> timedelta:
+    return timedelta(minutes=getattr(settings, "RESERVA_DURACION_MIN", 90))
+
+
+def _overlap_sql() -> Tuple[str, bool]:
+    """(predicado sobre la reserva r, True si los parámetros van (desde, hasta))."""
+    if connection.vendor == "postgresql":
+        return "tstzrange(r.fecha_hora_agendada, r.fecha_hora_fin, '[)') && tstzrange(%s, %s, '[)')", True
+    return "r.fecha_hora_agendada < %s AND r.fecha_hora_fin > %s", False
+
+
+def _params(desde, hasta) -> List:
+    adapt = connection.ops.adapt_datetimefield_value
+    _, forward = _overlap_sql()
+    return [adapt(desde), adapt(hasta)] if forward else [adapt(hasta), adapt(desde)]
+
+
+def _active_sql() -> str:
+    return "(" + ", ".join(f"'{e}'" for e in ACTIVE) + ")"
+
+
+def disponibles(desde, hasta=None, excluir_reserva=None) -> List[models.Conductor]:
+    """Conductores activos sin reservas activas que se solapen con [desde, hasta)."""
+    hasta = hasta or desde + duracion()
+    overlap, _ = _overlap_sql()
+    qn = connection.ops.quote_name
+    excluir = "AND r.id <> %s" if excluir_reserva else ""
+    sql = (
+        f"SELECT c.* FROM {qn(models.Conductor._meta.db_table)} c "
+        f"WHERE c.activo AND NOT EXISTS ("
+        f"SELECT 1 FROM {qn(models.Reserva._meta.db_table)} r "
+        f"WHERE r.conductor_id = c.id AND r.estado IN {_active_sql()} AND {overlap} {excluir}) "
+        f"ORDER BY c.id"
+    )
+    params = _params(desde, hasta) + ([excluir_reserva] if excluir_reserva else [])
+    return list(models.Conductor.objects.raw(sql, params))
+
+
+def conflicto(conductor_id, desde, hasta=None, excluir_reserva=None) -> Optional[int]:
+    """id de una reserva activa del conductor que se pisa con [desde, hasta), o None."""
+    hasta = hasta or desde + duracion()
+    qs = models.Reserva.objects.filter(
+        conductor_id=conductor_id, estado__in=ACTIVE,
+        fecha_hora_agendada__lt=hasta, fecha_hora_fin__gt=desde,
+    )
+    if excluir_reserva:
+        qs = qs.exclude(pk=excluir_reserva)
+    return qs.values_list("id", flat=True).first()
+
+
+@contextmanager
+def sin_solape():
+    """Traduce la violación de la exclusión (carrera entre dos asignaciones) a un 400."""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if CONSTRAINT not in str(exc):
+            raise
+        raise ValidationError({"conductor_id": ["El conductor ya tiene otra reserva en ese horario."]})
+
+
+class _Agenda:
+    """Intervalos ocupados por conductor, ordenados (no se solapan entre sí)."""
+
+    def __init__(self, conductores: Sequence[int]):
+        self.inicios: Dict[int, list] = {c: [] for c in conductores}
+        self.fines: Dict[int, list] = {c: [] for c in conductores}
+        self.carga: Dict[int, int] = {c: 0 for c in conductores}
+
+    def ocupar(self, conductor: int, desde, hasta):
+        if conductor not in self.inicios:
+            return
+        pos = bisect_left(self.inicios[conductor], desde)
+        self.inicios[conductor].insert(pos, desde)
+        self.fines[conductor].insert(pos, hasta)
+        self.carga[conductor] += 1
+
+    def libre(self, conductor: int, desde, hasta) -> bool:
+        inicios, fines = self.inicios[conductor], self.fines[conductor]
+        pos = bisect_left(inicios, hasta)
+        # solo el intervalo anterior a `hasta` puede pisarse (están ordenados y no se solapan)
+        return pos == 0 or fines[pos - 1] <= desde
+
+    def elegir(self, desde, hasta) -> Optional[int]:
+        """El conductor libre con menos viajes en la ventana (a igualdad, el de menor id)."""
+        libres = [c for c in self.carga if self.libre(c, desde, hasta)]
+        return min(libres, key=lambda c: (self.carga[c], c)) if libres else None
+
+
+def auto_asignar(queryset, limit: int = None) -> Dict[str, list]:
+    """
+    Asigna conductor a las reservas PENDIENTE sin conductor de `queryset` (las
+    primeras `limit` por orden de fecha). Las que no tienen a nadie libre
+    quedan como estaban.
+    Son 3 lecturas y un UPDATE, sin importar el tamaño del lote.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_LOCK_ID])
+        pendientes = list(
+            queryset.filter(estado=models.ReservaEstado.PENDIENTE, conductor__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by("fecha_hora_agendada", "id")
+            .only("id", "solicitud_id", "estado", "fecha_hora_agendada", "fecha_hora_fin")[:limit]
+        )
+        if not pendientes:
+            return {"asignadas": [], "sin_conductor": []}
+
+        desde = pendientes[0].fecha_hora_agendada
+        hasta = max(r.fecha_hora_fin for r in pendientes)
+        agenda = _Agenda(models.Conductor.objects.filter(activo=True).values_list("id", flat=True))
+        ocupadas = (models.Reserva.objects
+                    .filter(conductor__isnull=False, estado__in=ACTIVE,
+                            fecha_hora_agendada__lt=hasta, fecha_hora_fin__gt=desde)
+                    .values_list("conductor_id", "fecha_hora_agendada", "fecha_hora_fin"))
+        for conductor, inicio, fin in ocupadas:
+            agenda.ocupar(conductor, inicio, fin)
+
+        now = timezone.now()
+        asignadas, sin_conductor, movidas = [], [], []
+        for r in pendientes:
+            conductor = agenda.elegir(r.fecha_hora_agendada, r.fecha_hora_fin)
+            if conductor is None:
+                sin_conductor.append(r.id)
+                continue
+            agenda.ocupar(conductor, r.fecha_hora_agendada, r.fecha_hora_fin)
+            antes = resumen.clave(r)
+            r.conductor_id, r.estado, r.updated_at = conductor, models.ReservaEstado.ASIGNADA, now
+            asignadas.append(r)
+            movidas.append((antes, resumen.clave(r)))
+
+        if asignadas:
+            with sin_solape():
+                models.Reserva.objects.bulk_update(asignadas, ["conductor", "estado", "updated_at"])
+            # bulk_update no dispara señales: contadores del dashboard y contexto del bot a mano
+            resumen.record_moved(movidas)
+            solicitud_ids = [r.solicitud_id for r in asignadas]
+            transaction.on_commit(lambda: contexto.forget(
+                models.Solicitud.objects.filter(pk__in=solicitud_ids).values_list("tenista_id", flat=True)
+            ))
+    return {
+        "asignadas": [{"id": r.id, "conductor_id": r.conductor_id} for r in asignadas],
+        "sin_conductor": sin_conductor,
+    }
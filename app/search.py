@@ -0,0 +1,75 @@
+# app/search.py
+"""
+SearchFilter indexado para el buscador de coordinadores.
+
+En Postgres los `icontains` que arma DRF quedan como UPPER(col::text) LIKE
+UPPER('%x%'); la migración 0002 crea índices GIN pg_trgm sobre exactamente esa
+expresión, así que el planner puede usar un BitmapOr en vez de un seq scan.
+Para que eso funcione con campos de otra tabla (conductor__nombre,
+solicitud__form_telefono) cada uno se busca en un subquery sobre su propia
+tabla (`conductor_id IN (...)`) en lugar de un JOIN con OR. Los campos con
+choices (estado) no tienen índice trigram: el término se compara en Python
+contra los valores posibles y queda un `estado IN (...)` que usa el btree.
+
+Si no se pide ?ordering=, los resultados vienen ordenados por similitud
+(pg_trgm word_similarity). En SQLite se comporta igual que SearchFilter.
+"""
+import operator
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework import filters
+
+from .pagination import wants_keyset
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    rank_annotation = "search_rank"
+
+    def term_q(self, queryset, field_name, term):
+        if field_name[0] not in self.lookup_prefixes:
+            head, _, rest = field_name.partition("__")
+            field = queryset.model._meta.get_field(head)
+            if not rest and field.choices:
+                return Q(**{f"{head}__in": [v for v, _ in field.flatchoices if term.upper() in str(v).upper()]})
+            if rest and field.concrete and (field.many_to_one or field.one_to_one):
+                related = field.related_model._default_manager.all()
+                sub = related.filter(self.term_q(related, rest, term)).values("pk")
+                return Q(**{f"{head}__in": sub})
+        return Q(**{self.construct_search(field_name, queryset): term})
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        conditions = (
+            reduce(operator.or_, (self.term_q(queryset, str(f), term) for f in search_fields))
+            for term in search_terms
+        )
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+
+        if connections[queryset.db].vendor == "postgresql" and self.should_rank(request):
+            queryset = self.rank(queryset, search_fields, search_terms)
+        return queryset
+
+    def should_rank(self, request):
+        # un ?ordering= explícito manda, y el cursor necesita un orden por columnas reales
+        return not request.query_params.get(filters.OrderingFilter.ordering_param) and not wants_keyset(request)
+
+    def rank(self, queryset, search_fields, search_terms):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        from django.db.models.functions import Greatest
+
+        local = [f for f in search_fields if "__" not in f and f[0] not in self.lookup_prefixes]
+        if not local:
+            return queryset
+        text = " ".join(search_terms)
+        sims = [TrigramWordSimilarity(text, f) for f in local]
+        score = sims[0] if len(sims) == 1 else Greatest(*sims)
+        return (queryset
+                .annotate(**{self.rank_annotation: score})
+                .order_by(f"-{self.rank_annotation}", *queryset.query.order_by))
@@ -0,0 +1,286 @@
+# app/seed.py
+"""
+Datos sintéticos para pruebas de carga (ver `manage.py seed_data`).
+
+Genera grafos consistentes Tenista / Origen / Destino / Conductor /
+Coordinador / Solicitud / Reserva con un random.Random(seed), así que los
+mismos parámetros dan exactamente las mismas filas. Los ids se asignan acá
+(desde max(id) + 1 de cada tabla) para poder armar las FKs sin leer nada de
+vuelta; al final se reajustan las secuencias.
+
+En Postgres se carga con COPY; en otros motores con bulk_create. Todo se
+genera por lotes, así que la memoria no crece con la cantidad de filas.
+"""
+import json
+import random
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import models, resumen, versions
+from .ingest import copy_rows
+
+NOMBRES = ["Ana", "Benjamín", "Camila", "Diego", "Elena", "Felipe", "Gabriela", "Hugo",
+           "Isidora", "Javier", "Karen", "Lucas", "Martina", "Nicolás", "Olivia", "Pedro",
+           "Rocío", "Sebastián", "Trinidad", "Vicente"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva",
+             "Martínez", "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández",
+             "Torres", "Araya", "Flores", "Espinoza", "Valenzuela"]
+ORIGENES = ["Hotel", "Club", "Aeropuerto", "Estadio", "Condominio", "Terminal"]
+DESTINOS = ["Cancha", "Complejo", "Parque", "Centro Deportivo", "Aeropuerto", "Hotel"]
+
+SOLICITUD_MIX = {"NUEVA": 0.15, "EN_REVISION": 0.10, "RECHAZADA": 0.10, "CONFIRMADA": 0.65}
+RESERVA_MIX = {"PENDIENTE": 0.10, "ASIGNADA": 0.10, "EN_CURSO": 0.02, "COMPLETADA": 0.70, "CANCELADA": 0.08}
+
+DEFAULTS = {
+    "tenistas": 10_000,
+    "solicitudes": 100_000,
+    "origenes": 200,
+    "destinos": 200,
+    "conductores": 100,
+    "coordinadores": 10,
+    # fracción de solicitudes que mandan los "clientes frecuentes" (el 10% de los tenistas)
+    "repeat_share": 0.6,
+    "solicitud_mix": SOLICITUD_MIX,
+    "reserva_mix": RESERVA_MIX,
+    "days": 365,
+    "end": None,  # fin del rango de created_at (por defecto hoy a medianoche)
+    "raw_form": True,
+    "batch": 50_000,
+    "seed": 1,
+}
+
+SEED_NUMBER_PREFIX = "+999"  # código de país reservado: nunca choca con un teléfono real
+
+
+def parse_mix(text: str, allowed: Sequence[str]) -> Dict[str, float]:
+    """'NUEVA=0.2,CONFIRMADA=0.8' -> {'NUEVA': 0.2, 'CONFIRMADA': 0.8}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        estado, _, weight = part.partition("=")
+        estado = estado.strip().upper()
+        if estado not in allowed:
+            raise ValueError(f"estado desconocido: {estado} (válidos: {', '.join(allowed)})")
+        mix[estado] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("la mezcla de estados necesita al menos un peso positivo")
+    return mix
+
+
+def _zipf_cum(n: int) -> List[float]:
+    """Pesos acumulados 1/(i+1): pocos catálogos concentran la mayoría de los viajes."""
+    return list(accumulate(1 / (i + 1) for i in range(n)))
+
+
+def _chunks(total: int, size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def _next_ids(*model_classes) -> Dict[type, int]:
+    return {m: (m.objects.aggregate(m=Max("id"))["m"] or 0) + 1 for m in model_classes}
+
+
+class Generator:
+    """Filas (tuplas en el orden de COLUMNS) para cada tabla, por lotes."""
+
+    COLUMNS = {
+        models.Coordinador: ["id", "nombre", "correo", "created_at"],
+        models.Conductor: ["id", "nombre", "apellido", "patente", "mail", "telefono", "activo", "created_at"],
+        models.Origen: ["id", "salida"],
+        models.Destino: ["id", "lugar"],
+        models.Tenista: ["id", "nombre", "apellido", "correo", "numero", "numero_e164"],
+        models.Solicitud: ["id", "form_nombres", "form_apellidos", "form_correo", "form_telefono",
+                           "pasajeros", "hora_salida", "observaciones", "origen_id", "destino_id",
+                           "tenista_id", "idioma_detectado", "estado", "created_at"],
+        models.SolicitudRaw: ["solicitud_id", "body"],
+        models.Reserva: ["id", "solicitud_id", "coordinador_id", "conductor_id",
+                         "fecha_hora_agendada", "fecha_hora_fin", "estado", "created_at", "updated_at"],
+    }
+
+    def __init__(self, opts: dict, first_ids: Dict[type, int]):
+        self.o = {**DEFAULTS, **{k: v for k, v in opts.items() if v is not None}}
+        self.rng = random.Random(self.o["seed"])
+        self.first = first_ids
+        end = self.o["end"] or timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end = end
+        self.start = end - timedelta(days=self.o["days"])
+        for key in ("tenistas", "origenes", "destinos", "conductores", "coordinadores"):
+            if self.o[key] < 1:
+                raise ValueError(f"{key} tiene que ser >= 1")
+
+    def _tenista(self, idx: int):
+        """nombre, apellido y número del tenista idx (derivados del índice, sin guardarlos)."""
+        pk = self.first[models.Tenista] + idx
+        return NOMBRES[idx % len(NOMBRES)], APELLIDOS[(idx // len(NOMBRES)) % len(APELLIDOS)], f"{SEED_NUMBER_PREFIX}{pk:09d}"
+
+    # ---- catálogos y personas (chicos, un solo lote) ----
+    def coordinadores(self) -> Iterator[List[tuple]]:
+        base = self.first[models.Coordinador]
+        yield [(base + i, f"Coordinador {base + i}", f"coordinador{base + i}@seed.invalid", self.start)
+               for i in range(self.o["coordinadores"])]
+
+    def conductores(self) -> Iterator[List[tuple]]:
+        base, rng = self.first[models.Conductor], self.rng
+        yield [(base + i, NOMBRES[i % len(NOMBRES)], APELLIDOS[i % len(APELLIDOS)],
+                f"SD{base + i:05d}", f"conductor{base + i}@seed.invalid", f"{SEED_NUMBER_PREFIX}{base + i:09d}",
+                rng.random() < 0.9, self.start)
+               for i in range(self.o["conductores"])]
+
+    def origenes(self) -> Iterator[List[tuple]]:
+        base = self.first[models.Origen]
+        yield [(base + i, f"{ORIGENES[i % len(ORIGENES)]} #{base + i}") for i in range(self.o["origenes"])]
+
+    def destinos(self) -> Iterator[List[tuple]]:
+        base = self.first[models.Destino]
+        yield [(base + i, f"{DESTINOS[i % len(DESTINOS)]} #{base + i}") for i in range(self.o["destinos"])]
+
+    def tenistas(self) -> Iterator[List[tuple]]:
+        base = self.first[models.Tenista]
+        for start, size in _chunks(self.o["tenistas"], self.o["batch"]):
+            rows = []
+            for idx in range(start, start + size):
+                nombre, apellido, numero = self._tenista(idx)
+                correo = f"tenista{base + idx}@seed.invalid" if idx % 3 else None
+                rows.append((base + idx, nombre, apellido, correo, numero, numero))
+            yield rows
+
+    # ---- solicitudes + reservas (el grueso) ----
+    def solicitudes_y_reservas(self) -> Iterator[Tuple[List[tuple], List[tuple], List[tuple]]]:
+        """Lotes de (solicitudes, cuerpos de solicitud_raw, reservas)."""
+        # Es el loop caliente (>100k filas/s): todo lo que se puede se sortea por
+        # lote con rng.choices y se evitan randint/timedelta por fila.
+        o, rng = self.o, self.rng
+        rand = rng.random
+        n_ten, total, n_cond, n_coord = o["tenistas"], o["solicitudes"], o["conductores"], o["coordinadores"]
+        hot = max(1, n_ten // 10)
+        repeat_share = o["repeat_share"]
+        origen_cum, destino_cum = _zipf_cum(o["origenes"]), _zipf_cum(o["destinos"])
+        sol_estados, sol_w = zip(*o["solicitud_mix"].items())
+        res_estados, res_w = zip(*o["reserva_mix"].items())
+        first_sol, first_res = self.first[models.Solicitud], self.first[models.Reserva]
+        first_org, first_dst = self.first[models.Origen], self.first[models.Destino]
+        first_ten = self.first[models.Tenista]
+        first_cond, first_coord = self.first[models.Conductor], self.first[models.Coordinador]
+        horas = [(time(h, m), f"{h:02d}:{m:02d}") for h in range(6, 23) for m in (0, 30)]
+        n_horas, n_nom, n_ape = len(horas), len(NOMBRES), len(APELLIDOS)
+        tz = self.end.tzinfo
+        t0 = self.start.timestamp()
+        step = (self.end.timestamp() - t0) / total if total else 0
+        fromts = datetime.fromtimestamp
+        raw_form = o["raw_form"]
+        org_txt = [ORIGENES[i % len(ORIGENES)] for i in range(o["origenes"])]
+        dst_txt = [DESTINOS[i % len(DESTINOS)] for i in range(o["destinos"])]
+        next_res = first_res
+        # reservas activas con conductor: no se pueden solapar (exclusión
+        # reserva_conductor_sin_solape). Las fechas caen en medias horas, así
+        # que alcanza con marcar las medias horas que ocupa cada viaje.
+        duracion = timedelta(minutes=settings.RESERVA_DURACION_MIN)
+        n_slots = -(-settings.RESERVA_DURACION_MIN // 30)
+        ocupado: Dict[int, set] = {}
+
+        for start, size in _chunks(total, o["batch"]):
+            estados = rng.choices(sol_estados, weights=sol_w, k=size)
+            res_estado = rng.choices(res_estados, weights=res_w, k=size)
+            origenes = rng.choices(range(o["origenes"]), cum_weights=origen_cum, k=size)
+            destinos = rng.choices(range(o["destinos"]), cum_weights=destino_cum, k=size)
+            sols, raws, ress = [], [], []
+            for j in range(size):
+                i = start + j
+                # clientes frecuentes: el 10% de los tenistas manda repeat_share de las solicitudes
+                idx = int(rand() * hot) if rand() < repeat_share else int(rand() * n_ten)
+                nombre = NOMBRES[idx % n_nom]
+                apellido = APELLIDOS[(idx // n_nom) % n_ape]
+                numero = f"{SEED_NUMBER_PREFIX}{first_ten + idx:09d}"
+                # ids crecientes en el tiempo, como en producción
+                ts = t0 + step * (i + rand())
+                created = fromts(ts, tz)
+                pasajeros = int(rand() * 4) + 1
+                hora, hora_txt = horas[int(rand() * n_horas)]
+                oi, di = origenes[j], destinos[j]
+                org, dst = first_org + oi, first_dst + di
+                sol_id = first_sol + i
+                if raw_form:
+                    raws.append((sol_id, f'{{"from_phone":"{numero}","nombres":"{nombre}","apellidos":"{apellido}",'
+                                 f'"pasajeros":{pasajeros},"hora_salida":"{hora_txt}",'
+                                 f'"origen":"{org_txt[oi]} #{org}","destino":"{dst_txt[di]} #{dst}"}}'))
+                estado = estados[j]
+                sols.append((sol_id, nombre, apellido, None, numero, pasajeros, hora,
+                             None, org, dst, first_ten + idx, "es", estado, created))
+
+                if estado == "CONFIRMADA":
+                    res = res_estado[j]
+                    # 1 a 14 días después, a la hora pedida (en punto o y media)
+                    day = fromts(ts + 86400 * (int(rand() * 14) + 1), tz)
+                    fecha = day.replace(hour=hora.hour, minute=hora.minute, second=0, microsecond=0)
+                    conductor = None if res == "PENDIENTE" else first_cond + int(rand() * n_cond)
+                    if res in ("ASIGNADA", "EN_CURSO"):
+                        slot = int(fecha.timestamp()) // 1800
+                        slots = range(slot, slot + n_slots)
+                        for k in range(n_cond):
+                            c = first_cond + (conductor - first_cond + k) % n_cond
+                            busy = ocupado.setdefault(c, set())
+                            if busy.isdisjoint(slots):
+                                busy.update(slots)
+                                conductor = c
+                                break
+                        else:  # nadie libre a esa hora: queda sin asignar
+                            conductor, res = None, "PENDIENTE"
+                    ress.append((next_res, sol_id, first_coord + int(rand() * n_coord), conductor,
+                                 fecha, fecha + duracion, res, fromts(ts + 60 * (int(rand() * 600) + 5), tz), fecha))
+                    next_res += 1
+            yield sols, raws, ress
+# ---------- carga ----------
+def _copy(model, columns: Sequence[str], rows: Sequence[tuple]):
+    copy_rows(model._meta.db_table, columns, rows)
+
+
+def _bulk(model, columns: Sequence[str], rows: Sequence[tuple]):
+    objs = [model(**dict(zip(columns, row))) for row in rows]
+    if model is models.SolicitudRaw:
+        for obj in objs:  # el cuerpo va como JSON, no como texto
+            obj.body = json.loads(obj.body)
+    model.objects.bulk_create(objs, batch_size=1000)
+
+
+def load(opts: dict, progress=None) -> Dict[str, int]:
+    """Genera y carga todo en una transacción; devuelve filas por tabla."""
+    order = [models.Coordinador, models.Conductor, models.Origen, models.Destino,
+             models.Tenista, models.Solicitud, models.Reserva]
+    write = _copy if connection.vendor == "postgresql" else _bulk
+    counts = {m._meta.db_table: 0 for m in [*order, models.SolicitudRaw]}
+
+    def emit(model, batches: Iterable[List[tuple]]):
+        for rows in batches:
+            if rows:
+                write(model, Generator.COLUMNS[model], rows)
+                counts[model._meta.db_table] += len(rows)
+                if progress:
+                    progress(model._meta.db_table, counts[model._meta.db_table])
+
+    with transaction.atomic():
+        gen = Generator(opts, _next_ids(*order))
+        emit(models.Coordinador, gen.coordinadores())
+        emit(models.Conductor, gen.conductores())
+        emit(models.Origen, gen.origenes())
+        emit(models.Destino, gen.destinos())
+        emit(models.Tenista, gen.tenistas())
+        for sols, raws, ress in gen.solicitudes_y_reservas():
+            emit(models.Solicitud, [sols])
+            emit(models.SolicitudRaw, [raws])
+            emit(models.Reserva, [ress])
+        # los ids se asignaron a mano: la secuencia tiene que seguir después del último
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), order):
+                cursor.execute(sql)
+        # lo cargado no pasa por señales: contadores del dashboard (created_at y
+        # fechas agendadas caen entre start y end + 15 días), ETags y caches
+        resumen.rebuild(gen.start.date(), (gen.end + timedelta(days=15)).date())
+        transaction.on_commit(lambda: versions.bump_tables(*versions.VERSIONED))
+    return counts
@@ -3,6 +3,25 @@ from .models import (
     Coordinador, Conductor, Tenista, Origen, Destino,
     Solicitud, Reserva
 )
+from . import raw_forms, scheduling
+from .catalog import catalog_for
+
+
+class CatalogPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField para Origen/Destino que valida el id contra el LRU del catálogo."""
+
+    def to_internal_value(self, data):
+        cache = catalog_for(self.get_queryset().model)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            return super().to_internal_value(data)
+        text = cache.text_for(pk)
+        if text is not None:
+            return cache.model(**{"id": pk, cache.field: text})
+        obj = super().to_internal_value(data)
+        cache.put_many({getattr(obj, cache.field): obj.pk})
+        return obj
 
 class CoordinadorSerializer(serializers.ModelSerializer):
     class Meta:
@@ -48,15 +67,17 @@ class SolicitudReadNestedSerializer(serializers.ModelSerializer):
 
 class SolicitudWriteSerializer(serializers.ModelSerializer):
     # Escritura por IDs
-    origen_id = serializers.PrimaryKeyRelatedField(
+    origen_id = CatalogPrimaryKeyField(
         source='origen', queryset=Origen.objects.all(), allow_null=True, required=False
     )
-    destino_id = serializers.PrimaryKeyRelatedField(
+    destino_id = CatalogPrimaryKeyField(
         source='destino', queryset=Destino.objects.all(), allow_null=True, required=False
     )
     tenista_id = serializers.PrimaryKeyRelatedField(
         source='tenista', queryset=Tenista.objects.all(), allow_null=True, required=False
     )
+    # va a solicitud_raw (app/raw_forms.py), no a la fila de solicitud
+    raw_form = serializers.JSONField(write_only=True, required=False, allow_null=True)
 
     class Meta:
         model = Solicitud
@@ -70,6 +91,20 @@ class SolicitudWriteSerializer(serializers.ModelSerializer):
             "estado", "created_at",
         ]
 
+    def create(self, validated_data):
+        raw = validated_data.pop("raw_form", None)
+        instance = super().create(validated_data)
+        if raw is not None:
+            raw_forms.save(instance.pk, raw)
+        return instance
+
+    def update(self, instance, validated_data):
+        has_raw, raw = "raw_form" in validated_data, validated_data.pop("raw_form", None)
+        instance = super().update(instance, validated_data)
+        if has_raw:
+            raw_forms.save(instance.pk, raw)
+        return instance
+
 
 # --- Reserva ---
 
@@ -80,7 +115,8 @@ class ReservaReadNestedSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Reserva
-        fields = "__all__"
+        # fecha_hora_fin es interna (la calcula Reserva.save para los solapes)
+        exclude = ["fecha_hora_fin"]
 
 
 class ReservaWriteSerializer(serializers.ModelSerializer):
@@ -108,4 +144,18 @@ class ReservaWriteSerializer(serializers.ModelSerializer):
         # fh = attrs.get("fecha_hora_agendada")
         # if fh and fh.minute not in (0, 30):
         #     raise serializers.ValidationError("La hora debe ser en punto o y media.")
+
+        # un conductor no puede tener dos reservas activas que se solapen
+        # (en Postgres además lo garantiza la exclusión reserva_conductor_sin_solape)
+        instance = self.instance
+        conductor = attrs["conductor"] if "conductor" in attrs else getattr(instance, "conductor", None)
+        estado = attrs.get("estado", getattr(instance, "estado", None) or Reserva._meta.get_field("estado").default)
+        fecha = attrs.get("fecha_hora_agendada", getattr(instance, "fecha_hora_agendada", None))
+        if conductor is not None and fecha is not None and estado in scheduling.ACTIVE:
+            hasta = fecha + scheduling.duracion()
+            otra = scheduling.conflicto(conductor.pk, fecha, hasta, excluir_reserva=getattr(instance, "pk", None))
+            if otra is not None:
+                raise serializers.ValidationError(
+                    {"conductor_id": [f"El conductor ya tiene la reserva {otra} en ese horario."]}
+                )
         return attrs
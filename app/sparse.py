@@ -0,0 +1,69 @@
+# app/sparse.py
+"""
+?fields= y ?expand= para list / retrieve de todos los viewsets del router.
+
+    GET /api/api/reservas/?fields=id,estado,fecha_hora_agendada
+    GET /api/api/reservas/?expand=conductor
+    GET /api/api/reservas/?fields=id,solicitud.tenista.numero
+
+Sin ninguno de los dos la respuesta es la de siempre (el grafo anidado
+completo). Con alguno:
+  - fields: solo esos campos; "a.b" entra en el anidado a (y lo expande);
+  - las relaciones anidadas salen como su id ("conductor": 7) salvo que estén
+    en expand ("solicitud.tenista" expande las dos) o tengan sub-campos en fields.
+
+El recorte llega al SQL: .only() con las columnas del plan (más las del
+orden, para el cursor) y select_related solo de lo expandido. Nombres
+desconocidos son un 400.
+"""
+from typing import Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+from .fast_serializers import CompiledSerializer, Tree, compiled
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _tree(value: str) -> Tree:
+    """"id,solicitud.tenista.numero" -> {"id": {}, "solicitud": {"tenista": {"numero": {}}}}"""
+    tree: Tree = {}
+    for path in filter(None, (p.strip() for p in value.split(","))):
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part.strip(), {})
+    return tree
+
+
+def from_request(request, serializer_class) -> Optional[CompiledSerializer]:
+    """El serializer compilado recortado, o None si la request no pide nada."""
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return None
+    fields = _tree(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+    try:
+        return compiled(serializer_class).sparse(fields, _tree(params.get(EXPAND_PARAM, "")))
+    except ValueError as exc:
+        raise ValidationError({"fields": [f"Campo desconocido: {name}" for name in exc.args]})
+
+
+def prepare(queryset, fast: CompiledSerializer):
+    """select_related de lo expandido (antes de filtrar)."""
+    return queryset.select_related(*fast.select_related) if fast.select_related else queryset
+
+
+def restrict(queryset, fast: CompiledSerializer):
+    """only() con las columnas del plan y las del ORDER BY (después de filtrar y ordenar)."""
+    if fast.only is None:
+        return queryset
+    ordering = []
+    for o in queryset.query.order_by:
+        if not isinstance(o, str) or "__" in o:
+            continue
+        try:  # las anotaciones (rank del buscador) no son columnas
+            ordering.append(queryset.model._meta.get_field(o.lstrip("-")).name)
+        except FieldDoesNotExist:
+            continue
+    return queryset.only(*fast.only, *ordering)
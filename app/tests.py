@@ -1,3 +1,1322 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import tempfile
+import threading
+from datetime import time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipIf
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from . import async_views, bulk_import, inbox, metrics, models, raw_forms, renderers, resumen, scheduling, seed, versions
+from .catalog import CATALOGS
+from .eager import apply_eager_plan
+from .fast_serializers import compiled
+from .management.commands.explain_hot_queries import hot_queries
+from .middleware import brotli
+from .pagination import KeysetPagination
+from .parsers import FastJSONParser
+from .phones import e164
+from .renderers import FastJSONRenderer
+from .serializers import ConductorSerializer, ReservaReadNestedSerializer, SolicitudReadNestedSerializer
+from .urls import router
 
 # Create your tests here.
+
+WEBHOOK_URL = "/api/webhooks/whatsapp/"
+TOKEN = {"HTTP_X_WEBHOOK_TOKEN": "whatsapp333"}
+
+# savepoint + clave de idempotencia + tenista + origen + destino + solicitud
+# + solicitud_raw + resumen_diario + respuesta guardada + release
+WEBHOOK_QUERY_BUDGET = 10
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class WhatsappWebhookTests(TestCase):
+    payload = {
+        "from_phone": "+56 9 1234 5678",
+        "nombres": "Ana",
+        "apellidos": "Pérez",
+        "pasajeros": "=2",
+        "hora_salida": "13:30",
+        "origen": "Club",
+        "destino": {"lugar": "Aeropuerto"},
+    }
+
+    def setUp(self):
+        cache.clear()
+        for c in CATALOGS.values():
+            c.clear()
+
+    def post(self, body, **extra):
+        return self.client.post(WEBHOOK_URL, body, content_type="application/json", **TOKEN, **extra)
+
+    def test_query_budget(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.post(self.payload)
+        self.assertEqual(resp.status_code, 201)
+        self.assertLessEqual(
+            len(ctx.captured_queries), WEBHOOK_QUERY_BUDGET,
+            "\n".join(q["sql"] for q in ctx.captured_queries),
+        )
+
+    def test_response_matches_db(self):
+        data = self.post(self.payload).json()["solicitud"]
+        sol = models.Solicitud.objects.select_related("tenista", "origen", "destino").get(pk=data["id"])
+        self.assertEqual(data["origen"], "Club")
+        self.assertEqual(data["destino"], "Aeropuerto")
+        self.assertEqual(data["pasajeros"], 2)
+        self.assertEqual(data["hora_salida"], "13:30:00")
+        self.assertEqual(data["tenista"]["id"], sol.tenista_id)
+        self.assertEqual(data["tenista"]["numero"], "+56912345678")
+
+    def test_repeat_sender_enriches_tenista(self):
+        self.post({"from_phone": "+56912345678"})
+        data = self.post({**self.payload, "correo": "ana@example.com"}).json()["solicitud"]
+        self.assertEqual(models.Tenista.objects.count(), 1)
+        self.assertEqual(data["tenista"]["nombre"], "Ana")
+        self.assertEqual(data["tenista"]["correo"], "ana@example.com")
+        tenista = models.Tenista.objects.get()
+        self.assertEqual((tenista.nombre, tenista.apellido), ("Ana", "Pérez"))
+
+    def test_missing_phone(self):
+        resp = self.post({"nombres": "Ana"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(models.Solicitud.objects.exists())
+
+    def test_values_outside_their_columns(self):
+        for body in ({**self.payload, "pasajeros": 99999}, {**self.payload, "pasajeros": "0"},
+                     {**self.payload, "observaciones": "hola\x00"}):
+            resp = self.post(body)
+            self.assertEqual(resp.status_code, 400, body)
+        self.assertFalse(models.Solicitud.objects.exists())
+
+    def test_retry_is_idempotent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.post(self.payload)
+        # reintento de n8n: mismo cuerpo, desde el cache, sin tocar la BD
+        with self.assertNumQueries(0):
+            retry = self.post(self.payload)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        # sin cache: la fila de webhook_idempotencia alcanza, sin escrituras nuevas
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.post(self.payload).json(), first.json())
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn('INTO "solicitud"', sql)
+        self.assertNotIn('UPDATE "webhook_idempotencia"', sql)
+        self.assertEqual(models.Solicitud.objects.count(), 1)
+
+    def test_idempotency_keys(self):
+        a = self.post(self.payload, HTTP_IDEMPOTENCY_KEY="k1").json()
+        self.assertEqual(self.post({**self.payload, "pasajeros": 3}, HTTP_IDEMPOTENCY_KEY="k1").json(), a)
+        b = self.post({**self.payload, "message_id": "wamid.1"}).json()
+        self.assertEqual(self.post({**self.payload, "message_id": "wamid.1", "pasajeros": 4}).json(), b)
+        self.assertNotEqual(a["solicitud"]["id"], b["solicitud"]["id"])
+        # una clave vencida se vuelve a usar
+        models.WebhookIdempotencia.objects.update(created_at=timezone.now() - timedelta(days=2))
+        cache.clear()
+        self.assertNotEqual(self.post(self.payload, HTTP_IDEMPOTENCY_KEY="k1").json(), a)
+        self.assertEqual(models.Solicitud.objects.count(), 3)
+        with override_settings(WEBHOOK_IDEMPOTENCY_TTL=0):
+            self.post(self.payload)
+            self.post(self.payload)
+        self.assertEqual(models.Solicitud.objects.count(), 5)
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class WebhookBatchTests(TestCase):
+    url = "/api/webhooks/whatsapp/batch/"
+
+    def setUp(self):
+        cache.clear()
+        for c in CATALOGS.values():
+            c.clear()
+
+    def post(self, items):
+        return self.client.post(self.url, items, content_type="application/json", **TOKEN)
+
+    def items(self, n, tag=""):
+        return [{"from_phone": f"+569{tag}{i:07d}", "nombres": f"T{i}", "origen": f"Club {i % 3}",
+                 "destino": {"lugar": "Aeropuerto"}, "pasajeros": i % 4 + 1} for i in range(n)]
+
+    def test_results_in_input_order(self):
+        ok1, ok2 = self.items(2)
+        resp = self.post([ok1, {"nombres": "sin telefono"}, "no es un objeto",
+                          {**ok2, "pasajeros": 99999}, ok2])
+        self.assertEqual(resp.status_code, 201)
+        data = resp.json()
+        self.assertEqual((data["total"], data["creadas"]), (5, 2))
+        ok = [r["ok"] for r in data["resultados"]]
+        self.assertEqual(ok, [True, False, False, False, True])
+        self.assertIn("pasajeros", data["resultados"][3]["error"])
+        self.assertEqual(data["resultados"][0]["solicitud"]["tenista"]["numero"], ok1["from_phone"])
+        self.assertEqual(data["resultados"][4]["solicitud"]["tenista"]["numero"], ok2["from_phone"])
+        self.assertEqual(models.Solicitud.objects.count(), 2)
+
+    def test_ndjson(self):
+        body = "\n".join(json.dumps(item) for item in self.items(3)) + "\n"
+        resp = self.client.post(self.url, body, content_type="application/x-ndjson", **TOKEN)
+        self.assertEqual(resp.json()["creadas"], 3)
+        self.assertEqual(resp.status_code, 201)
+
+    def test_replay_of_ingested_message(self):
+        ok1, ok2 = self.items(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(WEBHOOK_URL, ok1, content_type="application/json", **TOKEN).json()
+        # sin cache: el reclamo en webhook_idempotencia alcanza
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.post([ok1, ok2, ok2]).json()
+        self.assertEqual(data["creadas"], 1)
+        r1, r2, r3 = data["resultados"]
+        self.assertEqual((r1["solicitud"], r1["repetida"]), (first["solicitud"], True))
+        self.assertNotIn("repetida", r2)
+        self.assertEqual((r3["solicitud"]["id"], r3["repetida"]), (r2["solicitud"]["id"], True))
+        # otro replay del lote: todo desde el cache
+        with self.assertNumQueries(0):
+            again = self.post([ok1, ok2]).json()
+        self.assertEqual(again["creadas"], 0)
+        self.assertEqual(models.Solicitud.objects.count(), 2)
+
+    @override_settings(WEBHOOK_BATCH_MAX=3)
+    def test_too_many_items(self):
+        self.assertEqual(self.post(self.items(4)).status_code, 413)
+        self.assertFalse(models.Solicitud.objects.exists())
+        self.assertEqual(self.post(self.items(3)).status_code, 201)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        counts = []
+        for n, tag in ((2, "1"), (50, "2")):
+            self.setUp()  # catálogos fríos en las dos vueltas
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.post(self.items(n, tag))
+            self.assertEqual(resp.json()["creadas"], n)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333", CATALOG_CACHE_VERSION_TTL=0)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        for c in CATALOGS.values():
+            c.clear()
+
+    def post(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(WEBHOOK_URL, body, content_type="application/json", **TOKEN)
+
+    def test_warm_webhook_skips_catalog_queries(self):
+        body = {"from_phone": "+56911111111", "origen": "Club", "destino": "Hotel"}
+        self.post(body)
+        with CaptureQueriesContext(connection) as ctx:
+            self.post({**body, "observaciones": "otro mensaje"})
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn('INTO "origen"', sql)
+        self.assertNotIn('INTO "destino"', sql)
+        self.assertEqual(CATALOGS[models.Origen].stats()["hits"], 1)
+
+    def test_rename_invalidates(self):
+        self.post({"from_phone": "+56911111111", "origen": "Club"})
+        origen = models.Origen.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            origen.salida = "Club de Tenis"
+            origen.save()
+            # hasta el commit sigue valiendo lo que había
+            self.assertEqual(CATALOGS[models.Origen].ids_for(["Club"]), {"Club": origen.id})
+        self.assertEqual(CATALOGS[models.Origen].ids_for(["Club"]), {})
+
+
+class CatalogoObsoletoTests(TransactionTestCase):
+    """Un Origen borrado en otro worker cuya invalidación no llegó a este LRU."""
+
+    def setUp(self):
+        cache.clear()
+        for c in CATALOGS.values():
+            c.clear()
+
+    def borrar_origenes(self):
+        models.Solicitud.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM origen")  # sin señales: el LRU no se entera
+
+    def post(self, body):
+        return self.client.post(WEBHOOK_URL, body, content_type="application/json", **TOKEN)
+
+    def test_webhook_reintenta_sin_el_id_obsoleto(self):
+        self.assertEqual(self.post({"from_phone": "+56911111111", "origen": "Club"}).status_code, 201)
+        self.borrar_origenes()
+        resp = self.post({"from_phone": "+56911111111", "origen": "Club", "message_id": "wamid.2"})
+        self.assertEqual(resp.status_code, 201)
+        origen = models.Origen.objects.get(salida="Club")
+        self.assertEqual(models.Solicitud.objects.get().origen_id, origen.id)
+        self.assertEqual(CATALOGS[models.Origen].ids_for(["Club"]), {"Club": origen.id})
+
+    def test_inbox(self):
+        inbox.accept([{"from_phone": "+56911111111", "origen": "Club"}])
+        inbox.drain()
+        self.borrar_origenes()
+        inbox.accept([{"from_phone": "+56911111111", "origen": "Club", "message_id": "wamid.2"}])
+        self.assertEqual(inbox.drain()["procesadas"], 1)
+        self.assertEqual(models.Solicitud.objects.get().origen.salida, "Club")
+
+
+class DbPoolStatsTests(TestCase):
+    url = "/api/api/db/pool/"
+
+    def test_persistent_connections(self):
+        data = self.client.get(self.url).json()
+        stats = data["bases"]["default"]
+        self.assertEqual(stats["motor"], connection.vendor)
+        self.assertIn(stats["modo"], ("persistente", "por_request"))
+        self.assertGreaterEqual(stats["conexiones_nuevas"], 0)
+
+    def test_pool(self):
+        pool = mock.Mock(timeout=10.0)
+        pool.get_stats.return_value = {"requests_num": 7, "requests_queued": 2, "requests_wait_ms": 40,
+                                       "requests_errors": 1, "pool_size": 4, "pool_available": 3}
+        with mock.patch.object(type(connections["default"]), "pool", new=pool, create=True):
+            stats = self.client.get(self.url).json()["bases"]["default"]
+        self.assertEqual(stats["modo"], "pool")
+        self.assertEqual((stats["checkouts"], stats["esperas"], stats["espera_ms"], stats["timeouts"]), (7, 2, 40, 1))
+        self.assertEqual((stats["tamano"], stats["disponibles"], stats["timeout_s"]), (4, 3, 10.0))
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas(2)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        override = override_settings(METRICS_DIR=self.dir, METRICS_SLOW_MS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        metrics.REGISTRY.clear()
+
+    def scrape(self):
+        resp = self.client.get("/api/api/metrics/")
+        self.assertTrue(resp["Content-Type"].startswith("text/plain"))
+        return resp.content.decode()
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/api/reservas/")
+        timing = resp["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+        for name in ("app", "serialize", "render", "total"):
+            self.assertIn(f"{name};dur=", timing)
+
+    def test_exposition_sums_other_workers(self):
+        self.client.get("/api/api/reservas/")
+        labels = [["view", "reserva-list"]]
+        otro = {"h": [["http_request_db_queries", labels, [0, 3] + [0] * 8 + [6.0]]],
+                "c": [["http_requests_total", labels + [["method", "GET"], ["status", "200"]], 4]]}
+        with open(f"{self.dir}/1-otro.json", "w") as fh:
+            json.dump(otro, fh)
+        text = self.scrape()
+        self.assertIn('http_requests_total{view="reserva-list",method="GET",status="200"} 5', text)
+        self.assertIn('http_request_db_queries_count{view="reserva-list"} 4', text)
+        self.assertIn('http_request_db_queries_bucket{view="reserva-list",le="+Inf"} 4', text)
+        self.assertIn("# TYPE http_response_size_bytes histogram", text)
+
+    def test_slow_request_logs_top_queries(self):
+        with override_settings(METRICS_SLOW_MS=1e-6, METRICS_TOP_QUERIES=1):
+            with self.assertLogs("app.metrics", "WARNING") as logs:
+                self.client.get("/api/api/reservas/")
+        self.assertIn("reserva-list", logs.output[0])
+        self.assertEqual(logs.output[0].count("SELECT"), 1)
+
+    def test_asgi_chain_stays_async(self):
+        # un middleware solo-sync obliga a Django a adaptar toda la cadena (y
+        # lo avisa en django.request con "adapted"): las vistas async del
+        # webhook terminarían en un thread por request (solo lo loguea con DEBUG)
+        with override_settings(DEBUG=True), self.assertNoLogs("django.request", "DEBUG"):
+            handler = ASGIHandler()  # carga MIDDLEWARE con is_async=True
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+    def test_async_view_counts_queries_in_threads(self):
+        # como bajo ASGI: el event loop en un thread y las queries en el de
+        # sync_to_async, cada uno con su propia conexión
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        async def view(request):
+            await sync_to_async(query)()
+            await sync_to_async(query)()
+            return HttpResponse("ok")
+
+        middleware = metrics.MetricsMiddleware(view)
+        out = {}
+        loop = threading.Thread(target=lambda: out.update(
+            resp=asyncio.run(middleware(AsyncRequestFactory().get("/x/")))))
+        loop.start()
+        loop.join()
+        self.assertIn('desc="2 queries"', out["resp"]["Server-Timing"])
+
+
+def make_solicitud(**kwargs):
+    data = {
+        "form_nombres": "Ana", "form_apellidos": "Pérez", "form_telefono": "+56911111111",
+        "pasajeros": 1, "created_at": timezone.now(),
+    }
+    data.update(kwargs)
+    return models.Solicitud.objects.create(**data)
+
+
+def make_reserva(**kwargs):
+    now = timezone.now()
+    data = {"fecha_hora_agendada": now, "created_at": now, "updated_at": now}
+    data.update(kwargs)
+    if "solicitud" not in data:
+        data["solicitud"] = make_solicitud()
+    return models.Reserva.objects.create(**data)
+
+
+@mock.patch.object(KeysetPagination, "page_size", 3)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now()
+        # fechas repetidas para probar el desempate por id
+        cls.reservas = [
+            make_reserva(fecha_hora_agendada=base + timedelta(hours=i // 2)) for i in range(8)
+        ]
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(url).json()
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+            seen += [r["id"] for r in data["results"]]
+            url, pages = data["next"], pages + 1
+        return seen, data
+
+    def test_default_is_page_number(self):
+        data = self.client.get("/api/api/reservas/").json()
+        self.assertEqual(data["count"], 8)
+
+    def test_walk_by_id_desc(self):
+        seen, _ = self.walk("/api/api/reservas/?paginacion=cursor")
+        self.assertEqual(seen, sorted((r.id for r in self.reservas), reverse=True))
+
+    def test_walk_with_ordering_filter(self):
+        seen, last = self.walk("/api/api/reservas/?paginacion=cursor&ordering=fecha_hora_agendada")
+        expected = [r.id for r in sorted(self.reservas, key=lambda r: (r.fecha_hora_agendada, r.id))]
+        self.assertEqual(seen, expected)
+        back = self.client.get(last["previous"]).json()
+        self.assertEqual([r["id"] for r in back["results"]], expected[3:6])
+
+    def test_invalid_cursor(self):
+        resp = self.client.get("/api/api/solicitudes/?cursor=nope")
+        self.assertEqual(resp.status_code, 404)
+
+
+class TrigramSearchFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.conductor = models.Conductor.objects.create(
+            nombre="Rodrigo", apellido="Soto", mail="r@example.com", activo=True, created_at=now,
+        )
+        cls.con_conductor = make_reserva(conductor=cls.conductor)
+        cls.por_telefono = make_reserva(solicitud=make_solicitud(form_telefono="+56977776666"))
+        cls.otra = make_reserva()
+
+    def ids(self, search):
+        data = self.client.get("/api/api/reservas/", {"search": search}).json()
+        return {r["id"] for r in data["results"]}
+
+    def test_related_fields_use_subqueries(self):
+        self.assertEqual(self.ids("rodri"), {self.con_conductor.id})
+        self.assertEqual(self.ids("7777"), {self.por_telefono.id})
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.ids("rodrigo soto"), {self.con_conductor.id})
+        self.assertEqual(self.ids("rodrigo 7777"), set())
+
+    def test_estado_es_un_in_sobre_los_choices(self):
+        models.Reserva.objects.filter(pk=self.otra.pk).update(estado=models.ReservaEstado.CANCELADA)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.ids("celad"), {self.otra.id})
+        self.assertIn("IN ('CANCELADA')", " ".join(q["sql"] for q in ctx.captured_queries))
+        self.assertEqual(self.ids("nada que ver"), set())
+
+
+def make_reservas_completas(n=5):
+    """Reservas con solicitud, tenista, origen, destino, coordinador y conductor distintos."""
+    now = timezone.now()
+    for i in range(n):
+        tenista = models.Tenista.objects.create(nombre="T", apellido="T", numero=f"+5690000000{i}")
+        solicitud = make_solicitud(
+            tenista=tenista,
+            origen=models.Origen.objects.create(salida=f"Hotel {i}"),
+            destino=models.Destino.objects.create(lugar=f"Cancha {i}"),
+        )
+        make_reserva(
+            solicitud=solicitud,
+            coordinador=models.Coordinador.objects.create(nombre="C", correo=f"c{i}@example.com", created_at=now),
+            conductor=models.Conductor.objects.create(
+                nombre="D", apellido="D", mail=f"d{i}@example.com", activo=True, created_at=now,
+            ),
+        )
+
+
+class RouterQueryBudgetMixin:
+    """
+    Recorre todos los endpoints del router y verifica que list/retrieve no
+    pasen de un número fijo de queries, sin importar cuántas filas haya.
+    """
+    list_query_budget = 2      # COUNT + página
+    retrieve_query_budget = 1
+
+    def assertRouterQueryBudget(self, query=""):
+        for prefix, viewset, basename in router.registry:
+            with self.subTest(endpoint=prefix, action="list", query=query):
+                self.assertMaxQueries(reverse(f"{basename}-list") + query, self.list_query_budget)
+            obj = viewset.queryset.first()
+            if obj is None:
+                continue
+            with self.subTest(endpoint=prefix, action="retrieve", query=query):
+                self.assertMaxQueries(reverse(f"{basename}-detail", args=[obj.pk]) + query, self.retrieve_query_budget)
+
+    def assertMaxQueries(self, url, budget):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            f"{url}:\n" + "\n".join(q["sql"] for q in ctx.captured_queries),
+        )
+
+
+class RouterQueryBudgetTests(RouterQueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas()
+
+    def test_router_endpoints(self):
+        self.assertRouterQueryBudget()
+
+    def test_router_endpoints_sparse(self):
+        self.assertRouterQueryBudget("?fields=id")
+        self.assertRouterQueryBudget("?expand=")
+
+
+class CompiledSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas()
+
+    def assertSameJSON(self, serializer_class, queryset):
+        renderer = JSONRenderer()
+        queryset = apply_eager_plan(queryset, serializer_class)
+        expected = renderer.render(serializer_class(queryset, many=True).data)
+        fast = compiled(serializer_class)
+        self.assertEqual(renderer.render(fast.many(queryset)), expected)
+        self.assertEqual(renderer.render(fast.from_queryset(queryset)), expected)
+
+    def test_solicitud_output_is_identical(self):
+        make_solicitud(hora_salida=time(13, 30))  # sin FKs
+        self.assertSameJSON(SolicitudReadNestedSerializer, models.Solicitud.objects.order_by("-id"))
+
+    def test_reserva_output_is_identical(self):
+        make_reserva()  # sin conductor ni coordinador
+        self.assertSameJSON(ReservaReadNestedSerializer, models.Reserva.objects.order_by("-id"))
+
+    def test_fecha_hora_fin_no_se_expone(self):
+        reserva = make_reserva()
+        self.assertNotIn("fecha_hora_fin", self.client.get(f"/api/api/reservas/{reserva.pk}/").json())
+        self.assertNotIn("fecha_hora_fin", self.client.get("/api/api/reservas/").json()["results"][0])
+        resp = self.client.get("/api/api/reservas/?fields=fecha_hora_fin")
+        self.assertEqual(resp.status_code, 400)
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas(3)
+
+    def get(self, query, status=200):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(f"/api/api/reservas/?{query}")
+        self.assertEqual(resp.status_code, status, resp.content)
+        self.queries = [q["sql"] for q in ctx.captured_queries]
+        return resp.json()
+
+    def test_fields_trim_output_and_select(self):
+        rows = self.get("fields=id,estado,fecha_hora_agendada")["results"]
+        self.assertEqual(list(rows[0]), ["id", "fecha_hora_agendada", "estado"])
+        page = self.queries[-1]
+        self.assertNotIn("JOIN", page)
+        self.assertNotIn("created_at", page)
+
+    def test_expand_and_collapsed_relations(self):
+        reserva = models.Reserva.objects.order_by("-id").first()
+        row = self.get("expand=conductor")["results"][0]
+        self.assertEqual(row["solicitud"], reserva.solicitud_id)
+        self.assertEqual(row["coordinador"], reserva.coordinador_id)
+        self.assertEqual(row["conductor"], ConductorSerializer(reserva.conductor).data)
+        self.assertEqual(self.queries[-1].count("JOIN"), 1)
+
+    def test_dotted_fields_match_full_output(self):
+        full = self.get("")["results"][0]
+        row = self.get("fields=id,solicitud.tenista.numero")["results"][0]
+        self.assertEqual(row, {"id": full["id"], "solicitud": {"tenista": {"numero": full["solicitud"]["tenista"]["numero"]}}})
+        self.assertNotIn("origen", self.queries[-1])
+
+    def test_retrieve_and_cursor(self):
+        reserva = models.Reserva.objects.first()
+        resp = self.client.get(f"/api/api/reservas/{reserva.pk}/?fields=id,estado")
+        self.assertEqual(resp.json(), {"id": reserva.pk, "estado": reserva.estado})
+        data = self.get("fields=id&paginacion=cursor&ordering=fecha_hora_agendada")
+        self.assertEqual(len(self.queries), 1)  # el cursor lee fecha_hora_agendada sin otra query
+        self.assertTrue(all(list(r) == ["id"] for r in data["results"]))
+
+    def test_unknown_names(self):
+        errors = self.get("fields=id,nope,solicitud.x&expand=estado", status=400)["fields"]
+        self.assertEqual(len(errors), 3)
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_matches_drf(self):
+        data = {
+            "decimal": Decimal("12.50"),
+            "fecha": timezone.now(),
+            "hora": time(13, 30, 15, 123456),
+            "raw_form": {"texto": "línea\u2028otra", "lista": [1, 2.5, None, True]},
+            2: "clave no str",
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @skipIf(renderers.orjson is None, "orjson no instalado")
+    def test_floats_difieren_solo_en_el_formato(self):
+        data = {"chico": 1e-05, "grande": 1e16, "normal": 3.25, "cero": -0.0}
+        fast, drf = FastJSONRenderer().render(data), JSONRenderer().render(data)
+        self.assertNotEqual(fast, drf)
+        self.assertEqual(json.loads(fast), json.loads(drf))
+        # NaN / Infinity: null en vez del ValueError de DRF (ver app/renderers.py)
+        self.assertEqual(json.loads(FastJSONRenderer().render({"x": float("nan"), "y": float("inf")})),
+                         {"x": None, "y": None})
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"x": float("nan")})
+
+    def test_parser_roundtrip(self):
+        body = b'{"from_phone": "+56 9 1234 5678", "destinos": [{"lugar": "Hotel \xc3\x91"}]}'
+        parsed = FastJSONParser().parse(BytesIO(body))
+        self.assertEqual(parsed["destinos"][0]["lugar"], "Hotel Ñ")
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"a": NaN}'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas()
+
+    def test_gzip_over_threshold(self):
+        resp = self.client.get("/api/api/reservas/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", resp["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(resp.content))["results"]), 5)
+
+    def test_small_responses_are_not_compressed(self):
+        resp = self.client.get("/api/api/destinos/?search=nada", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(resp.has_header("Content-Encoding"))
+
+    @skipIf(brotli is None, "brotli no instalado")
+    def test_brotli_preferred(self):
+        resp = self.client.get("/api/api/reservas/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(resp["Content-Encoding"], "br")
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas(3)
+        models.Solicitud.objects.filter(id=models.Solicitud.objects.order_by("id").first().id).update(estado="CONFIRMADA")
+        make_solicitud(form_nombres="Sin tenista")
+
+    def read(self, resp):
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("attachment;", resp["Content-Disposition"])
+        return b"".join(resp.streaming_content).decode()
+
+    def test_csv_with_filters(self):
+        resp = self.client.get("/api/api/solicitudes/export/?formato=csv&estado=confirmada")
+        rows = list(csv.reader(StringIO(self.read(resp))))
+        header = rows[0]
+        self.assertIn("tenista.numero", header)
+        self.assertNotIn("raw_form", header)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][header.index("estado")], "CONFIRMADA")
+
+    def test_ndjson_columns_match_serializer(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/api/api/reservas/export/?columnas=id,solicitud.tenista.numero,fecha_hora_agendada")
+            lines = [json.loads(line) for line in self.read(resp).splitlines()]
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(list(lines[0]), ["id", "solicitud.tenista.numero", "fecha_hora_agendada"])
+        reserva = models.Reserva.objects.get(pk=lines[0]["id"])
+        expected = ReservaReadNestedSerializer(reserva).data
+        self.assertEqual(lines[0]["fecha_hora_agendada"], expected["fecha_hora_agendada"])
+        self.assertEqual(lines[0]["solicitud.tenista.numero"], expected["solicitud"]["tenista"]["numero"])
+
+    def test_null_nested_and_search(self):
+        resp = self.client.get("/api/api/solicitudes/export/?search=Sin tenista&columnas=form_nombres,tenista.id")
+        self.assertEqual([json.loads(line) for line in self.read(resp).splitlines()],
+                         [{"form_nombres": "Sin tenista", "tenista.id": None}])
+
+    def test_invalid_params(self):
+        for query in ("columnas=nope", "formato=xml", "estado=ABIERTA", "desde=ayer"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/api/solicitudes/export/?{query}").status_code, 400)
+
+    def test_date_filter_on_list(self):
+        manana = (timezone.localdate() + timedelta(days=1)).isoformat()
+        hoy = timezone.localdate().isoformat()
+        self.assertEqual(self.client.get(f"/api/api/reservas/?desde={manana}").json()["count"], 0)
+        self.assertEqual(self.client.get(f"/api/api/reservas/?hasta={hoy}").json()["count"], 3)
+        self.assertEqual(self.client.get("/api/api/solicitudes/?estado=NUEVA,CONFIRMADA").json()["count"], 4)
+
+
+class RawFormTests(TestCase):
+    body = {"from_phone": "+56911111111", "nombres": "Ana", "extra": ["ñ", 1]}
+
+    def setUp(self):
+        self.sol = make_solicitud()
+        raw_forms.save(self.sol.pk, self.body)
+        make_solicitud(form_nombres="Sin raw")
+
+    def test_list_excludes_raw_unless_included(self):
+        with CaptureQueriesContext(connection) as ctx:
+            results = self.client.get("/api/api/solicitudes/").json()["results"]
+        self.assertNotIn("raw_form", results[0])
+        self.assertFalse(any("solicitud_raw" in q["sql"] for q in ctx.captured_queries))
+        results = self.client.get("/api/api/solicitudes/?include=raw_form").json()["results"]
+        self.assertEqual({r["id"]: r["raw_form"] for r in results},
+                         {self.sol.pk: self.body, self.sol.pk + 1: None})
+
+    def test_retrieve_and_audit_endpoint(self):
+        url = f"/api/api/solicitudes/{self.sol.pk}/"
+        self.assertNotIn("raw_form", self.client.get(url).json())
+        self.assertEqual(self.client.get(url + "?include=raw_form").json()["raw_form"], self.body)
+        self.assertEqual(self.client.get(url + "raw/").json(), {"solicitud_id": self.sol.pk, "raw_form": self.body})
+        self.assertEqual(self.client.get("/api/api/solicitudes/999999/raw/").status_code, 404)
+
+    @override_settings(RAW_FORM_COMPRESS=True)
+    def test_compressed(self):
+        raw_forms.save(self.sol.pk, self.body)
+        row = models.SolicitudRaw.objects.get(pk=self.sol.pk)
+        self.assertIsNone(row.body)
+        self.assertEqual(raw_forms.for_solicitudes([self.sol.pk]), {self.sol.pk: self.body})
+
+    def test_write_serializer(self):
+        resp = self.client.post("/api/api/solicitudes/", {
+            "form_nombres": "Bea", "form_apellidos": "Ruiz", "form_telefono": "+56922222222", "pasajeros": 1,
+            "created_at": timezone.now().isoformat(), "raw_form": {"a": 1},
+        }, content_type="application/json")
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertNotIn("raw_form", resp.json())
+        self.assertEqual(raw_forms.for_solicitudes([resp.json()["id"]]), {resp.json()["id"]: {"a": 1}})
+
+    @override_settings(WEBHOOK_TOKEN="whatsapp333")
+    def test_webhook_stores_body(self):
+        payload = {"from_phone": "+56 9 3333 4444", "nombres": "Caro", "origen": "Club", "destino": "Hotel"}
+        resp = self.client.post(WEBHOOK_URL, payload, content_type="application/json", **TOKEN)
+        pk = resp.json()["solicitud"]["id"]
+        self.assertEqual(raw_forms.for_solicitudes([pk])[pk]["nombres"], "Caro")
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_conductores_report(self):
+        now = timezone.now()
+        old = models.Conductor.objects.create(nombre="Viejo", apellido="V", mail="a@example.com",
+                                              patente="AB1234", activo=True, created_at=now)
+        data = (
+            "nombre,apellido,mail,telefono,activo\n"
+            "Ana,Soto,a@example.com,,no\n"
+            "Beto,Rojas,b@example.com,9 8765 4321,si\n"
+            ",Sin nombre,c@example.com,,\n"
+            "Beto,Otra vez,b@example.com,,\n"
+            "Caro,Díaz,caro,,quizas\n"
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post("/api/api/conductores/import/", data, content_type="text/csv")
+        self.assertEqual(resp.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+        report = resp.json()
+        self.assertEqual((report["insertados"], report["actualizados"], report["rechazados"]), (1, 1, 3))
+        filas = {f["linea"]: f for f in report["filas"]}
+        self.assertEqual(filas[2]["resultado"], "actualizado")
+        self.assertEqual(filas[2]["id"], old.id)
+        self.assertEqual(filas[5]["errores"], ["mail repetido (línea 3)"])
+        self.assertEqual(len(filas[6]["errores"]), 2)
+
+        old.refresh_from_db()
+        self.assertEqual((old.nombre, old.patente, old.activo), ("Ana", "AB1234", False))
+        nuevo = models.Conductor.objects.get(mail="b@example.com")
+        self.assertEqual((nuevo.id, nuevo.telefono), (filas[3]["id"], "987654321"))
+
+    def test_reimport_keeps_inactive_conductor(self):
+        models.Conductor.objects.create(nombre="Ana", apellido="Soto", mail="a@example.com",
+                                        activo=False, created_at=timezone.now())
+        bulk_import.run("conductores", StringIO("nombre,apellido,mail\nAna,Soto,a@example.com\nBeto,Rojas,b@example.com\n"))
+        bulk_import.run("conductores", StringIO("nombre,apellido,mail,activo\nAna,Soto,a@example.com,\n"))
+        activos = dict(models.Conductor.objects.values_list("mail", "activo"))
+        self.assertEqual(activos, {"a@example.com": False, "b@example.com": True})
+
+    def test_tenistas_multipart_and_dry_run(self):
+        models.Tenista.objects.create(nombre="Tenista", apellido="", numero="+56911111111")
+        data = b"\xef\xbb\xbfNumero,Nombre,Apellido\n+56 9 1111 1111,Ana,\n56922222222,Beto,Rojas\n"
+        resp = self.client.post("/api/api/tenistas/import/?dry_run=1",
+                                {"archivo": SimpleUploadedFile("t.csv", data, content_type="text/csv")})
+        self.assertEqual(resp.json()["actualizados"], 1)
+        self.assertEqual(models.Tenista.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = bulk_import.run("tenistas", BytesIO(data))
+        self.assertEqual((report["insertados"], report["actualizados"]), (1, 1))
+        beto = models.Tenista.objects.get(numero="+56922222222")
+        self.assertEqual((beto.nombre, beto.numero_e164), ("Beto", "+56922222222"))
+        self.assertEqual(models.Tenista.objects.get(numero="+56911111111").nombre, "Ana")
+
+    def test_bad_header(self):
+        resp = self.client.post("/api/api/tenistas/import/", "numero,edad\n1,2\n", content_type="text/csv")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(len(resp.json()["archivo"]), 2)
+
+
+@override_settings(RESERVA_DURACION_MIN=60)
+class SchedulingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.t0 = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        cls.c1, cls.c2 = [
+            models.Conductor.objects.create(nombre=n, apellido="X", mail=f"{n}@example.com", activo=True, created_at=now)
+            for n in ("uno", "dos")
+        ]
+        models.Conductor.objects.create(nombre="inactivo", apellido="X", mail="i@example.com", activo=False, created_at=now)
+        cls.ocupada = make_reserva(conductor=cls.c1, estado="ASIGNADA", fecha_hora_agendada=cls.t0)
+
+    def ids(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return [c["id"] for c in resp.json()]
+
+    def test_fin_follows_agendada(self):
+        self.assertEqual(self.ocupada.fecha_hora_fin, self.t0 + timedelta(hours=1))
+
+    def test_disponibles(self):
+        base = "/api/api/conductores/disponibles/?"
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.ids(base + urlencode({"desde": (self.t0 + timedelta(minutes=30)).isoformat()})),
+                             [self.c2.id])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        # el intervalo es [inicio, fin): justo al terminar ya está libre
+        self.assertEqual(self.ids(base + urlencode({"desde": (self.t0 + timedelta(hours=1)).isoformat()})),
+                         [self.c1.id, self.c2.id])
+        dia = self.t0.date().isoformat()
+        self.assertEqual(self.ids(base + urlencode({"desde": dia, "hasta": dia})), [self.c2.id])
+        self.assertEqual(self.client.get(base).status_code, 400)
+
+    def test_manual_overlap_rejected(self):
+        resp = self.client.post("/api/api/reservas/", {
+            "solicitud_id": make_solicitud().id, "conductor_id": self.c1.id, "estado": "ASIGNADA",
+            "fecha_hora_agendada": (self.t0 + timedelta(minutes=59)).isoformat(),
+            "created_at": self.t0.isoformat(), "updated_at": self.t0.isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn(str(self.ocupada.id), resp.json()["conductor_id"][0])
+        # mover la misma reserva dentro de su horario no choca consigo misma
+        resp = self.client.patch(f"/api/api/reservas/{self.ocupada.id}/", {
+            "fecha_hora_agendada": (self.t0 + timedelta(minutes=30)).isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_auto_asignar(self):
+        pendientes = [make_reserva(fecha_hora_agendada=self.t0 + timedelta(minutes=m)) for m in (0, 15, 70)]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post("/api/api/reservas/auto-asignar/",
+                                    {"ids": [r.id for r in pendientes]}, content_type="application/json")
+        self.assertLessEqual(len(ctx.captured_queries), 9)  # 3 lecturas + UPDATE + resumen + savepoints
+        data = resp.json()
+        # 10:00 -> dos (uno está ocupado); 10:15 -> nadie; 11:10 -> uno (menos carga en la ventana)
+        self.assertEqual(data["asignadas"], [{"id": pendientes[0].id, "conductor_id": self.c2.id},
+                                             {"id": pendientes[2].id, "conductor_id": self.c1.id}])
+        self.assertEqual(data["sin_conductor"], [pendientes[1].id])
+        self.assertEqual(models.Reserva.objects.get(pk=pendientes[0].id).estado, "ASIGNADA")
+        # ya asignadas: una segunda llamada no hace nada
+        again = scheduling.auto_asignar(models.Reserva.objects.filter(pk__in=[r.id for r in pendientes]))
+        self.assertEqual(again, {"asignadas": [], "sin_conductor": [pendientes[1].id]})
+
+
+class ResumenTests(TestCase):
+    def counters(self):
+        return {k: n for k, n in resumen.contar().items()}
+
+    def stored(self):
+        return {k: n for k, n in resumen.totales().items() if n}
+
+    def test_signals_and_bulk_paths_keep_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/webhooks/whatsapp/", {"from_phone": "+56911111111", "nombres": "Ana"},
+                             content_type="application/json")
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = make_reserva(fecha_hora_agendada=timezone.now() - timedelta(days=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            sol = models.Solicitud.objects.get(form_nombres="Ana")
+            sol.estado = "CONFIRMADA"
+            sol.save()
+            reserva.fecha_hora_agendada = timezone.now()
+            reserva.save(update_fields=["fecha_hora_agendada"])
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Conductor.objects.create(nombre="C", apellido="C", mail="c@example.com",
+                                            activo=True, created_at=timezone.now())
+            scheduling.auto_asignar(models.Reserva.objects.all())
+        with self.captureOnCommitCallbacks(execute=True):
+            make_solicitud().delete()
+        self.assertEqual(self.stored(), self.counters())
+        hoy = timezone.localdate()
+        self.assertEqual(self.stored()[("reserva", hoy, "ASIGNADA")], 1)
+        self.assertEqual(self.stored()[("solicitud", hoy, "CONFIRMADA")], 1)
+
+    def test_endpoint_reads_only_summary(self):
+        hoy = timezone.localdate()
+        models.ResumenDiario.objects.bulk_create([
+            models.ResumenDiario(dia=hoy, tabla="solicitud", estado="NUEVA", total=3),
+            models.ResumenDiario(dia=hoy - timedelta(days=3), tabla="solicitud", estado="NUEVA", total=2),
+            models.ResumenDiario(dia=hoy - timedelta(days=30), tabla="reserva", estado="PENDIENTE", total=9),
+        ])
+        models.ResumenDelta.objects.create(dia=hoy, tabla="solicitud", estado="NUEVA", delta=2)
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/api/resumen/").json()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(data["solicitud"]["total"]["NUEVA"], 7)
+        self.assertEqual(data["solicitud"]["hoy"]["NUEVA"], 5)
+        self.assertEqual(data["solicitud"]["total"]["RECHAZADA"], 0)
+        self.assertEqual(data["reserva"]["total"]["PENDIENTE"], 0)
+        self.assertEqual(self.client.get("/api/api/resumen/?desde=2026-02-30").status_code, 400)
+
+    def test_rebuild_fixes_drift(self):
+        make_solicitud()
+        make_solicitud(estado="RECHAZADA")
+        models.ResumenDiario.objects.create(dia=timezone.localdate(), tabla="solicitud", estado="NUEVA", total=7)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_resumen", check=True, stdout=StringIO())
+        call_command("rebuild_resumen", stdout=StringIO())
+        self.assertEqual(self.stored(), self.counters())
+        self.assertEqual(resumen.rebuild(), {})
+
+    def test_writers_only_append_and_compaction_folds(self):
+        with CaptureQueriesContext(connection) as ctx:
+            make_solicitud()
+            make_solicitud()
+            make_solicitud().delete()
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("resumen_diario", sql)  # nadie espera a nadie por la fila de hoy
+        antes = self.stored()
+        out = StringIO()
+        call_command("compact_resumen", "--lote", "2", stdout=out)
+        self.assertIn("4 deltas", out.getvalue())
+        self.assertFalse(models.ResumenDelta.objects.exists())
+        self.assertEqual(self.stored(), antes)
+        self.assertEqual(self.stored(), self.counters())
+        self.assertEqual(models.ResumenDiario.objects.get(estado="NUEVA").total, 2)
+
+    def test_rebuild_between_write_and_commit(self):
+        # rebuild corre cuando la fila ya está escrita pero la transacción no
+        # confirmó: lo que quede para después del commit no puede volver a sumar
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            make_solicitud()
+            make_reserva()
+            resumen.rebuild()
+        for callback in callbacks:
+            callback()
+        self.assertEqual(resumen.rebuild(dry_run=True), {})
+        self.assertEqual(self.stored(), self.counters())
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_304_without_queries(self):
+        url = "/api/api/origenes/"
+        first = self.client.get(url)
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(resp.status_code, 304)
+        # otra URL (página, búsqueda) no comparte ETag
+        self.assertNotEqual(self.client.get(url + "?search=Hotel")["ETag"], first["ETag"])
+
+    def test_write_changes_etag(self):
+        url = "/api/api/conductores/"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            conductor = models.Conductor.objects.first()
+            conductor.activo = False
+            conductor.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_solicitud_detail(self):
+        sol = models.Solicitud.objects.first()
+        url = f"/api/solicitudes/{sol.pk}/"
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        cache.delete(versions.deps_key(models.Solicitud, sol.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # el webhook enriquece al tenista por SQL directo: también invalida
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(WEBHOOK_URL, {"from_phone": sol.tenista.numero, "correo": "x@example.com"},
+                             content_type="application/json", **TOKEN)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class TenistaPorNumeroTests(TestCase):
+    url = "/api/api/tenistas/por-numero/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_e164(self):
+        self.assertEqual(e164("+56 9 1234 5678"), "+56912345678")
+        self.assertEqual(e164("9 1234 5678"), "+56912345678")
+        self.assertEqual(e164("0056912345678"), "+56912345678")
+        self.assertIsNone(e164("sin número"))
+
+    def test_lookup_normalizes_and_caches(self):
+        models.Tenista.objects.create(nombre="Ana", numero="+56 9 1234 5678")
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {"numero": "912345678"}).json()
+        self.assertEqual(data["tenista"]["nombre"], "Ana")
+        with self.assertNumQueries(0):
+            self.client.get(self.url + "+56912345678/")
+
+    def test_negative_cache_cleared_by_webhook(self):
+        self.assertIsNone(self.client.get(self.url, {"numero": "+56911112222"}).json()["tenista"])
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.client.get(self.url, {"numero": "+56911112222"}).json()["tenista"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(WEBHOOK_URL, {"from_phone": "+56911112222", "nombres": "Beto"},
+                             content_type="application/json", **TOKEN)
+        self.assertEqual(self.client.get(self.url, {"numero": "+56911112222"}).json()["tenista"]["nombre"], "Beto")
+
+    def test_cambio_de_numero_olvida_ambos_al_commit(self):
+        t = models.Tenista.objects.create(nombre="Ana", numero="+56912345678")
+        self.assertEqual(self.client.get(self.url, {"numero": "+56912345678"}).json()["tenista"]["id"], t.id)
+        self.assertIsNone(self.client.get(self.url, {"numero": "+56933334444"}).json()["tenista"])
+        with self.captureOnCommitCallbacks(execute=True):
+            t.numero = "+56933334444"
+            t.save()
+            # hasta el commit el cache no cambia
+            with self.assertNumQueries(0):
+                self.client.get(self.url, {"numero": "+56912345678"})
+        self.assertIsNone(self.client.get(self.url, {"numero": "+56912345678"}).json()["tenista"])
+        self.assertEqual(self.client.get(self.url, {"numero": "+56933334444"}).json()["tenista"]["id"], t.id)
+
+    def test_backfill(self):
+        t = models.Tenista.objects.create(nombre="Ana", numero="912345678")
+        raro = models.Tenista.objects.create(nombre="Beto", numero="sin número")
+        models.Tenista.objects.filter(pk=t.pk).update(numero_e164=None)
+        call_command("backfill_numero_e164", batch=1, stdout=StringIO())
+        t.refresh_from_db()
+        raro.refresh_from_db()
+        self.assertEqual(t.numero_e164, "+56912345678")
+        self.assertIsNone(raro.numero_e164)
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class ContextoPorNumeroTests(TestCase):
+    url = "/api/api/contexto/por-numero/"
+
+    @classmethod
+    def setUpTestData(cls):
+        make_reservas_completas(2)
+        cls.tenista = models.Tenista.objects.get(numero="+56900000000")
+        sol = models.Solicitud.objects.get(tenista=cls.tenista)
+        for i in range(3):
+            make_solicitud(tenista=cls.tenista, observaciones=f"extra {i}")
+        make_reserva(solicitud=make_solicitud(tenista=cls.tenista), estado="COMPLETADA")
+        cls.reserva = sol.reserva
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        return self.client.get(self.url, {"numero": self.tenista.numero, **params}).json()
+
+    def test_contenido_y_queries(self):
+        # tenista + solicitudes + reservas; la segunda vez todo sale del cache
+        with self.assertNumQueries(3):
+            data = self.get(limit=2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(limit=2), data)
+        self.assertEqual(data["tenista"]["id"], self.tenista.id)
+        self.assertEqual(len(data["solicitudes"]), 2)
+        self.assertEqual(data["solicitudes"][0]["estado"], "NUEVA")
+        # solo la reserva activa, con su conductor
+        [reserva] = data["reservas"]
+        self.assertEqual(reserva["id"], self.reserva.id)
+        self.assertEqual(reserva["origen"], "Hotel 0")
+        self.assertEqual(reserva["conductor"]["id"], self.reserva.conductor_id)
+
+    def test_invalidacion(self):
+        self.assertEqual(len(self.get()["reservas"]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reserva.estado = "CANCELADA"
+            self.reserva.save()
+        self.assertEqual(self.get()["reservas"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(WEBHOOK_URL, {"from_phone": self.tenista.numero, "observaciones": "nueva"},
+                             content_type="application/json", **TOKEN)
+        self.assertEqual(self.get()["solicitudes"][0]["observaciones"], "nueva")
+
+    def test_desconocido(self):
+        data = self.client.get(self.url + "+56999999999/").json()
+        self.assertEqual((data["tenista"], data["solicitudes"], data["reservas"]), (None, [], []))
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class AsyncViewsTests(TestCase):
+    """Las vistas async devuelven lo mismo que las DRF (mismo contrato)."""
+
+    def setUp(self):
+        cache.clear()
+        for c in CATALOGS.values():
+            c.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def test_webhook_y_lecturas(self):
+        body = json.dumps(WhatsappWebhookTests.payload)
+        resp = await async_views.whatsapp_webhook(self.factory.post(
+            WEBHOOK_URL, body, content_type="application/json", headers={"X-Webhook-Token": "whatsapp333"}))
+        self.assertEqual(resp.status_code, 201)
+        created = json.loads(resp.content)["solicitud"]
+
+        sync = await self.async_client.get(f"/api/solicitudes/{created['id']}/")
+        resp = await async_views.solicitud_detail(self.factory.get(f"/api/solicitudes/{created['id']}/"), created["id"])
+        self.assertEqual(json.loads(resp.content), {"ok": True, "solicitud": created})
+        self.assertEqual(json.loads(resp.content), sync.json())
+        self.assertEqual(resp["ETag"], sync["ETag"])
+        resp = await async_views.solicitud_detail(
+            self.factory.get(f"/api/solicitudes/{created['id']}/", headers={"If-None-Match": sync["ETag"]}), created["id"])
+        self.assertEqual(resp.status_code, 304)
+
+        url = "/api/api/tenistas/por-numero/+56912345678/"
+        resp = await async_views.tenista_por_numero(self.factory.get(url), "+56912345678")
+        self.assertEqual(json.loads(resp.content), (await self.async_client.get(url)).json())
+        self.assertEqual(json.loads(resp.content)["tenista"]["nombre"], "Ana")
+
+    async def test_reintento_sin_cache_lee_la_respuesta_guardada(self):
+        def post():
+            return async_views.whatsapp_webhook(self.factory.post(
+                WEBHOOK_URL, json.dumps(WhatsappWebhookTests.payload), content_type="application/json",
+                headers={"X-Webhook-Token": "whatsapp333"}))
+
+        first = await post()
+        await cache.aclear()
+        with mock.patch("app.async_views.sync_to_async", side_effect=AssertionError("no hay alta")):
+            retry = await post()
+        self.assertEqual((retry.status_code, retry["Idempotent-Replayed"]), (201, "true"))
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertEqual(await models.Solicitud.objects.acount(), 1)
+
+    @override_settings(WEBHOOK_IDEMPOTENCY_TTL=0)
+    async def test_mismo_contrato_de_parseo_que_drf(self):
+        form = {"from_phone": "+56912345678", "nombres": "Ana", "pasajeros": "2",
+                "origen": "Club", "destino": "Aeropuerto"}
+        json_body = json.dumps(form)
+        casos = [
+            (json_body, "application/json"),
+            (json_body, "application/json; charset=utf-8"),
+            (urlencode(form), "application/x-www-form-urlencoded"),
+            (form, None),  # multipart
+            ("", "application/json"),
+            ("{no", "application/json"),
+            (json_body, "text/plain"),
+            ("[1, 2]", "application/json"),
+        ]
+
+        def normalizar(resp):
+            data = json.loads(resp.content)
+            if isinstance(data.get("solicitud"), dict):
+                data["solicitud"] = {k: v for k, v in data["solicitud"].items() if k not in ("id", "created_at")}
+            return resp.status_code, data
+
+        statuses = []
+        for body, content_type in casos:
+            kwargs = {"headers": {"X-Webhook-Token": "whatsapp333"}}
+            if content_type:
+                kwargs["content_type"] = content_type
+            with self.subTest(content_type=content_type, body=body):
+                drf = await self.async_client.post(WEBHOOK_URL, body, **kwargs)
+                nueva = await async_views.whatsapp_webhook(self.factory.post(WEBHOOK_URL, body, **kwargs))
+                self.assertEqual(normalizar(nueva), normalizar(drf))
+                statuses.append(drf.status_code)
+        self.assertEqual(statuses, [201, 201, 201, 201, 400, 400, 415, 400])
+
+    async def test_errores(self):
+        resp = await async_views.whatsapp_webhook(self.factory.post(WEBHOOK_URL, "{}", content_type="application/json"))
+        self.assertEqual(resp.status_code, 401)
+        resp = await async_views.whatsapp_webhook(self.factory.post(
+            WEBHOOK_URL, "{no", content_type="application/json", headers={"X-Webhook-Token": "whatsapp333"}))
+        self.assertEqual(resp.status_code, 400)
+        resp = await async_views.solicitud_detail(self.factory.get("/api/solicitudes/999/"), 999)
+        self.assertEqual((resp.status_code, json.loads(resp.content)["ok"]), (404, False))
+
+
+@override_settings(WEBHOOK_TOKEN="whatsapp333")
+class InboxTests(TestCase):
+    url = "/api/webhooks/whatsapp/inbox/"
+
+    def setUp(self):
+        for c in CATALOGS.values():
+            c.clear()
+
+    def post(self, body, **extra):
+        return self.client.post(self.url, body, content_type="application/json", **TOKEN, **extra)
+
+    def test_accept_es_un_insert(self):
+        with self.assertNumQueries(1):
+            resp = self.post(WhatsappWebhookTests.payload)
+        self.assertEqual(resp.status_code, 202)
+        row = models.WebhookInbox.objects.get(pk=resp.json()["inbox_id"])
+        self.assertEqual(row.body["nombres"], "Ana")
+        self.assertFalse(models.Solicitud.objects.exists())
+        self.assertEqual(self.client.post(self.url, {}, content_type="application/json").status_code, 401)
+
+    def test_drain(self):
+        ids = self.post([WhatsappWebhookTests.payload, {"nombres": "sin teléfono"}, "x"]).json()["inbox_ids"]
+        stats = inbox.drain()
+        self.assertEqual((stats["procesadas"], stats["invalidas"]), (1, 2))
+        rows = models.WebhookInbox.objects.in_bulk(ids)
+        ok, sin_tel = rows[ids[0]], rows[ids[1]]
+        self.assertEqual(ok.estado, "PROCESADO")
+        self.assertEqual(ok.solicitud.tenista.numero, "+56912345678")
+        self.assertEqual((sin_tel.estado, sin_tel.error), ("ERROR", "ValueError: from_phone requerido"))
+        self.assertEqual(inbox.drain()["tomadas"], 0)
+
+    def test_retry_con_backoff(self):
+        inbox_id = self.post(WhatsappWebhookTests.payload).json()["inbox_id"]
+        with mock.patch("app.inbox.ingest_forms", side_effect=RuntimeError("bd caída")):
+            self.assertEqual(inbox.drain()["reintentos"], 1)
+        row = models.WebhookInbox.objects.get(pk=inbox_id)
+        self.assertEqual((row.estado, row.intentos), ("PENDIENTE", 1))
+        self.assertGreater(row.disponible_en, timezone.now())
+        # todavía en backoff
+        self.assertEqual(inbox.drain()["tomadas"], 0)
+        lag = self.client.get("/api/api/inbox/lag/").json()
+        self.assertEqual((lag["pendientes"], lag["reintentando"], lag["errores"]), (1, 1, 0))
+
+        models.WebhookInbox.objects.filter(pk=inbox_id).update(disponible_en=timezone.now())
+        self.assertEqual(inbox.drain()["procesadas"], 1)
+        self.assertEqual(self.client.get("/api/api/inbox/lag/").json()["lag_segundos"], 0.0)
+
+    def test_replay_of_ingested_message(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(WEBHOOK_URL, WhatsappWebhookTests.payload,
+                                     content_type="application/json", **TOKEN).json()
+        ids = self.post([WhatsappWebhookTests.payload, {"from_phone": "+56922222222", "wamid": "w1"},
+                         {"from_phone": "+56922222222", "wamid": "w1"}]).json()["inbox_ids"]
+        self.assertEqual(inbox.drain()["procesadas"], 3)
+        rows = models.WebhookInbox.objects.in_bulk(ids)
+        self.assertEqual(rows[ids[0]].solicitud_id, first["solicitud"]["id"])
+        self.assertEqual(rows[ids[1]].solicitud_id, rows[ids[2]].solicitud_id)
+        self.assertEqual(models.Solicitud.objects.count(), 2)
+        # y lo que creó el inbox es un replay para el webhook de a uno
+        resp = self.client.post(WEBHOOK_URL, {"from_phone": "+56922222222", "wamid": "w1"},
+                                content_type="application/json", **TOKEN)
+        self.assertEqual(resp.json()["solicitud"]["id"], rows[ids[1]].solicitud_id)
+        self.assertEqual(resp["Idempotent-Replayed"], "true")
+
+
+class ExplainHotQueriesTests(TestCase):
+    def test_runs_every_hot_query(self):
+        out = StringIO()
+        call_command("explain_hot_queries", "--verbose-plan", stdout=out)
+        # una línea por consulta (con su plan atrás) y ninguna con seq scan
+        lines = [line for line in out.getvalue().splitlines() if line.startswith(("OK ", "SEQ SCAN "))]
+        self.assertEqual([line.split(None, 1)[1] for line in lines], [name for name, _ in hot_queries()])
+        self.assertTrue(all(line.startswith("OK ") for line in lines), out.getvalue())
+
+
+class SeedDataTests(TestCase):
+    opts = {"tenistas": 20, "solicitudes": 200, "origenes": 5, "destinos": 5, "conductores": 3,
+            "coordinadores": 2, "batch": 64, "end": timezone.now().replace(microsecond=0)}
+
+    def test_deterministic(self):
+        first = {m: 1 for m in seed.Generator.COLUMNS}
+        a = list(seed.Generator(self.opts, first).solicitudes_y_reservas())
+        b = list(seed.Generator(self.opts, first).solicitudes_y_reservas())
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, list(seed.Generator({**self.opts, "seed": 2}, first).solicitudes_y_reservas()))
+
+    def test_load(self):
+        counts = seed.load({**self.opts, "solicitud_mix": seed.parse_mix("NUEVA=1,CONFIRMADA=1", ["NUEVA", "CONFIRMADA"])})
+        self.assertEqual(counts["solicitud"], 200)
+        self.assertEqual(models.Reserva.objects.count(), counts["reserva"])
+        self.assertEqual(set(models.Solicitud.objects.values_list("estado", flat=True)), {"NUEVA", "CONFIRMADA"})
+        self.assertFalse(models.Reserva.objects.exclude(solicitud__estado="CONFIRMADA").exists())
+        self.assertFalse(models.Reserva.objects.filter(estado="PENDIENTE", conductor__isnull=False).exists())
+        # las secuencias siguen después de los ids asignados a mano
+        self.assertGreater(make_solicitud().id, 200)
+        with self.assertRaises(ValueError):
+            seed.parse_mix("ABIERTA=1", models.SolicitudEstado.values)
+
+
+class BenchApiTests(TestCase):
+    def test_baseline_roundtrip(self):
+        make_reservas_completas(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/baseline.json"
+            opts = {"requests": 3, "warmup": 0, "only": "tenista_por_numero", "stdout": StringIO()}
+            call_command("bench_api", save_baseline=path, **opts)
+            with open(path) as fh:
+                saved = json.load(fh)
+            self.assertEqual(set(saved["scenarios"]), {"tenista_por_numero"})
+            call_command("bench_api", baseline=path, **opts)
+            # una línea base con menos queries hace fallar la corrida
+            saved["scenarios"]["tenista_por_numero"]["queries"] = -1
+            with open(path, "w") as fh:
+                json.dump(saved, fh)
+            with self.assertRaises(CommandError):
+                call_command("bench_api", baseline=path, stderr=StringIO(), **opts)
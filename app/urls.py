@@ -1,17 +1,24 @@
 # app/urls.py
 from django.urls import path, include
 from django.urls import path
-from app.webhooks import whatsapp_webhook
+from app.webhooks import whatsapp_webhook, whatsapp_webhook_batch, whatsapp_webhook_inbox
 from rest_framework.routers import DefaultRouter
 from app.views import (
     CoordinadorViewSet, ConductorViewSet, TenistaViewSet,
-    OrigenViewSet, DestinoViewSet, SolicitudViewSet, ReservaViewSet
+    OrigenViewSet, DestinoViewSet, SolicitudViewSet, ReservaViewSet,
+    catalog_cache_stats, db_pool_stats, inbox_lag, resumen_dashboard,
 )
 from app.webhooks import (
     solicitud_detail,
    
 )
-from app.webhooks import tenista_por_numero
+from app.webhooks import contexto_por_numero, tenista_por_numero
+from django.conf import settings
+from app.metrics import metrics_view
+
+# bajo ASGI los endpoints del bot usan las vistas async (mismo contrato)
+if settings.ASYNC_VIEWS:
+    from app.async_views import solicitud_detail, tenista_por_numero, whatsapp_webhook
 
 router = DefaultRouter()
 router.register(r'coordinadores', CoordinadorViewSet, basename='coordinador')
@@ -23,10 +30,20 @@ router.register(r'solicitudes', SolicitudViewSet, basename='solicitud')
 router.register(r'reservas',   ReservaViewSet,   basename='reserva')
 
 urlpatterns = [
+    # antes del router: si no, tenistas/<pk>/ se queda con "por-numero"
+    path("api/tenistas/por-numero/", tenista_por_numero),
+    path("api/tenistas/por-numero/<path:numero>/", tenista_por_numero),
+    path("api/contexto/por-numero/", contexto_por_numero),
+    path("api/contexto/por-numero/<path:numero>/", contexto_por_numero),
     path('api/', include(router.urls)),
     path("webhooks/whatsapp/", whatsapp_webhook, name="whatsapp_webhook"),
+    path("webhooks/whatsapp/batch/", whatsapp_webhook_batch, name="whatsapp_webhook_batch"),
+    path("webhooks/whatsapp/inbox/", whatsapp_webhook_inbox, name="whatsapp_webhook_inbox"),
     path("solicitudes/<int:pk>/", solicitud_detail),
-    path("api/tenistas/por-numero/", tenista_por_numero), 
-    path("api/tenistas/por-numero/<path:numero>/", tenista_por_numero), 
+    path("api/catalogos/cache/", catalog_cache_stats),
+    path("api/db/pool/", db_pool_stats),
+    path("api/metrics/", metrics_view),
+    path("api/inbox/lag/", inbox_lag),
+    path("api/resumen/", resumen_dashboard),
 ]
 
@@ -0,0 +1,104 @@
+# app/versions.py
+"""
+Versiones de tablas y filas guardadas en el cache backend (sin tocar la BD).
+
+Cada escritura deja un token nuevo "<ms>.<random>" en la clave de la tabla y
+de la fila; los validadores HTTP (ETag / Last-Modified, ver app/conditional.py)
+se arman con esos tokens. Si una clave no está (expiró o nunca se escribió) se
+crea un token nuevo: en el peor caso el cliente vuelve a bajar el cuerpo.
+
+Las escrituras por ORM avisan con señales; las que van por SQL directo
+(app/ingest.py) llaman a bump_* explícitamente.
+"""
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import models
+
+# modelos con validadores HTTP
+VERSIONED = (models.Origen, models.Destino, models.Conductor, models.Solicitud, models.Tenista)
+
+
+def _new_token() -> str:
+    return f"{int(time.time() * 1000):x}.{uuid.uuid4().hex[:8]}"
+
+
+def token_timestamp(token: str) -> float:
+    return int(token.split(".", 1)[0], 16) / 1000
+
+
+def table_key(model) -> str:
+    return f"ver:{model._meta.db_table}"
+
+
+def row_key(model, pk) -> str:
+    return f"ver:{model._meta.db_table}:{pk}"
+
+
+def deps_key(model, pk) -> str:
+    return f"deps:{model._meta.db_table}:{pk}"
+
+
+def get_versions(keys: Sequence[str]) -> List[str]:
+    """Tokens para las claves pedidas (un round trip al cache; crea los que falten)."""
+    found = cache.get_many(keys)
+    missing = {k: _new_token() for k in keys if k not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[k] for k in keys]
+
+
+async def aget_versions(keys: Sequence[str]) -> List[str]:
+    """get_versions para las vistas async (app/async_views.py)."""
+    found = await cache.aget_many(keys)
+    missing = {k: _new_token() for k in keys if k not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return [found[k] for k in keys]
+
+
+def bump_tables(*model_classes):
+    cache.set_many({table_key(m): _new_token() for m in model_classes}, timeout=None)
+
+
+def bump_rows(model, pks: Iterable, table: bool = True):
+    token = _new_token()
+    keys: Dict[str, str] = {row_key(model, pk): token for pk in pks}
+    if table:
+        keys[table_key(model)] = token
+    cache.set_many(keys, timeout=None)
+
+
+def get_deps(model, pk) -> Optional[Tuple]:
+    return cache.get(deps_key(model, pk))
+
+
+def set_deps(model, pk, deps: Tuple):
+    cache.set(deps_key(model, pk), deps, timeout=None)
+
+
+async def aget_deps(model, pk) -> Optional[Tuple]:
+    return await cache.aget(deps_key(model, pk))
+
+
+async def aset_deps(model, pk, deps: Tuple):
+    await cache.aset(deps_key(model, pk), deps, timeout=None)
+
+
+# ---------- señales (conectadas en AppConfig.ready) ----------
+def bump_instance(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    pk = instance.pk
+
+    def bump():
+        bump_rows(sender, [pk])
+        cache.delete(deps_key(sender, pk))
+    # después del commit: si no, un lector podría guardar el token nuevo con datos viejos
+    transaction.on_commit(bump)
@@ -1,8 +1,26 @@
+import os
+from datetime import timedelta
+
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 # Create your views here.
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from . import db_pool, inbox, metrics, raw_forms, resumen, scheduling, sparse
+from .bulk_import import ImportMixin
+from .catalog import catalog_stats
+from .conditional import ConditionalGetMixin
+from .eager import apply_eager_plan
+from .export import ExportMixin
+from .fast_serializers import compiled
+from .filters import EstadoFechaFilter, _parse as parse_fecha
+from .pagination import KeysetPagination, wants_keyset
+from .search import TrigramSearchFilter
 from .models import (
     Coordinador, Conductor, Tenista, Origen, Destino,
     Solicitud, Reserva
@@ -14,11 +32,73 @@ from .serializers import (
     ReservaReadNestedSerializer, ReservaWriteSerializer
 )
 
+# reservas que auto-asignar toma por llamada
+AUTO_ASIGNAR_MAX = 1000
+
+
 class BaseViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     ordering_fields = ["id"]
     search_fields = ["id"]
+    # None = solo PageNumberPagination; si se define, ?paginacion=cursor lo activa
+    keyset_pagination_class = None
+
+    def get_sparse(self):
+        """Serializer recortado por ?fields= / ?expand= (app/sparse.py), o None."""
+        if not hasattr(self, "_sparse"):
+            wanted = self.action in ["list", "retrieve"]
+            self._sparse = sparse.from_request(self.request, self.get_serializer_class()) if wanted else None
+        return self._sparse
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ["list", "retrieve"]:
+            fast = self.get_sparse()
+            if fast is not None:
+                queryset = sparse.prepare(queryset, fast)
+            else:
+                # select_related/prefetch_related según los serializers anidados
+                queryset = apply_eager_plan(queryset, self.get_serializer_class())
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fast = self.get_sparse()
+        return sparse.restrict(queryset, fast) if fast is not None else queryset
+
+    # True = el list usa el serializer compilado (app/fast_serializers.py), misma salida
+    compiled_list = False
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        fast = self.get_sparse()
+        if fast is None and self.compiled_list:
+            fast = compiled(self.get_serializer_class())
+        # serialize en Server-Timing / métricas (app/metrics.py)
+        with metrics.stage("serialize"):
+            data = fast.many(rows) if fast is not None else self.get_serializer(rows, many=True).data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        fast = self.get_sparse()
+        with metrics.stage("serialize"):
+            data = fast.to_representation(instance) if fast is not None else self.get_serializer(instance).data
+        return Response(data)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.keyset_pagination_class is not None and wants_keyset(self.request):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
 
 
 class CoordinadorViewSet(BaseViewSet):
@@ -28,50 +108,168 @@ class CoordinadorViewSet(BaseViewSet):
     ordering_fields = ["id", "created_at"]
 
 
-class ConductorViewSet(BaseViewSet):
+class ConductorViewSet(ImportMixin, ConditionalGetMixin, BaseViewSet):
     queryset = Conductor.objects.all().order_by("-id")
     serializer_class = ConductorSerializer
     search_fields = ["nombre", "apellido", "mail", "telefono", "patente"]
     ordering_fields = ["id", "created_at"]
 
+    @action(detail=False, methods=["get"])
+    def disponibles(self, request):
+        """Conductores activos libres en [desde, hasta) (hasta = desde + duración del viaje si falta)."""
+        params = request.query_params
+        if not params.get("desde"):
+            raise ValidationError({"desde": ["Requerido (YYYY-MM-DD o ISO 8601)"]})
+        desde = parse_fecha("desde", params["desde"], end=False)
+        hasta = parse_fecha("hasta", params["hasta"], end=True) if params.get("hasta") else None
+        conductores = scheduling.disponibles(desde, hasta)
+        return Response(compiled(ConductorSerializer).many(conductores))
+
 
-class TenistaViewSet(BaseViewSet):
+class TenistaViewSet(ImportMixin, BaseViewSet):
     queryset = Tenista.objects.all().order_by("-id")
     serializer_class = TenistaSerializer
     search_fields = ["nombre", "apellido", "numero", "correo"]
 
 
-class OrigenViewSet(BaseViewSet):
+class OrigenViewSet(ConditionalGetMixin, BaseViewSet):
     queryset = Origen.objects.all().order_by("salida")
     serializer_class = OrigenSerializer
     search_fields = ["salida"]
     ordering_fields = ["id"]
 
 
-class DestinoViewSet(BaseViewSet):
+class DestinoViewSet(ConditionalGetMixin, BaseViewSet):
     queryset = Destino.objects.all().order_by("lugar")
     serializer_class = DestinoSerializer
     search_fields = ["lugar"]
     ordering_fields = ["id"]
 
 
-class SolicitudViewSet(BaseViewSet):
-    queryset = Solicitud.objects.select_related("origen", "destino", "tenista").order_by("-id")
+class SolicitudViewSet(ExportMixin, BaseViewSet):
+    queryset = Solicitud.objects.all().order_by("-id")
+    filter_backends = [TrigramSearchFilter, filters.OrderingFilter, EstadoFechaFilter]
+    date_filter_field = "created_at"
     search_fields = ["form_telefono", "form_correo", "form_nombres", "form_apellidos", "estado"]
     ordering_fields = ["id", "created_at"]
+    keyset_pagination_class = KeysetPagination
+    compiled_list = True
 
     def get_serializer_class(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "export"]:
             return SolicitudReadNestedSerializer
         return SolicitudWriteSerializer
 
+    # raw_form vive en solicitud_raw: solo se lee con ?include=raw_form (una query más por página)
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if raw_forms.wanted(request):
+            data = response.data
+            raw_forms.attach(data["results"] if isinstance(data, dict) else data)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if raw_forms.wanted(request):
+            raw_forms.attach([response.data])
+        return response
+
+    @action(detail=True, methods=["get"])
+    def raw(self, request, pk=None):
+        """El cuerpo original del formulario (auditoría). 404 si la solicitud no existe."""
+        solicitud_id = self.get_object().pk
+        return Response({"solicitud_id": solicitud_id,
+                         "raw_form": raw_forms.for_solicitudes([solicitud_id]).get(solicitud_id)})
+
 
-class ReservaViewSet(BaseViewSet):
-    queryset = Reserva.objects.select_related("solicitud", "coordinador", "conductor").order_by("-id")
+class ReservaViewSet(ExportMixin, BaseViewSet):
+    queryset = Reserva.objects.all().order_by("-id")
+    filter_backends = [TrigramSearchFilter, filters.OrderingFilter, EstadoFechaFilter]
+    date_filter_field = "fecha_hora_agendada"
     search_fields = ["estado", "conductor__nombre", "conductor__apellido", "solicitud__form_telefono"]
     ordering_fields = ["id", "fecha_hora_agendada", "created_at", "updated_at"]
+    keyset_pagination_class = KeysetPagination
+    compiled_list = True
 
     def get_serializer_class(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "export"]:
             return ReservaReadNestedSerializer
         return ReservaWriteSerializer
+
+    def perform_create(self, serializer):
+        with scheduling.sin_solape():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with scheduling.sin_solape():
+            super().perform_update(serializer)
+
+    @action(detail=False, methods=["post"], url_path="auto-asignar")
+    def auto_asignar(self, request):
+        """
+        Asigna conductor a reservas PENDIENTE: {"ids": [...]} o {"desde": ..., "hasta": ...}
+        (fecha_hora_agendada en ese rango). Devuelve las asignadas y las que quedaron sin conductor.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        queryset = Reserva.objects.all()
+        if data.get("ids") is not None:
+            ids = data["ids"]
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                raise ValidationError({"ids": ["Lista de ids enteros"]})
+            if len(ids) > AUTO_ASIGNAR_MAX:
+                raise ValidationError({"ids": [f"Máximo {AUTO_ASIGNAR_MAX} reservas por llamada"]})
+            queryset = queryset.filter(pk__in=ids)
+        elif data.get("desde"):
+            queryset = queryset.filter(fecha_hora_agendada__gte=parse_fecha("desde", str(data["desde"]), end=False))
+            if data.get("hasta"):
+                queryset = queryset.filter(fecha_hora_agendada__lt=parse_fecha("hasta", str(data["hasta"]), end=True))
+        else:
+            raise ValidationError({"ids": ["Mandar ids o desde/hasta"]})
+        return Response(scheduling.auto_asignar(queryset, limit=AUTO_ASIGNAR_MAX))
+
+
+@api_view(["GET"])
+def catalog_cache_stats(request):
+    """Hits/misses del LRU de Origen/Destino en este worker."""
+    return Response({"ok": True, "pid": os.getpid(), "catalogos": catalog_stats()})
+
+
+@api_view(["GET"])
+def db_pool_stats(request):
+    """Checkouts, esperas y timeouts del pool de conexiones (o conexiones abiertas) de este worker."""
+    return Response({"ok": True, **db_pool.stats()})
+
+
+@api_view(["GET"])
+def inbox_lag(request):
+    """Atraso del inbox del webhook (pendientes, reintentos, errores, segundos)."""
+    return Response({"ok": True, **inbox.lag()})
+
+
+def _fecha(request, param):
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({param: [f"Fecha inválida: {value!r} (usar YYYY-MM-DD)"]})
+    return parsed
+
+
+@api_view(["GET"])
+def resumen_dashboard(request):
+    """
+    Contadores del dashboard por estado: ?desde=&hasta= (YYYY-MM-DD, por
+    defecto los últimos 7 días). Lee resumen_diario y resumen_delta, no las tablas.
+    """
+    hasta = _fecha(request, "hasta") or timezone.localdate()
+    desde = _fecha(request, "desde") or hasta - timedelta(days=6)
+    if desde > hasta:
+        raise ValidationError({"desde": ["Tiene que ser anterior o igual a hasta"]})
+    if (hasta - desde).days >= resumen.MAX_DIAS:
+        raise ValidationError({"desde": [f"Máximo {resumen.MAX_DIAS} días"]})
+    return Response(resumen.leer(desde, hasta))
+
@@ -8,11 +8,15 @@ from django.conf import settings
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
 
-from . import models  # tus modelos del archivo models.py
+from . import contexto, idempotency, inbox, lookup, models, versions  # tus modelos del archivo models.py
+from .catalog import retry_stale
+from .conditional import not_modified, set_validators
+from .ingest import ingest_forms
+from .parsers import FastJSONParser, NDJSONParser
 
 
 # ---------------- utilidades ----------------
@@ -67,18 +71,90 @@ def _to_time(val: Any) -> Optional[time]:
     return None
 
 
-def _require_token(request):
+# Origen/Destino: aceptamos string o {direccion:..}/{salida:..}/{lugar:..}
+def _pick_origen(v) -> Optional[str]:
+    if isinstance(v, dict):
+        return _s(v.get("salida")) or _s(v.get("direccion"))
+    return _s(v)
+
+
+def _pick_destino(v) -> Optional[str]:
+    if isinstance(v, dict):
+        return _s(v.get("lugar")) or _s(v.get("direccion"))
+    return _s(v)
+
+
+# pasajeros va a un smallint: fuera de esto es un error del formulario, no un 500
+PASAJEROS_MIN, PASAJEROS_MAX = 1, 99
+
+
+def _has_nul(val: Any) -> bool:
+    """Postgres no acepta \\u0000 ni en text ni en jsonb (DataError)."""
+    if isinstance(val, str):
+        return "\x00" in val
+    if isinstance(val, dict):
+        return any(_has_nul(k) or _has_nul(v) for k, v in val.items())
+    if isinstance(val, list):
+        return any(_has_nul(v) for v in val)
+    return False
+
+
+def _parse_form(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normaliza un payload del formulario de n8n a los campos que usamos.
+    Lanza ValueError si falta el teléfono de WhatsApp o si algo no entraría en
+    su columna (así en el batch es el error de ese item y no del lote entero).
+    """
+    # Teléfonos
+    from_phone = _phone(body.get("from_phone"))          # WhatsApp que escribe
+    if not from_phone:
+        raise ValueError("from_phone requerido")
+    if _has_nul(body):
+        raise ValueError("caracter nulo (\\u0000) en el formulario")
+    pasajeros = _to_int(body.get("pasajeros"), default=1)
+    if not PASAJEROS_MIN <= pasajeros <= PASAJEROS_MAX:
+        raise ValueError(f"pasajeros fuera de rango ({PASAJEROS_MIN}-{PASAJEROS_MAX}): {pasajeros}")
+
+    # si venía "destinos": [ {...} ] nos quedamos con el primero
+    if "destinos" in body and isinstance(body["destinos"], list) and body["destinos"]:
+        destino_txt = _pick_destino(body["destinos"][0])
+    else:
+        destino_txt = _pick_destino(body.get("destino"))
+
+    return {
+        "from_phone": from_phone,
+        "form_telefono": _s(body.get("telefono")) or from_phone,
+        # Datos de contacto del formulario
+        "form_nombres": _s(body.get("nombres")) or "Tenista",
+        "form_apellidos": _s(body.get("apellidos")),
+        "form_correo": _s(body.get("correo")),
+        # Viaje
+        "pasajeros": pasajeros,
+        "hora_salida": _to_time(body.get("hora_salida")),
+        "observaciones": _s(body.get("observaciones")),
+        "origen_txt": _pick_origen(body.get("origen")),
+        "destino_txt": destino_txt,
+        "raw": body,
+    }
+
+
+def _token_ok(request, get_data) -> bool:
     """Token por header. En DEBUG también acepta ?token= o body.token para pruebas."""
     expected = getattr(settings, "WEBHOOK_TOKEN", None)
     if not expected:
-        return None
+        return True
     received = request.META.get("HTTP_X_WEBHOOK_TOKEN")
     if settings.DEBUG and not received:
         try:
-            received = request.GET.get("token") or (request.data.get("token") if isinstance(request.data, dict) else None)
+            data = get_data()
+            received = request.GET.get("token") or (data.get("token") if isinstance(data, dict) else None)
         except Exception:
             received = None
-    if received != expected:
+    return received == expected
+
+
+def _require_token(request):
+    if not _token_ok(request, lambda: request.data):
         return Response({"ok": False, "error": "Token inválido"}, status=401)
     return None
 
@@ -93,7 +169,7 @@ def whatsapp_webhook(request):
       - Origen (salida)
       - Destino (lugar)
       - Solicitud (form_*, FKs, estado=NUEVA)
-    Devuelve lo insertado desde BD.
+    Devuelve lo insertado (mismo formato que solicitud_detail).
     """
     # seguridad
     token_error = _require_token(request)
@@ -104,121 +180,120 @@ def whatsapp_webhook(request):
     if not isinstance(body, dict):
         return Response({"ok": False, "error": "JSON inválido"}, status=400)
 
-    # --------- lee campos del formulario ---------
-    # Teléfonos
-    from_phone = _phone(body.get("from_phone"))          # WhatsApp que escribe
-    form_telefono = _s(body.get("telefono")) or from_phone
+    try:
+        form = _parse_form(body)
+    except ValueError as exc:
+        return Response({"ok": False, "error": str(exc)}, status=400)
 
-    if not from_phone:
-        return Response({"ok": False, "error": "from_phone requerido"}, status=400)
+    # --------- idempotencia (reintentos de n8n) ---------
+    key = idempotency.key_for(request.META.get("HTTP_IDEMPOTENCY_KEY"), body)
+    replay = idempotency.cached(key)
+    if replay is not None:
+        return _created(replay, replayed=True)
 
-    # Datos de contacto del formulario
-    form_nombres = _s(body.get("nombres")) or "Tenista"
-    form_apellidos = _s(body.get("apellidos"))
-    form_correo = _s(body.get("correo"))
+    # --------- UPSERT Tenista / Origen / Destino + SOLICITUD ---------
+    # Una transacción; el tenista se crea o enriquece en el mismo INSERT ... ON CONFLICT.
+    resp, replayed = retry_stale(lambda: idempotency.run(key, lambda: _create(form)))
+    return _created(resp, replayed)
 
-    # Viaje
-    pasajeros = _to_int(body.get("pasajeros"), default=1)
-    hora_salida = _to_time(body.get("hora_salida"))
-    observaciones = _s(body.get("observaciones"))
 
-    # Origen/Destino: aceptamos string o {direccion:..}/{salida:..}/{lugar:..}
-    def _pick_origen(v) -> Optional[str]:
-        if isinstance(v, dict):
-            return _s(v.get("salida")) or _s(v.get("direccion"))
-        return _s(v)
+def _create(form):
+    """(id, cuerpo 201) de la Solicitud nueva; el cuerpo sale de los objetos en memoria."""
+    sol = ingest_forms([form], savepoint=False)[0]
+    return sol.id, {"ok": True, "solicitud": _serialize_solicitud(sol)}
 
-    def _pick_destino(v) -> Optional[str]:
-        if isinstance(v, dict):
-            return _s(v.get("lugar")) or _s(v.get("direccion"))
-        return _s(v)
 
-    origen_txt = _pick_origen(body.get("origen"))
-    # si venía "destinos": [ {...} ] nos quedamos con el primero
-    if "destinos" in body and isinstance(body["destinos"], list) and body["destinos"]:
-        destino_txt = _pick_destino(body["destinos"][0])
-    else:
-        destino_txt = _pick_destino(body.get("destino"))
+def _created(resp, replayed: bool):
+    out = Response(resp, status=status.HTTP_201_CREATED)
+    if replayed:
+        out["Idempotent-Replayed"] = "true"
+    return out
 
-    # --------- UPSERT Tenista / Origen / Destino ---------
-    tenista, _ = models.Tenista.objects.get_or_create(
-        numero=from_phone,
-        defaults={
-            "nombre": form_nombres,
-            "apellido": form_apellidos or "",
-            "correo": form_correo,
-        },
-    )
-    # actualiza datos faltantes si llegaron ahora
-    changed = False
-    if form_correo and not tenista.correo:
-        tenista.correo = form_correo; changed = True
-    if form_nombres and tenista.nombre in (None, "", "Tenista"):
-        tenista.nombre = form_nombres; changed = True
-    if form_apellidos and not tenista.apellido:
-        tenista.apellido = form_apellidos; changed = True
-    if changed:
-        tenista.save()
-
-    origen_obj = None
-    if origen_txt:
-        origen_obj, _ = models.Origen.objects.get_or_create(salida=origen_txt)
-
-    destino_obj = None
-    if destino_txt:
-        destino_obj, _ = models.Destino.objects.get_or_create(lugar=destino_txt)
-
-    # --------- crear SOLICITUD ---------
-    solicitud = models.Solicitud.objects.create(
-        form_nombres=form_nombres,
-        form_apellidos=form_apellidos or "",
-        form_correo=form_correo,
-        form_telefono=form_telefono or "",
-        pasajeros=pasajeros,
-        hora_salida=hora_salida,
-        observaciones=observaciones,
-        origen=origen_obj,   # FK (puede ser None)
-        destino=destino_obj, # FK (puede ser None)
-        tenista=tenista,     # FK
-        idioma_detectado="es",
-        raw_form=body,       # guarda el JSON crudo por auditoría
-        estado=models.SolicitudEstado.NUEVA,
-        created_at=timezone.now(),  # tu campo no tiene default → lo seteamos
-    )
-
-    # --------- respuesta (leído desde BD) ---------
-    sol = (models.Solicitud.objects
-           .select_related("tenista", "origen", "destino")
-           .get(pk=solicitud.pk))
 
-    resp = {
+@api_view(["POST"])
+@parser_classes([FastJSONParser, NDJSONParser])
+@csrf_exempt
+def whatsapp_webhook_batch(request):
+    """
+    Variante por lotes del webhook (replay de n8n después de una caída).
+    Acepta un array JSON o NDJSON con los mismos payloads que whatsapp_webhook
+    y devuelve un resultado por item, en el mismo orden de entrada.
+    Todo el lote se resuelve con un número acotado de queries. Cada item pasa
+    por la idempotencia del webhook: lo que ya había entrado (por acá, por el
+    webhook de a uno o por el inbox) vuelve con su respuesta y "repetida": true.
+    """
+    token_error = _require_token(request)
+    if token_error:
+        return token_error
+
+    items = request.data
+    if not isinstance(items, list):
+        return Response({"ok": False, "error": "Se espera un array JSON o NDJSON"}, status=400)
+    max_items = getattr(settings, "WEBHOOK_BATCH_MAX", 1000)
+    if len(items) > max_items:
+        return Response({"ok": False, "error": f"Máximo {max_items} formularios por lote"},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    resultados: list = [None] * len(items)
+    forms, posiciones = [], []
+    for i, body in enumerate(items):
+        if not isinstance(body, dict):
+            resultados[i] = {"ok": False, "error": "JSON inválido"}
+            continue
+        try:
+            forms.append(_parse_form(body))
+        except ValueError as exc:
+            resultados[i] = {"ok": False, "error": str(exc)}
+            continue
+        posiciones.append(i)
+
+    # las mismas claves que el webhook de a uno (sin header: id del mensaje o hash
+    # del item), así un replay de algo que ya entró no crea otra Solicitud
+    keys = [idempotency.key_for(None, f["raw"]) for f in forms]
+    hechos = retry_stale(lambda: idempotency.run_many(keys, lambda nuevas: _create_many([forms[j] for j in nuevas])))
+    creadas = 0
+    for i, (_, resp, replayed) in zip(posiciones, hechos):
+        resultados[i] = {**resp, "repetida": True} if replayed else resp
+        creadas += not replayed
+
+    return Response({
         "ok": True,
-        "solicitud": {
-            "id": sol.id,
-            "estado": sol.estado,
-            "created_at": sol.created_at.isoformat() if sol.created_at else None,
-            "pasajeros": sol.pasajeros,
-            "hora_salida": sol.hora_salida.isoformat() if sol.hora_salida else None,
-            "observaciones": sol.observaciones,
-            "origen": getattr(sol.origen, "salida", None),
-            "destino": getattr(sol.destino, "lugar", None),
-            "form": {
-                "nombres": sol.form_nombres,
-                "apellidos": sol.form_apellidos,
-                "correo": sol.form_correo,
-                "telefono": sol.form_telefono,
-            },
-            "tenista": {
-                "id": sol.tenista.id,
-                "nombre": sol.tenista.nombre,
-                "apellido": sol.tenista.apellido,
-                "correo": sol.tenista.correo,
-                "numero": sol.tenista.numero,
-            },
-        },
-    }
-    return Response(resp, status=status.HTTP_201_CREATED)
+        "total": len(items),
+        "creadas": creadas,
+        "resultados": resultados,
+    }, status=status.HTTP_201_CREATED if creadas else status.HTTP_200_OK)
+
 
+def _create_many(forms):
+    """_create para varios formularios, con un solo ingest_forms."""
+    return [(sol.id, {"ok": True, "solicitud": _serialize_solicitud(sol)}) for sol in ingest_forms(forms)]
+
+
+
+@api_view(["POST"])
+@parser_classes([FastJSONParser, NDJSONParser])
+@csrf_exempt
+def whatsapp_webhook_inbox(request):
+    """
+    Modo "aceptar rápido": guarda el cuerpo crudo en webhook_inbox (un INSERT)
+    y contesta 202 con el id; `manage.py process_inbox` crea las Solicitudes.
+    Acepta un objeto (como whatsapp_webhook) o un array/NDJSON (como el batch).
+    """
+    token_error = _require_token(request)
+    if token_error:
+        return token_error
+
+    data = request.data
+    if isinstance(data, dict):
+        [inbox_id] = inbox.accept([data])
+        return Response({"ok": True, "inbox_id": inbox_id}, status=status.HTTP_202_ACCEPTED)
+    if not isinstance(data, list):
+        return Response({"ok": False, "error": "JSON inválido"}, status=400)
+    max_items = getattr(settings, "WEBHOOK_BATCH_MAX", 1000)
+    if len(data) > max_items:
+        return Response({"ok": False, "error": f"Máximo {max_items} formularios por lote"},
+                        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    return Response({"ok": True, "inbox_ids": inbox.accept(data)}, status=status.HTTP_202_ACCEPTED)
 
 
 from rest_framework.decorators import api_view
@@ -253,15 +328,41 @@ def _serialize_solicitud(sol):
         },
     }
 
+def _solicitud_tokens(pk: int):
+    """Tokens de versión de la solicitud y de lo que embebe (tenista/origen/destino)."""
+    deps = versions.get_deps(models.Solicitud, pk)
+    if deps is None:
+        deps = (models.Solicitud.objects.filter(pk=pk)
+                .values_list("tenista_id", "origen_id", "destino_id").first())
+        if deps is None:
+            return None
+        versions.set_deps(models.Solicitud, pk, deps)
+    tenista_id, origen_id, destino_id = deps
+    keys = [versions.row_key(models.Solicitud, pk)]
+    for model, fk in ((models.Tenista, tenista_id), (models.Origen, origen_id), (models.Destino, destino_id)):
+        if fk is not None:
+            keys.append(versions.row_key(model, fk))
+    return versions.get_versions(keys)
+
+
 @api_view(["GET"])
 def solicitud_detail(request, pk: int):
     from . import models
+    # ETag / If-None-Match: el 304 sale sin serializar (y sin query si las versiones están en cache)
+    tokens = _solicitud_tokens(pk)
+    if tokens is None:
+        return Response({"ok": False, "error": "No encontrada"}, status=status.HTTP_404_NOT_FOUND)
+    not_modified_resp, etag, last_modified = not_modified(request, tokens)
+    if not_modified_resp is not None:
+        return not_modified_resp
+
     sol = (models.Solicitud.objects
            .select_related("tenista", "origen", "destino")
            .filter(pk=pk).first())
     if not sol:
         return Response({"ok": False, "error": "No encontrada"}, status=status.HTTP_404_NOT_FOUND)
-    return Response({"ok": True, "solicitud": _serialize_solicitud(sol)}, status=200)
+    resp = Response({"ok": True, "solicitud": _serialize_solicitud(sol)}, status=200)
+    return set_validators(resp, etag, last_modified)
 
 
 from rest_framework.decorators import api_view
@@ -269,16 +370,34 @@ from rest_framework.response import Response
 
 @api_view(["GET"])
 def tenista_por_numero(request, numero=None):
-    from . import models
     numero = numero or request.GET.get("numero") or request.GET.get("from_phone")
     if not numero:
         return Response({"ok": False, "error": "numero requerido"}, status=400)
 
-    t = models.Tenista.objects.filter(numero=numero).first()
-    if not t:
-        return Response({"ok": True, "tenista": None}, status=200)
+    # normaliza a E.164 y pasa por el cache (incluye respuestas negativas)
+    return Response({"ok": True, "tenista": lookup.tenista_por_numero(numero)})
 
-    return Response({"ok": True, "tenista": {
-        "id": t.id, "nombre": t.nombre, "apellido": t.apellido,
-        "correo": t.correo, "numero": t.numero
-    }})
\ No newline at end of file
+
+@api_view(["GET"])
+def contexto_por_numero(request, numero=None):
+    """
+    Todo lo que el bot necesita para contestar, en una llamada: el tenista,
+    sus últimas solicitudes (?limit=, por defecto CONTEXTO_SOLICITUDES) y
+    sus reservas activas con conductor.
+    """
+    numero = numero or request.GET.get("numero") or request.GET.get("from_phone")
+    if not numero:
+        return Response({"ok": False, "error": "numero requerido"}, status=400)
+
+    tenista = lookup.tenista_por_numero(numero)
+    if tenista is None:
+        return Response({"ok": True, "tenista": None, "solicitudes": [], "reservas": []})
+
+    limit = _to_int(request.GET.get("limit"), default=getattr(settings, "CONTEXTO_SOLICITUDES", 5))
+    ctx = contexto.for_tenista(tenista["id"])
+    return Response({
+        "ok": True,
+        "tenista": tenista,
+        "solicitudes": ctx["solicitudes"][:max(limit, 0)],
+        "reservas": ctx["reservas"],
+    })
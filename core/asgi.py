@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# vistas async para el webhook y las lecturas del bot (app/async_views.py)
+os.environ.setdefault('ASYNC_VIEWS', '1')
+# bajo ASGI cada sync_to_async corre en otro thread: las conexiones persistentes
+# quedarían una por thread (hasta max_connections); el pool las comparte
+os.environ.setdefault('PG_POOL', '1')
 
 application = get_asgi_application()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -57,6 +58,15 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.AllowAny"],
+    "DEFAULT_RENDERER_CLASSES": [
+        "app.renderers.FastJSONRenderer",           # orjson si está instalado
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "app.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_FILTER_BACKENDS": [
@@ -69,7 +79,9 @@ TIME_ZONE = "America/Santiago"
 USE_TZ = True
 
 MIDDLEWARE = [
+    'app.metrics.MetricsMiddleware',          # primero: mide todo lo de abajo (Server-Timing, /api/api/metrics/)
     'corsheaders.middleware.CorsMiddleware',
+    'app.middleware.CompressionMiddleware',   # gzip/brotli según Accept-Encoding
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -104,6 +116,8 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+PG_SCHEMA = os.getenv("PG_SCHEMA", "capstone_wsp")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -112,12 +126,49 @@ DATABASES = {
         "PASSWORD": os.getenv("PG_PASS", ""),
         "HOST": os.getenv("PG_HOST", "127.0.0.1"),
         "PORT": os.getenv("PG_PORT", "5432"),
+        # antes de usar una conexión reusada se verifica que siga viva
+        "CONN_HEALTH_CHECKS": True,
         "OPTIONS": {
-            "options": "-c search_path=capstone_wsp"
+            # va en el arranque de cada conexión física: no cuesta un round trip
+            "options": f"-c search_path={PG_SCHEMA}",
+            "connect_timeout": int(os.getenv("PG_CONNECT_TIMEOUT", "5")),
         },
     }
 }
 
+# Reuso de conexiones (app/db_pool.py, /api/api/db/pool/):
+#   PG_POOL=1  pool de psycopg3 compartido por los threads del worker. Es lo
+#              que sirve bajo ASGI, donde cada request usa otro thread.
+#   PG_POOL=0  una conexión persistente por thread, que se cierra después de
+#              PG_CONN_MAX_AGE segundos (0 = una por request, como antes).
+#              Bajo ASGI (ASYNC_VIEWS=1) Django no soporta persistentes: cada
+#              thread de sync_to_async se quedaría con la suya, así que ahí
+#              es siempre una por request. core/asgi.py prende el pool.
+if os.getenv("PG_POOL", "0") == "1":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # Django no deja combinar pool y persistentes
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("PG_POOL_MIN", "2")),
+        "max_size": int(os.getenv("PG_POOL_MAX", "10")),
+        # segundos esperando una conexión libre antes de fallar (PoolTimeout)
+        "timeout": float(os.getenv("PG_POOL_TIMEOUT", "10")),
+        "max_idle": float(os.getenv("PG_POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(os.getenv("PG_POOL_MAX_LIFETIME", "1800")),
+        "name": "default",
+    }
+elif os.getenv("ASYNC_VIEWS", "0") == "1":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("PG_CONN_MAX_AGE", "60"))
+
+# Tests / CI sin Postgres: DB_ENGINE=sqlite usa un archivo local
+if os.getenv("DB_ENGINE", "").lower() == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        }
+    }
+
 
 
 # Password validation
@@ -173,5 +224,82 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 WEBHOOK_TOKEN = os.getenv("WEBHOOK_TOKEN", "whatsapp333")
+# Cache compartido entre workers (versiones del catálogo, ETags, etc.).
+# Con REDIS_URL se usa Redis; si no, archivos locales, que se comparten entre
+# los workers de gunicorn de una misma máquina.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "capstone_wsp_cache")),
+            "OPTIONS": {"MAX_ENTRIES": 100000},
+        }
+    }
 
-
+# LRU de Origen/Destino (app/catalog.py)
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+CATALOG_CACHE_VERSION_TTL = float(os.getenv("CATALOG_CACHE_VERSION_TTL", "2"))
+
+# Compresión de respuestas (app/middleware.py)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# tenista_por_numero: TTL del cache (segundos) para encontrados / no encontrados
+TENISTA_LOOKUP_TTL = int(os.getenv("TENISTA_LOOKUP_TTL", "300"))
+TENISTA_LOOKUP_NEGATIVE_TTL = int(os.getenv("TENISTA_LOOKUP_NEGATIVE_TTL", "60"))
+# contexto del bot (/api/api/contexto/por-numero/): TTL del cache, solicitudes
+# por defecto y máximo que se guarda por tenista
+CONTEXTO_TTL = int(os.getenv("CONTEXTO_TTL", "30"))
+CONTEXTO_SOLICITUDES = int(os.getenv("CONTEXTO_SOLICITUDES", "5"))
+CONTEXTO_MAX_SOLICITUDES = int(os.getenv("CONTEXTO_MAX_SOLICITUDES", "20"))
+# código de país para teléfonos locales sin prefijo (app/phones.py)
+PHONE_DEFAULT_COUNTRY = os.getenv("PHONE_DEFAULT_COUNTRY", "56")
+
+# idempotencia de whatsapp_webhook: cuánto vale una clave (Idempotency-Key,
+# id de mensaje o hash del payload), en segundos; 0 la desactiva
+WEBHOOK_IDEMPOTENCY_TTL = int(os.getenv("WEBHOOK_IDEMPOTENCY_TTL", str(24 * 3600)))
+
+# inbox del webhook (/api/webhooks/whatsapp/inbox/ + manage.py process_inbox):
+# filas por lote, intentos antes de dejarla en ERROR y backoff (segundos)
+INBOX_BATCH = int(os.getenv("INBOX_BATCH", "200"))
+INBOX_MAX_ATTEMPTS = int(os.getenv("INBOX_MAX_ATTEMPTS", "8"))
+INBOX_BACKOFF_BASE = float(os.getenv("INBOX_BACKOFF_BASE", "5"))
+INBOX_BACKOFF_MAX = float(os.getenv("INBOX_BACKOFF_MAX", "600"))
+
+# whatsapp_webhook / tenista_por_numero / solicitud_detail como vistas async
+# (app/async_views.py). core/asgi.py lo pone en 1; con WSGI queda en 0.
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "0") == "1"
+
+# máximo de formularios por llamada a /webhooks/whatsapp/batch/
+WEBHOOK_BATCH_MAX = int(os.getenv("WEBHOOK_BATCH_MAX", "1000"))
+
+
+
+# exports (/api/api/solicitudes/export/, /api/api/reservas/export/): filas que
+# se piden por vuelta al cursor del servidor
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# duración de un viaje (minutos): Reserva.fecha_hora_fin = agendada + esto. Un
+# conductor no puede tener dos reservas activas que se solapen (app/scheduling.py)
+RESERVA_DURACION_MIN = int(os.getenv("RESERVA_DURACION_MIN", "90"))
+
+# solicitud_raw: guardar el cuerpo original del formulario comprimido (zlib).
+# Ocupa menos, pero deja de ser consultable como JSON desde SQL.
+RAW_FORM_COMPRESS = os.getenv("RAW_FORM_COMPRESS", "0") == "1"
+
+# métricas por request (app/metrics.py): Server-Timing, histogramas por vista
+# en /api/api/metrics/ (Prometheus) y log de las requests lentas
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "1") == "1"
+METRICS_SLOW_MS = int(os.getenv("METRICS_SLOW_MS", "500"))  # 0 = no loguear
+METRICS_TOP_QUERIES = int(os.getenv("METRICS_TOP_QUERIES", "5"))
+# una foto por worker de gunicorn; el endpoint suma todas. Vaciar al desplegar.
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "capstone_wsp_metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))